@@ -0,0 +1,252 @@
+# Shared Azure AI Agents client layer
+# One AgentsClient and one credential per process instead of one per agent call:
+#   - the credential chain is resolved once and tokens are cached until shortly before expiry
+#   - the client's HTTP session keeps a pool of TLS connections that every agent call reuses
+#   - both are created lazily under a lock, so concurrent Streamlit sessions share them safely
+# Function tools: enable_auto_function_calls() stores ONE FunctionTool on the client, so the
+# agent modules register their tool functions here and the client gets the union of all of them.
+# Per-call state a tool needs (e.g. the coverage agent's plan filter) travels in a ContextVar.
+# get_metrics() reports client/credential creations and token fetches vs cache hits.
+# stream_agent_text() runs an agent as a streaming run and yields its reply as it is generated;
+# registered function tools are executed mid-stream just like in create_thread_and_process_run.
+# With FAKE_SERVICES=agents (services.py) the client is the local stand-in in fake_services/agents.py.
+# run_agent_text() / stream_agent_text() trace each run (tracing.py): model, tokens and tool-call
+# round trips on an "agent.run" span, with a child span per tool call and for message listing.
+
+import os
+import time
+import atexit
+import functools
+import threading
+from dotenv import load_dotenv
+from services import fake
+from tracing import span, current
+from task_graph import fallback
+
+load_dotenv()
+
+AZURE_AI_PROJECT_ENDPOINT = os.getenv("AZURE_AI_PROJECT_ENDPOINT")
+# Max pooled connections to the project endpoint (one per concurrent agent call)
+AGENTS_POOL_SIZE = int(os.getenv("AGENTS_POOL_SIZE", "20"))
+# Refresh a cached token this many seconds before it expires
+TOKEN_REFRESH_MARGIN = int(os.getenv("TOKEN_REFRESH_MARGIN", "300"))
+
+_lock = threading.Lock()
+_client = None
+_credential = None
+_tools = {}  # function name -> function
+_metrics = {
+    "client_requests": 0,
+    "clients_created": 0,
+    "credentials_created": 0,
+    "token_fetches": 0,
+    "token_cache_hits": 0,
+    "tool_registrations": 0,
+}
+
+
+def _count(name, amount=1):
+    with _lock:
+        _metrics[name] += amount
+
+
+class CachedCredential:
+    """Wraps a TokenCredential and reuses each scope's token until it is close to expiry."""
+
+    def __init__(self, credential, refresh_margin=TOKEN_REFRESH_MARGIN):
+        self.credential = credential
+        self.refresh_margin = refresh_margin
+        self._tokens = {}  # (scopes, claims, tenant_id) -> AccessToken
+        self._lock = threading.Lock()
+
+    def get_token(self, *scopes, claims=None, tenant_id=None, **kwargs):
+        key = (scopes, claims, tenant_id)
+        with self._lock:
+            token = self._tokens.get(key)
+            if token and token.expires_on - self.refresh_margin > time.time():
+                _count("token_cache_hits")
+                return token
+            # Fetch while holding the lock so concurrent callers don't all hit the chain
+            token = self.credential.get_token(*scopes, claims=claims, tenant_id=tenant_id, **kwargs)
+            self._tokens[key] = token
+        _count("token_fetches")
+        return token
+
+    def close(self):
+        self.credential.close()
+
+
+def get_credential():
+    """The process-wide token-caching DefaultAzureCredential."""
+    global _credential
+    if _credential is None:
+        with _lock:
+            if _credential is None:
+                from azure.identity import DefaultAzureCredential
+                _credential = CachedCredential(DefaultAzureCredential())
+                _metrics["credentials_created"] += 1
+    return _credential
+
+
+def _pooled_transport():
+    import requests
+    from requests.adapters import HTTPAdapter
+    from azure.core.pipeline.transport import RequestsTransport
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=AGENTS_POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return RequestsTransport(session=session)
+
+
+def get_agents_client():
+    """
+    The process-wide AgentsClient. Do not close it or use it as a context manager;
+    it is closed once at interpreter exit.
+    """
+    global _client
+    _count("client_requests")
+    if _client is None:
+        credential = None if fake("agents") else get_credential()
+        with _lock:
+            if _client is None:
+                if fake("agents"):
+                    from fake_services.agents import FakeAgentsClient
+                    client = FakeAgentsClient()
+                else:
+                    from azure.ai.agents import AgentsClient
+                    client = AgentsClient(
+                        endpoint=AZURE_AI_PROJECT_ENDPOINT,
+                        credential=credential,
+                        transport=_pooled_transport(),
+                    )
+                if _tools:
+                    _enable_tools(client)
+                _client = client
+                _metrics["clients_created"] += 1
+    return _client
+
+
+def _traced_tool(function):
+    """The tool function, counted as a round trip of the enclosing agent run and timed as its own span."""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        run_span = current()
+        if run_span is not None:
+            run_span.add("tool_calls")
+        with span(f"tool.{function.__name__}"):
+            try:
+                return function(*args, **kwargs)
+            except Exception as e:
+                # The SDK hands the error to the agent as the tool result; the reply is built on it
+                fallback(f"tool {function.__name__} failed: {e}")
+                raise
+    return wrapper
+
+
+def _enable_tools(client):
+    from azure.ai.agents.models import FunctionTool
+    client.enable_auto_function_calls(FunctionTool(functions={_traced_tool(f) for f in _tools.values()}))
+
+
+def register_tools(*functions):
+    """
+    Make function tools callable by runs on the shared client.
+    Tools are keyed by function name (the name the agent calls), so re-registering is a no-op.
+    """
+    with _lock:
+        changed = False
+        for function in functions:
+            if _tools.get(function.__name__) is not function:
+                _tools[function.__name__] = function
+                changed = True
+        if changed:
+            _metrics["tool_registrations"] += 1
+            if _client is not None:
+                _enable_tools(_client)
+
+
+def _record_run(run_span, run):
+    usage = getattr(run, "usage", None)
+    error = getattr(run, "last_error", None)
+    run_span.set(
+        model=getattr(run, "model", None),
+        status=getattr(run.status, "value", run.status),
+        prompt_tokens=getattr(usage, "prompt_tokens", None),
+        completion_tokens=getattr(usage, "completion_tokens", None),
+        run_error=getattr(error, "message", None),
+    )
+
+
+def run_agent_text(agent_id, content, name=None):
+    """
+    Run an agent on one user message and return its reply text (None if it gave none).
+    :param name: agent name recorded on the trace span (router, coverage, ...).
+    """
+    from azure.ai.agents.models import AgentThreadCreationOptions, ThreadMessageOptions, MessageTextContent, MessageRole
+    client = get_agents_client()
+    with span("agent.run", agent=name, agent_id=agent_id, tool_calls=0) as run_span:
+        run = client.create_thread_and_process_run(
+            agent_id=agent_id,
+            thread=AgentThreadCreationOptions(messages=[ThreadMessageOptions(role="user", content=content)]),
+        )
+        _record_run(run_span, run)
+    with span("agent.messages.list", agent=name):
+        messages = list(client.messages.list(thread_id=run.thread_id))
+
+    for msg in messages:
+        if msg.role == MessageRole.AGENT:
+            for item in msg.content:
+                if isinstance(item, MessageTextContent):
+                    return item.text.value
+            break
+    fallback(f"{name or agent_id}: no reply")
+    return None
+
+
+def stream_agent_text(agent_id, content, name=None):
+    """
+    Yield an agent's reply text in chunks as the run streams.
+    Iterate it to the end on one thread: tool calls run in the iterating thread.
+    """
+    from azure.ai.agents.models import ThreadMessageOptions, MessageDeltaChunk, AgentStreamEvent, ThreadRun
+    client = get_agents_client()
+    with span("agent.run", agent=name, agent_id=agent_id, tool_calls=0, stream=True) as run_span:
+        with span("agent.threads.create", agent=name):
+            thread = client.threads.create(messages=[ThreadMessageOptions(role="user", content=content)])
+        started = time.perf_counter()
+        replied = False
+        with client.runs.stream(thread_id=thread.id, agent_id=agent_id) as stream:
+            for event_type, event_data, _ in stream:
+                if isinstance(event_data, MessageDeltaChunk):
+                    if event_data.text:
+                        if "first_token_seconds" not in run_span.attributes:
+                            run_span.set(first_token_seconds=round(time.perf_counter() - started, 4))
+                        replied = True
+                        yield event_data.text
+                elif event_type == AgentStreamEvent.THREAD_RUN_COMPLETED and isinstance(event_data, ThreadRun):
+                    _record_run(run_span, event_data)
+                elif event_type == AgentStreamEvent.ERROR:
+                    raise RuntimeError(f"Agent run failed: {event_data}")
+        if not replied:
+            fallback(f"{name or agent_id}: no reply")
+
+
+def get_metrics():
+    """Snapshot of client, credential and token counters for this process."""
+    with _lock:
+        return dict(_metrics)
+
+
+def close():
+    global _client, _credential
+    with _lock:
+        client, credential = _client, _credential
+        _client, _credential = None, None
+    if client is not None:
+        client.close()
+    if credential is not None:
+        credential.close()
+
+
+atexit.register(close)
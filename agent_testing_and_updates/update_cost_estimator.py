@@ -17,7 +17,7 @@ COST_ESTIMATOR_AGENT_ID = os.getenv("COST_ESTIMATOR_AGENT_ID")
 def get_procedure_cost_tool(procedure: str, coverage_percent: str = "0") -> str:
     """
     Look up the cost of a dental procedure and calculate patient out-of-pocket cost.
-    :param procedure: Name or keyword of the procedure (e.g. cleaning, root canal, crown, extraction, wisdom tooth, filling, braces, denture, x-ray, implant, sealant, veneer, fluoride, exam).
+    :param procedure: Name, keyword, everyday phrasing or CDT code of the procedure (e.g. cleaning, root canal, crown, tooth pulled, wisdom teeth, cavity filling, braces, dentures, x-ray, implant, D2740).
     :param coverage_percent: Insurance coverage percentage as a number 0-100 (e.g. '80' for 80% coverage). Default '0' for no insurance.
     :return: Cost estimate and out-of-pocket calculation.
     """
@@ -14,13 +14,15 @@ AZURE_AI_PROJECT_ENDPOINT = os.getenv("AZURE_AI_PROJECT_ENDPOINT")
 PROVIDER_FINDER_AGENT_ID = os.getenv("PROVIDER_FINDER_AGENT_ID")
 
 
-def search_providers_tool(city: str = "", specialty: str = "", network: str = "", accepting_new: str = "true") -> str:
+def search_providers_tool(city: str = "", specialty: str = "", network: str = "", accepting_new: str = "true", near: str = "", radius_miles: str = "25") -> str:
     """
-    Search for dental providers by city, specialty, and network.
+    Search for dental providers by city, specialty, and network, or nearest to a location.
     :param city: City name to filter by (e.g. Cadillac, Traverse City). Leave empty for all cities.
     :param specialty: Specialty to filter by (e.g. General Dentist, Orthodontist, Endodontist, Prosthodontist). Leave empty for all.
     :param network: Network to filter by (e.g. Delta Dental PPO, Delta Dental Premier). Leave empty for all.
     :param accepting_new: Filter by accepting new patients. Use 'true' or 'false'. Default 'true'.
+    :param near: Zip code, city, or 'lat,lon' to search around, nearest first (e.g. 49684). Use this for "near me" / "near <zip>" requests.
+    :param radius_miles: Maximum distance in miles when 'near' is set. Default '25'.
     :return: Matching providers as formatted text.
     """
     return ""  # Dummy — only need the schema
@@ -0,0 +1,147 @@
+# Semantic answer cache in front of run_orchestrator
+# Entries are (plan, intents, normalized query embedding) -> final answer. A new question under
+# the same plan whose embedding has cosine similarity >= ANSWER_CACHE_THRESHOLD with a cached
+# one gets the stored answer back without any agent runs. When the caller already knows the
+# intents, only entries with the same intents can match.
+# Entries expire after ANSWER_CACHE_TTL seconds; past ANSWER_CACHE_SIZE entries the least
+# recently used one is evicted. The whole cache is dropped when the data version changes:
+# (ingest index version, provider data hash, procedure cost data hash); a part that is None
+# (data not loaded yet) matches any value.
+# run_orchestrator does not store answers whose task graph reported a fallback (degraded branch).
+
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+# 0 disables the cache
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+INGEST_MANIFEST = os.getenv("INGEST_MANIFEST", os.path.join(os.getenv("LOCAL_INDEX_DIR", "local_index"), "manifest.json"))
+
+_manifest_version = (None, None)  # (mtime, version)
+
+
+def data_hash(data):
+    """Short content hash of JSON-serializable data (provider list, procedure list)."""
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def index_version(path=INGEST_MANIFEST):
+    """The "version" ingest.py writes to its manifest; re-read only when the file changes."""
+    global _manifest_version
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    if _manifest_version[0] != mtime:
+        try:
+            with open(path, encoding="utf-8") as f:
+                version = json.load(f).get("version")
+        except (OSError, ValueError):
+            version = None
+        _manifest_version = (mtime, version)
+    return _manifest_version[1]
+
+
+class AnswerCache:
+    def __init__(self, threshold=ANSWER_CACHE_THRESHOLD, ttl=ANSWER_CACHE_TTL, max_entries=ANSWER_CACHE_SIZE):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()   # id -> entry dict, least recently used first
+        self.data_version = None
+        self._next_id = 0
+        self._matrices = {}            # plan -> (ids, stacked vectors), rebuilt after changes
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def _check_version(self, data_version):
+        if isinstance(data_version, tuple) and isinstance(self.data_version, tuple) \
+                and len(data_version) == len(self.data_version):
+            # None marks a part that is not loaded yet (or again): entries cannot depend on data
+            # that was never loaded, so only a part changing between two known values counts
+            data_version = tuple(self.data_version[i] if part is None else part for i, part in enumerate(data_version))
+            if all(old is None or old == new for old, new in zip(self.data_version, data_version)):
+                self.data_version = data_version
+                return
+        if data_version != self.data_version:
+            if self.entries:
+                self.stats["invalidations"] += 1
+            self.entries.clear()
+            self._matrices.clear()
+            self.data_version = data_version
+
+    def _matrix(self, plan):
+        if plan not in self._matrices:
+            ids = [i for i, e in self.entries.items() if e["plan"] == plan]
+            vectors = np.stack([self.entries[i]["vector"] for i in ids]) if ids else None
+            self._matrices[plan] = (ids, vectors)
+        return self._matrices[plan]
+
+    def _remove(self, entry_id):
+        entry = self.entries.pop(entry_id)
+        self._matrices.pop(entry["plan"], None)
+
+    def lookup(self, plan, vector, data_version, intents=None):
+        """Best cached entry for this plan (and intents, if given) above the threshold, or None."""
+        if not self.enabled:
+            return None
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        now = time.time()
+        with self._lock:
+            self._check_version(data_version)
+            ids, vectors = self._matrix(plan)
+            if vectors is not None:
+                scores = vectors @ query
+                for position in np.argsort(-scores):
+                    score = float(scores[position])
+                    if score < self.threshold:
+                        break
+                    entry_id = ids[position]
+                    entry = self.entries[entry_id]
+                    if now - entry["created"] > self.ttl:
+                        self._remove(entry_id)
+                        self.stats["expirations"] += 1
+                        continue
+                    if intents is not None and entry["intents"] != tuple(intents):
+                        continue
+                    self.entries.move_to_end(entry_id)
+                    self.stats["hits"] += 1
+                    return dict(entry, score=score)
+            self.stats["misses"] += 1
+            return None
+
+    def store(self, plan, intents, vector, query, answer, data_version):
+        if not self.enabled:
+            return
+        vector = np.asarray(vector, dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        with self._lock:
+            self._check_version(data_version)
+            entry_id = self._next_id
+            self._next_id += 1
+            self.entries[entry_id] = {
+                "plan": plan, "intents": tuple(intents), "vector": vector,
+                "query": query, "answer": answer, "created": time.time(),
+            }
+            self._matrices.pop(plan, None)
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+                self.stats["evictions"] += 1
+
+    def report(self):
+        with self._lock:
+            stats = dict(self.stats, entries=len(self.entries))
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
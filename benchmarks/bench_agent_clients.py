@@ -0,0 +1,76 @@
+"""
+Per-call AgentsClient + credential (the old pattern) vs the shared agent_clients layer,
+for N agent calls spread over concurrent threads. Offline: the credential is a stand-in that
+sleeps --token-latency per token fetch (what a DefaultAzureCredential chain / az CLI call
+costs), and no requests are sent, so this measures only the per-call setup overhead.
+
+    python -m benchmarks.bench_agent_clients --calls 200 --threads 8
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from azure.core.credentials import AccessToken
+from azure.ai.agents import AgentsClient
+import agent_clients
+
+ENDPOINT = "https://example.services.ai.azure.com/api/projects/bench"
+SCOPE = "https://ai.azure.com/.default"
+
+
+class SlowCredential:
+    fetches = 0
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def get_token(self, *scopes, **kwargs):
+        SlowCredential.fetches += 1
+        time.sleep(self.latency)
+        return AccessToken("token", int(time.time()) + 3600)
+
+    def close(self):
+        pass
+
+
+def per_call(latency):
+    client = AgentsClient(endpoint=ENDPOINT, credential=SlowCredential(latency))
+    with client:
+        client._config.credential.get_token(SCOPE)  # every new client starts without a token
+
+
+def shared(latency):
+    client = agent_clients.get_agents_client()
+    client._config.credential.get_token(SCOPE)
+
+
+def run(fn, calls, threads, latency):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda _: fn(latency), range(calls)))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--token-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    SlowCredential.fetches = 0
+    elapsed = run(per_call, args.calls, args.threads, args.token_latency)
+    print(f"per-call: {elapsed * 1000:8.1f} ms total, {elapsed / args.calls * 1000:6.2f} ms/call, "
+          f"{args.calls} clients, {SlowCredential.fetches} token fetches")
+
+    SlowCredential.fetches = 0
+    agent_clients.AZURE_AI_PROJECT_ENDPOINT = ENDPOINT
+    agent_clients._credential = agent_clients.CachedCredential(SlowCredential(args.token_latency))
+    elapsed = run(shared, args.calls, args.threads, args.token_latency)
+    metrics = agent_clients.get_metrics()
+    print(f"shared:   {elapsed * 1000:8.1f} ms total, {elapsed / args.calls * 1000:6.2f} ms/call, "
+          f"{metrics['clients_created']} clients, {metrics['token_fetches']} token fetches, "
+          f"{metrics['token_cache_hits']} cache hits")
+
+
+if __name__ == "__main__":
+    main()
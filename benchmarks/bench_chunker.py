@@ -0,0 +1,101 @@
+"""
+Structure-aware chunker (chunker.py) vs the recursive character splitter on the plan files in data/.
+For each: the first run in a fresh process (module import + one pass, what one ingest.py run
+pays), the time per pass once warm, chunk count and size in tokens, and how many benefit table
+rows ("Endodontic Services – root canals 50% 50% 50%") end up in a chunk without the table
+heading they sit under ("Basic Services"). "recursive, new splitter" builds the splitter on
+every call, as ingest.chunk_text used to do. The structure chunker reads every line in Python,
+so once warm it is slower per pass than the recursive splitter; it is the default for the
+chunks it makes, not for speed.
+
+    python -m benchmarks.bench_chunker --repeat 20 --chunk-tokens 350
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+os.environ.setdefault("FAKE_SERVICES", "openai")
+
+import numpy as np
+from chunker import chunk_document, count_tokens, CHUNK_TOKENS
+from coverage_table import ROW_RE, TABLE_START_RE, TABLE_END_RE, DASH_RE
+from fake_services.storage import FakeContainerClient
+from ingest import parse_file, chunk_text, _recursive_splitter, CHUNK_SIZE
+
+
+def load_texts():
+    container = FakeContainerClient("dentalplanpdfs")
+    texts = []
+    for name, path in container._paths().items():
+        with open(path, "rb") as f:
+            texts.append(parse_file(name, f.read()))
+    return [t for t in texts if t]
+
+
+def table_rows(text):
+    """(row line, table heading) pairs of a plan's benefit table, read straight from the text."""
+    rows, heading, in_table = [], None, False
+    for line in text.splitlines():
+        line = " ".join(line.split())
+        if not in_table:
+            in_table = bool(TABLE_START_RE.search(line))
+        elif TABLE_END_RE.search(line):
+            in_table = False
+        elif ROW_RE.match(line):
+            if heading:
+                rows.append((line, heading))
+        elif line and not DASH_RE.search(line) and not ROW_RE.search(line) and len(line.split()) <= 4:
+            heading = line
+    return rows
+
+
+def split_rows(texts, chunk_lists):
+    """Table rows whose chunk does not also hold their heading."""
+    split = total = 0
+    for text, chunks in zip(texts, chunk_lists):
+        chunks = [" ".join(c.split()) for c in chunks]
+        for row, heading in table_rows(text):
+            total += 1
+            split += not any(row in c and heading in c for c in chunks)
+    return split, total
+
+
+def import_ms(module):
+    """Time to import a module in a fresh interpreter, in milliseconds."""
+    code = f"import time; start = time.perf_counter(); import {module}; print((time.perf_counter() - start) * 1000)"
+    return float(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout)
+
+
+def run(label, module, chunk, texts, repeat):
+    start = time.perf_counter()
+    chunk_lists = [chunk(t) for t in texts]  # first pass (regex compilation, splitter setup)
+    first_ms = import_ms(module) + (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for _ in range(repeat):
+        chunk_lists = [chunk(t) for t in texts]
+    elapsed_ms = (time.perf_counter() - start) / repeat * 1000
+    tokens = np.array([count_tokens(c) for chunks in chunk_lists for c in chunks])
+    split, total = split_rows(texts, chunk_lists)
+    print(f"  {label:<26} {first_ms:>8.1f}ms {elapsed_ms:>7.2f}ms {len(tokens):>7} {tokens.mean():>8.0f} "
+          f"{tokens.max():>7} {split:>6}/{total}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20, help="Passes over the corpus per chunker")
+    parser.add_argument("--chunk-tokens", type=int, default=CHUNK_TOKENS)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Characters per recursive chunk")
+    args = parser.parse_args()
+
+    texts = load_texts()
+    print(f"{len(texts)} documents, {sum(len(t) for t in texts):,} characters, {args.repeat} passes")
+    print(f"  {'chunker':<26} {'first run':>10} {'warm':>9} {'chunks':>7} {'mean tok':>8} {'max tok':>7} "
+          f"{'rows split from heading':>6}")
+    run(f"structure ({args.chunk_tokens} tokens)", "chunker",
+        lambda t: [c["text"] for c in chunk_document(t, args.chunk_tokens)], texts, args.repeat)
+    run(f"recursive ({args.chunk_size} chars)", "langchain_text_splitters",
+        lambda t: chunk_text(t, args.chunk_size), texts, args.repeat)
+    run("recursive, new splitter", "langchain_text_splitters",
+        lambda t: _recursive_splitter.__wrapped__(args.chunk_size, 200).split_text(t), texts, args.repeat)
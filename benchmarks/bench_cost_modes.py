@@ -0,0 +1,97 @@
+"""
+Latency and model round trips per cost question, for each way of answering it:
+    agent              coverage agent → cost agent for PPO → cost agent for Premier
+    table + agent      coverage table lookup → cost agent per tier
+    deterministic      coverage table lookup → cost_answer computed locally
+    deterministic+LLM  same, plus one call that only rewords the final text
+The coverage table is parsed from the plan PDFs in data/, procedures come from
+data/procedure_costs.json; every model call is a fake that sleeps --llm-latency seconds.
+
+    python -m benchmarks.bench_cost_modes --llm-latency 2.0
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from coverage_table import parse_coverage_table, save_coverage_table, lookup_coverage
+from cost_answer import answer_cost_question
+from pdf_text import extract_text
+from procedure_index import ProcedureIndex
+from request_graph import build_request_graph
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+PLANS = ["baseplan.pdf", "premiumplan.pdf", "stateplan.pdf"]
+QUESTIONS = [
+    ("How much does a root canal cost?", "stateplan.pdf"),
+    ("What would I pay for a crown?", "premiumplan.pdf"),
+    ("How much is a filling with 2 surfaces? I've used $1,800 of my max", "premiumplan.pdf"),
+    ("Cost of getting wisdom teeth pulled", "baseplan.pdf"),
+    ("How much are braces for my kid?", "stateplan.pdf"),
+    ("Price of a dental implant", "baseplan.pdf"),
+    ("How much is a cleaning?", "premiumplan.pdf"),
+    ("What will dentures cost me?", "stateplan.pdf"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm-latency", type=float, default=2.0, help="Seconds per model round trip")
+    args = parser.parse_args()
+
+    with open(os.path.join(DATA_DIR, "procedure_costs.json"), encoding="utf-8") as f:
+        index = ProcedureIndex(json.load(f)["procedures"])
+    table_path = os.path.join(tempfile.mkdtemp(), "coverage_table.json")
+    plans = {}
+    for plan in PLANS:
+        with open(os.path.join(DATA_DIR, plan), "rb") as f:
+            plans[plan] = parse_coverage_table(extract_text(f.read()))
+    save_coverage_table(plans, 1, table_path)
+
+    calls = {"count": 0}
+    lock = threading.Lock()
+
+    def model_call(reply):
+        with lock:
+            calls["count"] += 1
+        time.sleep(args.llm_latency)
+        return reply
+
+    base = {
+        "classify_intent": lambda query: "cost_estimate",  # local classifier hit
+        "coverage": lambda query, plan: model_call("Delta Dental PPO dentists 50%, Delta Dental Premier dentists 40%."),
+        "provider": lambda query: model_call(""),
+        "cost": lambda query, plan: model_call("Estimated out-of-pocket: $600"),
+    }
+    table = lambda query, plan: lookup_coverage(query, plan, table_path)
+    modes = {
+        "agent": base,
+        "table + agent": dict(base, coverage_table=table),
+        "deterministic": dict(base, coverage_table=table,
+                              cost_answer=lambda query, coverage: answer_cost_question(query, coverage, index)),
+        "deterministic+LLM": dict(base, coverage_table=table, cost_answer=lambda query, coverage: answer_cost_question(
+            query, coverage, index, reword=lambda question, answer: model_call(answer))),
+    }
+
+    print(f"{len(QUESTIONS)} cost questions, {args.llm_latency:.1f}s per model round trip\n")
+    print(f"{'mode':<20} {'round trips':>12} {'mean latency':>13}")
+    for name, agents in modes.items():
+        calls["count"] = 0
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):  # per-request progress lines
+            for question, plan in QUESTIONS:
+                asyncio.run(build_request_graph(question, plan, agents).run())
+        elapsed = (time.perf_counter() - start) / len(QUESTIONS)
+        print(f"{name:<20} {calls['count'] / len(QUESTIONS):>12.1f} {elapsed:>12.3f}s")
+
+    print("\nSample deterministic answer:\n")
+    question, plan = QUESTIONS[0]
+    print(answer_cost_question(question, lookup_coverage(question, plan, table_path), index))
+
+
+if __name__ == "__main__":
+    main()
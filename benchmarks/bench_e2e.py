@@ -0,0 +1,305 @@
+"""
+End-to-end latency of run_orchestrator over a fixed query set, one group per intent path:
+coverage, comparison, provider, cost, multi-intent and general.
+
+    python -m benchmarks.bench_e2e                          local stand-ins (FAKE_SERVICES=1) with the
+                                                            latencies in benchmarks/latency_profile.json
+    python -m benchmarks.bench_e2e --backend real           the Azure services configured in .env
+    python -m benchmarks.bench_e2e --backend real --record benchmarks/latency_profile.json
+                                                            ...and save their measured latencies as the profile
+    python -m benchmarks.bench_e2e --compare benchmarks/results/e2e_<commit>_fake.json
+
+The fake backend is hermetic: it ingests data/ into a temporary fake index first. The answer
+cache is off, the embedding cache is memory-only and router labels are not logged, so repeated
+queries and repeated runs measure the same path.
+Reports p50/p95/p99 total latency and p50 time to first token per path, p50/p95 per task graph
+stage, and model calls (agent runs + chat completions), embeddings and searches per query.
+Results go to benchmarks/results/e2e_<commit>_<backend>.json; --compare diffs two result files.
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+import threading
+import contextlib
+import subprocess
+import io
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PROFILE = os.path.join(ROOT, "benchmarks", "latency_profile.json")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+QUERIES = [
+    ("coverage", "What does my plan cover for a crown?", "baseplan.pdf"),
+    ("coverage", "Is there a deductible for fillings?", "premiumplan.pdf"),
+    ("coverage", "What is the annual maximum?", "stateplan.pdf"),
+    ("comparison", "What is the difference between the base and premium plans for root canals?", None),
+    ("comparison", "Compare orthodontic coverage between the plans", None),
+    ("provider", "Find a dentist in Cadillac", "baseplan.pdf"),
+    ("provider", "Find an orthodontist near 49684", "baseplan.pdf"),
+    ("provider", "Is there an endodontist in Traverse City accepting new patients?", "stateplan.pdf"),
+    ("cost", "How much does a root canal cost?", "stateplan.pdf"),
+    ("cost", "What would I pay for a crown?", "premiumplan.pdf"),
+    ("cost", "How much is a cleaning?", "baseplan.pdf"),
+    ("multi-intent", "What does my plan cover for a crown, how much will it cost, and find a dentist in Cadillac", "baseplan.pdf"),
+    ("multi-intent", "Find a dentist in Lansing and tell me how much a filling costs", "premiumplan.pdf"),
+    ("general", "Hello", None),
+    ("general", "What can you help me with?", None),
+]
+PATHS = ["coverage", "comparison", "provider", "cost", "multi-intent", "general"]
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+class CallRecorder:
+    """Counts and times the calls each request makes to the services (real or fake)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.seconds = {}  # kind -> [durations], over the whole run
+
+    def reset(self):
+        with self.lock:
+            self.counts = {}
+
+    def add(self, kind, seconds=None):
+        with self.lock:
+            self.counts[kind] = self.counts.get(kind, 0) + 1
+            if seconds is not None:
+                self.seconds.setdefault(kind, []).append(seconds)
+
+    def timed(self, kind, fn):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(kind, time.perf_counter() - start)
+        return wrapper
+
+    def timed_stream(self, fn):
+        """Wrap runs.stream: time to the first text delta and the gaps between deltas."""
+        recorder = self
+
+        class Stream:
+            def __init__(self, inner):
+                self.inner = inner
+
+            def __enter__(self):
+                self.events = self.inner.__enter__()
+                return self
+
+            def __exit__(self, *exc):
+                return self.inner.__exit__(*exc)
+
+            def __iter__(self):
+                start = last = time.perf_counter()
+                for event in self.events:
+                    if type(event[1]).__name__ == "MessageDeltaChunk":
+                        now = time.perf_counter()
+                        recorder.add("token_gap" if last != start else "agent_first_token", now - last)
+                        last = now
+                    yield event
+
+        def wrapper(*args, **kwargs):
+            self.add("agent_run")
+            return Stream(fn(*args, **kwargs))
+        return wrapper
+
+    def instrument(self):
+        import coverage_agent
+        from agent_clients import get_agents_client
+        agents_client = get_agents_client()
+        agents_client.create_thread_and_process_run = self.timed("agent_run", agents_client.create_thread_and_process_run)
+        agents_client.runs.stream = self.timed_stream(agents_client.runs.stream)
+        openai_client = coverage_agent.get_openai_client()
+        openai_client.embeddings.create = self.timed("embedding", openai_client.embeddings.create)
+        openai_client.chat.completions.create = self.timed("chat", openai_client.chat.completions.create)
+        coverage_agent.search_chunks = self.timed("search", coverage_agent.search_chunks)
+
+
+def configure(args, workdir):
+    """Environment for the chosen backend; must run before the app modules are imported."""
+    os.environ.setdefault("ANSWER_CACHE_SIZE", "0")
+    os.environ.setdefault("EMBEDDING_CACHE_DIR", "")
+    os.environ.setdefault("INTENT_LOG", "")  # router labels would retrain the local classifier between runs
+    if args.backend != "fake":
+        return {}
+    with open(args.profile, encoding="utf-8") as f:
+        profile = {key: value for key, value in json.load(f).items() if key.startswith("FAKE_")}
+    os.environ["FAKE_SERVICES"] = "1"
+    os.environ["FAKE_DATA_DIR"] = os.path.join(ROOT, "data")
+    os.environ["FAKE_SERVICES_DIR"] = os.path.join(workdir, "fake_services")
+    os.environ["LOCAL_INDEX_DIR"] = os.path.join(workdir, "local_index")
+    os.environ["INGEST_MANIFEST"] = os.path.join(workdir, "local_index", "manifest.json")
+    os.environ["COVERAGE_TABLE"] = os.path.join(workdir, "local_index", "coverage_table.json")
+    for key, value in profile.items():
+        os.environ[key] = str(value)
+    return profile
+
+
+def record_profile(recorder, path):
+    """Save the measured service latencies as FAKE_* settings for the fake backend."""
+    from resources import load_times
+    seconds = recorder.seconds
+    median = lambda kind: round(percentile(seconds.get(kind, []), 0.5), 4)
+    loads = [t for name, t in load_times().items() if name in ("providers", "procedures") and t]
+    profile = {
+        "_source": f"recorded from --backend real at {git_commit()} on {time.strftime('%Y-%m-%d')}",
+        # Streamed runs that call a tool spend two model turns before their first token
+        "FAKE_AGENT_LATENCY": round(median("agent_first_token") / 2, 4),
+        "FAKE_TOKEN_INTERVAL": median("token_gap"),
+        "FAKE_OPENAI_LATENCY": median("embedding"),
+        "FAKE_SEARCH_LATENCY": median("search"),
+        "FAKE_BLOB_LATENCY": round(max(loads), 4) if loads else 0.0,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=2)
+        f.write("\n")
+    print(f"\nLatency profile written to {path}")
+
+
+def run_queries(args, recorder):
+    import orchestrator
+    graphs = []
+    build = orchestrator.build_request_graph
+
+    def capture(*a, **kw):
+        graphs.append(build(*a, **kw))
+        return graphs[-1]
+    orchestrator.build_request_graph = capture
+
+    records = []
+    for repeat in range(args.repeat):
+        for path, query, plan in QUERIES:
+            recorder.reset()
+            graphs.clear()
+            with contextlib.redirect_stdout(io.StringIO()):
+                orchestrator.run_orchestrator(query, plan)
+            graph = graphs[-1] if graphs else None
+            counts = recorder.counts
+            records.append({
+                "path": path, "query": query, "plan": plan, "repeat": repeat,
+                "total": orchestrator.latency["total"][-1],
+                "ttft": orchestrator.latency["ttft"][-1],
+                "intents": graph.results.get("plan") if graph else None,
+                "stages": {name: finished - started for name, started, finished in graph.timings()} if graph else {},
+                "model_calls": counts.get("agent_run", 0) + counts.get("chat", 0),
+                "agent_runs": counts.get("agent_run", 0),
+                "chat_calls": counts.get("chat", 0),
+                "embeddings": counts.get("embedding", 0),
+                "searches": counts.get("search", 0),
+            })
+    return records
+
+
+def summarize(records):
+    summary = {"paths": {}, "stages": {}}
+    for path in PATHS + ["all"]:
+        rows = [r for r in records if path in ("all", r["path"])]
+        if not rows:
+            continue
+        totals = [r["total"] for r in rows]
+        summary["paths"][path] = {
+            "queries": len(rows),
+            "p50": percentile(totals, 0.5), "p95": percentile(totals, 0.95), "p99": percentile(totals, 0.99),
+            "ttft_p50": percentile([r["ttft"] for r in rows], 0.5),
+            "model_calls": sum(r["model_calls"] for r in rows) / len(rows),
+            "embeddings": sum(r["embeddings"] for r in rows) / len(rows),
+            "searches": sum(r["searches"] for r in rows) / len(rows),
+        }
+    stages = {}
+    for r in records:
+        for name, seconds in r["stages"].items():
+            # coverage:baseplan.pdf / coverage:premiumplan.pdf are one stage for reporting
+            stages.setdefault(name.split(":")[0] if name.endswith(".pdf") else name, []).append(seconds)
+    summary["stages"] = {name: {"runs": len(v), "p50": percentile(v, 0.5), "p95": percentile(v, 0.95)}
+                         for name, v in stages.items()}
+    return summary
+
+
+def print_summary(summary):
+    print(f"\n{'path':<14} {'n':>3} {'p50':>7} {'p95':>7} {'p99':>7} {'ttft p50':>9} {'model calls':>12} {'embeds':>7} {'searches':>9}")
+    for path, s in summary["paths"].items():
+        print(f"{path:<14} {s['queries']:>3} {s['p50']:>6.2f}s {s['p95']:>6.2f}s {s['p99']:>6.2f}s {s['ttft_p50']:>8.2f}s "
+              f"{s['model_calls']:>12.1f} {s['embeddings']:>7.1f} {s['searches']:>9.1f}")
+    print(f"\n{'stage':<16} {'runs':>5} {'p50':>7} {'p95':>7}")
+    for name, s in sorted(summary["stages"].items(), key=lambda item: -item[1]["p50"]):
+        print(f"{name:<16} {s['runs']:>5} {s['p50']:>6.2f}s {s['p95']:>6.2f}s")
+
+
+def compare(old_path, summary):
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    print(f"\nvs {old_path} ({old.get('commit')}, {old.get('backend')})")
+    print(f"{'path':<14} {'p50':>16} {'p95':>16} {'model calls':>14}")
+    for path, s in summary["paths"].items():
+        before = old["summary"]["paths"].get(path)
+        if not before:
+            continue
+        delta = lambda key: f"{s[key] - before[key]:+.2f}s ({(s[key] / before[key] - 1) * 100 if before[key] else 0:+.0f}%)"
+        print(f"{path:<14} {delta('p50'):>16} {delta('p95'):>16} {s['model_calls'] - before['model_calls']:>+14.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", choices=["fake", "real"], default="fake")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, help="FAKE_* latencies for the fake backend")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the query set")
+    parser.add_argument("--record", metavar="PROFILE", help="Save the measured latencies as a profile (real backend)")
+    parser.add_argument("--out", help="Results JSON (default benchmarks/results/e2e_<commit>_<backend>.json)")
+    parser.add_argument("--compare", metavar="RESULTS", help="Earlier results JSON to diff against")
+    args = parser.parse_args()
+    if args.record and args.backend != "real":
+        parser.error("--record measures the real services; use it with --backend real")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        profile = configure(args, workdir)
+        if args.backend == "fake":
+            import ingest
+            with contextlib.redirect_stdout(io.StringIO()):
+                ingest.ingest()
+        recorder = CallRecorder()
+        recorder.instrument()
+
+        # Load data, clients and the intent model before anything is timed
+        import orchestrator
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            orchestrator.warm_up().join()
+        print(f"backend: {args.backend}, warm-up {time.perf_counter() - start:.2f}s, "
+              f"{len(QUERIES)} queries x {args.repeat}")
+
+        records = run_queries(args, recorder)
+        summary = summarize(records)
+        print_summary(summary)
+        if args.record:
+            record_profile(recorder, args.record)
+
+    commit = git_commit()
+    out = args.out or os.path.join(RESULTS_DIR, f"e2e_{commit}_{args.backend}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({"commit": commit, "backend": args.backend, "profile": profile, "repeat": args.repeat,
+                   "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "summary": summary, "queries": records}, f, indent=2)
+    print(f"\nResults written to {out}")
+    if args.compare:
+        compare(args.compare, summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Tune EMBED_BATCH_SIZE / EMBED_MAX_WORKERS for ingest.embed_chunks against the
+local fake embeddings endpoint (benchmarks/fake_embedding_server.py).
+
+    python -m benchmarks.bench_embedding --chunks 2000 --rps 10
+"""
+import argparse
+import os
+import time
+from benchmarks.fake_embedding_server import start_server
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, action="append", help="Batch size to try (repeatable)")
+    parser.add_argument("--workers", type=int, action="append", help="Concurrency to try (repeatable)")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--rps", type=int, default=0, help="Fake server requests/second before 429")
+    args = parser.parse_args()
+
+    server, stats = start_server(latency=args.latency, requests_per_second=args.rps)
+    os.environ["AZURE_OPENAI_ENDPOINT"] = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ["OPENAI_API_KEY"] = "fake"
+    os.environ.setdefault("AZURE_EMBEDDING_DEPLOYMENT", "text-embedding-ada-002")
+
+    import ingest  # after the env points at the fake server
+
+    chunks = [f"Synthetic plan chunk {i}: Endodontic Services – root canals 50% 50% 50%" for i in range(args.chunks)]
+    print(f"\n{'batch':>6} {'workers':>8} {'chunks/s':>10} {'requests':>9} {'429s':>6}")
+    for batch_size in args.batch_size or [1, 16, 64, 256]:
+        for workers in args.workers or [1, 4, 8]:
+            stats.update(requests=0, items=0, throttled=0)
+            start = time.perf_counter()
+            count = sum(1 for _ in ingest.embed_chunks(chunks, batch_size=batch_size, max_workers=workers))
+            rate = count / (time.perf_counter() - start)
+            print(f"{batch_size:>6} {workers:>8} {rate:>10,.1f} {stats['requests']:>9} {stats['throttled']:>6}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
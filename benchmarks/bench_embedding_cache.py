@@ -0,0 +1,89 @@
+"""
+Query embedding cache (embedding_cache.py) on a coverage-agent workload, against the local
+fake embeddings endpoint. The workload mixes the orchestrator's canned coverage prompts
+(make_coverage_query categories and the cost-chain prompt) with one-off questions.
+Runs two processes on the same cache directory: a cold one, then a fresh one that starts
+from the on-disk tier.
+
+    python -m benchmarks.bench_embedding_cache --queries 300 --latency 0.1
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.fake_embedding_server import start_server
+
+CATEGORIES = [
+    "Diagnostic and Preventive Services", "Minor Restorative Services", "Major Restorative Services",
+    "Endodontic Services", "Oral Surgery Services", "Orthodontic Services", "Prosthodontic Services",
+    "Radiographs", "Periodontic Services", "Sealants", "Veneers",
+]
+COST_QUESTIONS = ["How much is a crown?", "What does a root canal cost?", "How much are braces for my kid?",
+                  "Cost of a cleaning", "how much is a filling"]
+
+
+def workload(count, seed):
+    rng = random.Random(seed)
+    queries = []
+    for i in range(count):
+        roll = rng.random()
+        if roll < 0.6:
+            queries.append(f"What is the coverage percentage for {rng.choice(CATEGORIES)}? "
+                           "Include deductible and annual maximum.")
+        elif roll < 0.85:
+            queries.append(f"What is the coverage percentage for {rng.choice(COST_QUESTIONS)}? Provide the "
+                           "percentage for both Delta Dental PPO dentists and Delta Dental Premier dentists separately.")
+        else:
+            queries.append(f"Is procedure number {seed}-{i} covered on my plan?")
+    return queries
+
+
+def run_phase(label, count, seed):
+    import coverage_agent  # after the env points at the fake server and cache dir
+
+    cache = coverage_agent.embedding_cache.get()
+    start = time.perf_counter()
+    for query in workload(count, seed):
+        cache.get_or_embed(query, coverage_agent.embed_query)
+    elapsed = time.perf_counter() - start
+    report = cache.report()
+    print(f"{label:<6} {count:>7} {elapsed:>8.2f}s {report['hit_rate']:>8.0%} {report['memory_hits']:>7} "
+          f"{report['disk_hits']:>6} {report['misses']:>7} {report['saved_seconds']:>9.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--phase", help=argparse.SUPPRESS)
+    parser.add_argument("--seed", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.phase:
+        run_phase(args.phase, args.queries, args.seed)
+        return
+
+    server, stats = start_server(latency=args.latency)
+    env = dict(
+        os.environ,
+        AZURE_OPENAI_ENDPOINT=f"http://127.0.0.1:{server.server_address[1]}",
+        OPENAI_API_KEY="fake",
+        AZURE_EMBEDDING_DEPLOYMENT=os.getenv("AZURE_EMBEDDING_DEPLOYMENT", "text-embedding-ada-002"),
+        EMBEDDING_CACHE_DIR=tempfile.mkdtemp(prefix="embedding_cache_"),
+    )
+    print(f"{'run':<6} {'queries':>7} {'time':>9} {'hit rate':>8} {'memory':>7} {'disk':>6} {'misses':>7} {'saved':>10}")
+    for label, seed in (("cold", 1), ("warm", 2)):
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_embedding_cache", "--phase", label,
+             "--queries", str(args.queries), "--seed", str(seed)],
+            env=env, check=True,
+        )
+    print(f"\nembedding requests served by the fake endpoint: {stats['requests']} for {2 * args.queries} queries")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Recall and latency of reduced-dimension embeddings on the local stand-in.
+Chunks the plan files in data/ like ingest.py, embeds them through the fake Azure OpenAI
+client at each size (the `dimensions` parameter), and searches with queries cut from the
+chunks themselves (a few words dropped), so the chunk a query came from is the right answer.
+Reports recall@k, index memory and embed / search latency per size.
+
+    python -m benchmarks.bench_embedding_dimensions --dims 256 --dims 512 --dims 1536
+"""
+import os
+import time
+import random
+import argparse
+
+os.environ.setdefault("FAKE_SERVICES", "openai")
+
+import numpy as np
+from services import openai_client
+from vector_store import BruteForceIndex, normalize
+from fake_services.storage import FakeContainerClient
+from ingest import parse_file, split_document
+
+
+def load_chunks():
+    container = FakeContainerClient("dentalplanpdfs")
+    chunks = []
+    for name, path in container._paths().items():
+        with open(path, "rb") as f:
+            text = parse_file(name, f.read())
+        chunks.extend(chunk["text"] for chunk in (split_document(text) if text else []))
+    return chunks
+
+
+def make_queries(chunks, count, length, drop, rng):
+    """(query, chunk row) pairs: a window of words from a chunk with some words dropped."""
+    queries = []
+    for _ in range(count):
+        row = rng.randrange(len(chunks))
+        words = chunks[row].split()
+        start = rng.randrange(max(1, len(words) - length))
+        window = [w for w in words[start:start + length] if rng.random() >= drop]
+        queries.append((" ".join(window), row))
+    return queries
+
+
+def embed(client, texts, dimensions, batch_size=64):
+    vectors = []
+    for i in range(0, len(texts), batch_size):
+        response = client.embeddings.create(input=texts[i:i + batch_size], model="bench", dimensions=dimensions)
+        vectors.extend(item.embedding for item in response.data)
+    return normalize(vectors)
+
+
+def run(chunks, queries, dimensions, top):
+    client = openai_client()
+    start = time.perf_counter()
+    index = BruteForceIndex(embed(client, chunks, dimensions))
+    ingest_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    query_vectors = [embed(client, [q], dimensions)[0] for q, _ in queries]
+    embed_us = (time.perf_counter() - start) / len(queries) * 1e6
+
+    start = time.perf_counter()
+    results = [index.search(v, top=top) for v in query_vectors]
+    search_us = (time.perf_counter() - start) / len(queries) * 1e6
+
+    hits = [row in {r for r, _ in found} for (_, row), found in zip(queries, results)]
+    first = [found and found[0][0] == row for (_, row), found in zip(queries, results)]
+    print(f"  {dimensions:>6} {index.vectors.nbytes / 2**10:>8.0f}KB {ingest_s:>8.2f}s {np.mean(first):>8.3f} "
+          f"{np.mean(hits):>9.3f} {embed_us:>10,.0f} {search_us:>10,.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dims", type=int, action="append", help="Embedding size (repeatable)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--words", type=int, default=12, help="Words per query window")
+    parser.add_argument("--drop", type=float, default=0.3, help="Fraction of window words dropped")
+    parser.add_argument("--top", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    chunks = load_chunks()
+    queries = make_queries(chunks, args.queries, args.words, args.drop, rng)
+    print(f"{len(chunks)} chunks, {len(queries)} queries of ~{args.words} words ({args.drop:.0%} dropped)")
+    print(f"  {'dims':>6} {'index':>10} {'ingest':>9} {'recall@1':>8} {f'recall@{args.top}':>9} "
+          f"{'embed µs':>10} {'search µs':>10}")
+    for dimensions in args.dims or [256, 512, 1536]:
+        run(chunks, queries, dimensions, args.top)
@@ -0,0 +1,62 @@
+"""
+Wall time of one multi-intent request (cost + provider + plan comparison) through the request
+task graph vs the same agent calls made one after another. Agents are fakes that sleep for a
+typical agent latency, so no Azure access is needed.
+
+    python -m benchmarks.bench_orchestrator_graph --router 1.0 --coverage 3.0 --provider 2.5 --cost 2.5
+"""
+import argparse
+import asyncio
+import time
+from request_graph import build_request_graph
+
+QUERY = "What is the difference between the plans for a crown, how much will it cost, and find a dentist in Detroit"
+PLAN = "baseplan.pdf"
+
+
+def fake_agents(args):
+    def classify_intent(query):
+        time.sleep(args.router)
+        return "coverage,provider_search,cost_estimate"
+
+    def coverage(query, plan_filter):
+        time.sleep(args.coverage)
+        return "Crowns: Delta Dental PPO dentists 50%, Delta Dental Premier dentists 60%."
+
+    def provider(query):
+        time.sleep(args.provider)
+        return "Dr. Example, General Dentist, Detroit"
+
+    def cost(query, plan_filter):
+        time.sleep(args.cost)
+        return "Estimated out-of-pocket: $600"
+
+    return {"classify_intent": classify_intent, "coverage": coverage, "provider": provider, "cost": cost}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--router", type=float, default=1.0, help="Seconds per router call")
+    parser.add_argument("--coverage", type=float, default=3.0, help="Seconds per coverage agent call")
+    parser.add_argument("--provider", type=float, default=2.5, help="Seconds per provider agent call")
+    parser.add_argument("--cost", type=float, default=2.5, help="Seconds per cost agent call")
+    args = parser.parse_args()
+
+    # Previous orchestrator: router, base + premium coverage, provider, coverage for cost, PPO cost, Premier cost
+    sequential = args.router + 3 * args.coverage + args.provider + 2 * args.cost
+    longest = args.router + max(args.coverage, args.provider, args.coverage + args.cost)
+
+    graph = build_request_graph(QUERY, PLAN, fake_agents(args))
+    start = time.perf_counter()
+    results = asyncio.run(graph.run())
+    elapsed = time.perf_counter() - start
+
+    print(f"\nintents: {results['plan']}")
+    graph.report()
+    print(f"\nsequential agent calls: {sequential:.2f}s")
+    print(f"longest branch:         {longest:.2f}s")
+    print(f"task graph:             {elapsed:.2f}s ({sequential / elapsed:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Compare serial vs page-parallel PDF extraction, and a warm parse cache.
+
+    python -m benchmarks.bench_pdf_parse
+    python -m benchmarks.bench_pdf_parse "pdfstoextract/detroit ppo.pdf"
+"""
+import sys
+import tempfile
+import time
+import pdf_text
+
+DEFAULT_PDF = "pdfstoextract/ddpremierproviders.pdf"
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"  {label:<24} {time.perf_counter() - start:8.3f} s")
+    return result
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PDF
+    with open(path, "rb") as f:
+        data = f.read()
+    print(f"{path} ({len(data) / 1024:,.0f} KB), {pdf_text.PARSE_PROCESSES} processes")
+
+    serial = timed("serial", lambda: pdf_text.extract_text(data, parallel=False, cache_dir=None))
+    # First parallel call pays for starting the pool; time it separately from steady state
+    timed("parallel (cold pool)", lambda: pdf_text.extract_text(data, parallel=True, cache_dir=None))
+    parallel = timed("parallel (warm pool)", lambda: pdf_text.extract_text(data, parallel=True, cache_dir=None))
+    assert serial == parallel, "parallel extraction must match serial output"
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        timed("parallel + cache fill", lambda: pdf_text.extract_text(data, cache_dir=cache_dir))
+        cached = timed("cache hit", lambda: pdf_text.extract_text(data, cache_dir=cache_dir))
+    assert cached == serial
+
+
+if __name__ == "__main__":
+    main()
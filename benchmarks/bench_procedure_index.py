@@ -0,0 +1,57 @@
+"""
+Lookup latency of ProcedureIndex vs the original substring scan, on the real catalog and
+on a synthetic catalog with each procedure repeated under numbered variants.
+
+    python -m benchmarks.bench_procedure_index --scale 100
+"""
+import argparse
+import json
+import time
+from procedure_index import ProcedureIndex
+from benchmarks.eval_procedure_lookup import PHRASINGS, PROCEDURES_FILE, substring_lookup
+
+
+def synthetic_procedures(procedures, scale):
+    return [
+        {**p, "name": f"{p['name']} #{i}" if i else p["name"]}
+        for i in range(scale) for p in procedures
+    ]
+
+
+def time_per_query(fn, queries, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            fn(query)
+    return (time.perf_counter() - start) / (repeat * len(queries)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with open(PROCEDURES_FILE, encoding="utf-8") as f:
+        procedures = json.load(f)["procedures"]
+    queries = [query for query, _ in PHRASINGS]
+
+    print(f"{'catalog':<22} {'build ms':>9} {'substring us':>13} {'index us':>10} {'cached us':>10}")
+    for label, catalog in (("real", procedures), (f"x{args.scale}", synthetic_procedures(procedures, args.scale))):
+        start = time.perf_counter()
+        index = ProcedureIndex(catalog)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        substring_us = time_per_query(lambda q: substring_lookup(catalog, q), queries, args.repeat)
+
+        def uncached(query):
+            index.lookup.cache_clear()
+            index.search(query)
+        index_us = time_per_query(uncached, queries, args.repeat)
+        cached_us = time_per_query(index.search, queries, args.repeat)
+
+        print(f"{label + f' ({len(catalog):,})':<22} {build_ms:>9.1f} {substring_us:>13.1f} {index_us:>10.1f} {cached_us:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
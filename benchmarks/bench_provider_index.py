@@ -0,0 +1,144 @@
+"""
+Compare the original list-comprehension provider scan with ProviderIndex at statewide scale.
+Synthetic providers are sampled from the field values in data/1stproviders (1).json,
+with zip codes drawn from the bundled Michigan zip centroid table. Also times
+"10 nearest within R miles" against a full haversine scan.
+
+    python -m benchmarks.bench_provider_index --providers 100000
+"""
+import argparse
+import json
+import random
+import time
+from provider_index import ProviderIndex
+from geo import load_zip_centroids, geocode_provider, haversine_miles, resolve_location
+
+SEED_FILE = "data/1stproviders (1).json"
+
+QUERIES = [
+    {"city": "Grand Rapids", "specialty": "", "network": "", "accepting_new": True},
+    {"city": "Ann Arbor", "specialty": "Orthodontist", "network": "", "accepting_new": True},
+    {"city": "rapids", "specialty": "general", "network": "PPO", "accepting_new": True},
+    {"city": "Traverse City", "specialty": "Endodontist", "network": "Delta Dental Premier", "accepting_new": False},
+    {"city": "", "specialty": "Oral Surgeon", "network": "Premier", "accepting_new": True},
+    {"city": "Lansing", "specialty": "", "network": "", "accepting_new": False},
+    {"city": "Nowhere", "specialty": "", "network": "", "accepting_new": True},
+]
+
+NEAREST_QUERIES = [
+    ("49684", 25.0, {}),
+    ("48226", 10.0, {"specialty": "Orthodontist"}),
+    ("Grand Rapids", 25.0, {"network": "PPO", "accepting_new": True}),
+    ("46.5,-87.4", 50.0, {}),
+]
+
+
+def linear_search(providers, city="", specialty="", network="", accepting_new=False, limit=10):
+    """The original search_providers filter chain (accepting-new checked in the requested network)."""
+    results = providers
+    if city:
+        results = [p for p in results if city.lower() in p["city"].lower()]
+    if specialty:
+        results = [p for p in results if specialty.lower() in p["specialty"].lower()]
+    if network:
+        results = [p for p in results if any(network.lower() in n.lower() for n in p["networks"])]
+    if accepting_new:
+        results = [
+            p for p in results
+            if any(accepting and network.lower() in net.lower() for net, accepting in p["accepts_new_patients"].items())
+        ]
+    return results[:limit]
+
+
+def linear_nearest(providers, lat, lon, radius_miles, limit=10, **filters):
+    """Haversine to every matching provider, then sort."""
+    matches = linear_search(providers, limit=len(providers), **filters) if filters else providers
+    ids = {id(p) for p in matches}
+    hits = []
+    for i, p in enumerate(providers):
+        if id(p) in ids:
+            point = geocode_provider(p)
+            if point:
+                miles = haversine_miles(lat, lon, *point)
+                if miles <= radius_miles:
+                    hits.append((i, miles))
+    return sorted(hits, key=lambda r: (r[1], r[0]))[:limit]
+
+
+def synthetic_providers(count, seed_providers):
+    rng = random.Random(0)
+    cities = sorted({p["city"] for p in seed_providers}) + [f"Town {i}" for i in range(400)]
+    specialties = sorted({p["specialty"] for p in seed_providers})
+    networks = sorted({n for p in seed_providers for n in p["networks"]})
+    zips = sorted(load_zip_centroids())
+    providers = []
+    for i in range(count):
+        chosen = rng.sample(networks, rng.randint(1, len(networks)))
+        providers.append({
+            "name": f"Dentist {i}",
+            "city": rng.choice(cities),
+            "zip": rng.choice(zips),
+            "specialty": rng.choice(specialties),
+            "networks": chosen,
+            "accepts_new_patients": {n: rng.random() < 0.8 for n in chosen},
+        })
+    return providers
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--providers", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with open(SEED_FILE, encoding="utf-8") as f:
+        seed = json.load(f)["providers"]
+    providers = synthetic_providers(args.providers, seed)
+
+    start = time.perf_counter()
+    index = ProviderIndex(providers)
+    print(f"{args.providers:,} providers, index built in {time.perf_counter() - start:.2f}s\n")
+
+    print(f"{'query':<70} {'linear ms':>10} {'index ms':>10} {'speedup':>8}")
+    for query in QUERIES:
+        expected = linear_search(providers, **query)
+        actual = index.search_providers(**query)
+        assert [p["name"] for p in actual] == [p["name"] for p in expected], f"mismatch for {query}"
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            linear_search(providers, **query)
+        linear_ms = (time.perf_counter() - start) / args.repeat * 1000
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            index.clear_cache()  # measure the uncached path
+            index.search_providers(**query)
+        index_ms = (time.perf_counter() - start) / args.repeat * 1000
+
+        label = ", ".join(f"{k}={v}" for k, v in query.items() if v)
+        print(f"{label:<70} {linear_ms:>10.2f} {index_ms:>10.3f} {linear_ms / index_ms:>7.0f}x")
+
+    print(f"\n{'nearest query':<70} {'linear ms':>10} {'index ms':>10} {'speedup':>8}")
+    for near, radius, filters in NEAREST_QUERIES:
+        lat, lon = resolve_location(near)
+        expected = linear_nearest(providers, lat, lon, radius, **filters)
+        actual = index.nearest(lat, lon, radius_miles=radius, limit=10, **filters)
+        assert [i for i, _ in actual] == [i for i, _ in expected], f"mismatch for {near}"
+
+        start = time.perf_counter()
+        linear_nearest(providers, lat, lon, radius, **filters)
+        linear_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            index.clear_cache()
+            index.nearest(lat, lon, radius_miles=radius, limit=10, **filters)
+        index_ms = (time.perf_counter() - start) / args.repeat * 1000
+
+        label = f"near={near}, {radius:g} mi" + "".join(f", {k}={v}" for k, v in filters.items())
+        print(f"{label:<70} {linear_ms:>10.2f} {index_ms:>10.3f} {linear_ms / index_ms:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
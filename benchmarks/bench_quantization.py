@@ -0,0 +1,83 @@
+"""
+Benchmark compact embedding storage for the local index: float32 vs float16, int8 and PQ.
+For each mode: memory held for the scan, encode time, recall@k against exact float32 search
+(with and without rescoring against the full vectors) and query latency. Fails if any mode's
+rescored recall is below MIN_RECALL at its default oversampling.
+Uses clustered synthetic 1536-dim vectors unless --index points at a local index from ingest.py.
+
+    python -m benchmarks.bench_quantization --chunks 5000 --chunks 50000
+    python -m benchmarks.bench_quantization --index local_index
+"""
+import os
+import time
+import argparse
+import numpy as np
+from quantization import STORAGE_MODES, QuantizedIndex, encode
+from vector_store import BruteForceIndex, EMBEDDINGS_FILE, normalize
+
+DIMENSIONS = 1536
+MIN_RECALL = 0.95
+
+
+def synthetic_corpus(chunk_count, rng, clusters=200):
+    """Chunks around topic centers, like many plan documents sharing boilerplate sections."""
+    centers = rng.standard_normal((clusters, DIMENSIONS))
+    assignment = rng.integers(0, clusters, chunk_count)
+    return normalize(centers[assignment] + 0.8 * rng.standard_normal((chunk_count, DIMENSIONS)))
+
+
+def recall(results, expected):
+    return np.mean([len({r for r, _ in a} & {r for r, _ in e}) / len(e) for a, e in zip(results, expected)])
+
+
+def time_queries(index, queries, top):
+    start = time.perf_counter()
+    results = [index.search(q, top=top) for q in queries]
+    return results, (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def run(vectors, query_count, top, oversampling, rng, label):
+    # Queries near corpus rows: a paraphrase of a question whose answer is in the index
+    picks = rng.integers(0, len(vectors), query_count)
+    queries = normalize(np.asarray(vectors[picks]) + 0.05 * rng.standard_normal((query_count, vectors.shape[1])))
+
+    exact, exact_us = time_queries(BruteForceIndex(vectors), queries, top)
+    full_bytes = vectors.shape[0] * vectors.shape[1] * 4
+    print(f"\n{label}: {vectors.shape[0]} chunks x {vectors.shape[1]} dims, {query_count} queries, recall@{top}")
+    print(f"  {'mode':<8} {'memory':>10} {'ratio':>6} {'encode':>8} {'rescored':>9} {'recall':>7} "
+          f"{'no rescore':>11} {'µs/query':>10}")
+    print(f"  {'float32':<8} {full_bytes / 2**20:>8.1f}MB {1:>5.0f}x {0:>7.2f}s {'-':>9} {1:>7.3f} {1:>11.3f} "
+          f"{exact_us:>10,.1f}")
+
+    for mode in STORAGE_MODES[1:]:
+        start = time.perf_counter()
+        codes = encode(vectors, mode)
+        encode_s = time.perf_counter() - start
+        index = QuantizedIndex(codes, vectors, oversampling)
+        rescored, rescored_us = time_queries(index, queries, top)
+        approx, _ = time_queries(QuantizedIndex(codes, None, 1), queries, top)
+        rescored_recall = recall(rescored, exact)
+        print(f"  {mode:<8} {codes.nbytes / 2**20:>8.1f}MB {full_bytes / codes.nbytes:>5.0f}x {encode_s:>7.2f}s "
+              f"{'top ' + str(top * index.oversampling):>9} {rescored_recall:>7.3f} {recall(approx, exact):>11.3f} "
+              f"{rescored_us:>10,.1f}")
+        if oversampling is None:
+            assert rescored_recall >= MIN_RECALL, f"{mode}: recall@{top} {rescored_recall:.3f} < {MIN_RECALL}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, action="append", help="Synthetic corpus size (repeatable)")
+    parser.add_argument("--index", help="Benchmark the embeddings of a local index directory instead")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--oversampling", type=int,
+                        help="Rescoring multiple for every mode (default: each mode's own, checked against MIN_RECALL)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.index:
+        vectors = np.load(os.path.join(args.index, EMBEDDINGS_FILE), mmap_mode="r")
+        run(vectors, args.queries, args.top, args.oversampling, rng, args.index)
+    else:
+        for chunk_count in args.chunks or [5000, 50000]:
+            run(synthetic_corpus(chunk_count, rng), args.queries, args.top, args.oversampling, rng, "synthetic")
@@ -0,0 +1,74 @@
+"""
+Cold-start cost of the app, each measured in a fresh interpreter:
+    import orchestrator    what streamlit_app.py pays before it can draw anything
+    eager SDK imports      the same plus the Azure/OpenAI SDKs that used to be imported up front
+                           (blob downloads are not included; they need credentials)
+    first paint            Streamlit AppTest run of streamlit_app.py up to the chat input
+                           (only when streamlit is installed)
+plus the slowest modules in the orchestrator import chain (python -X importtime).
+
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EAGER_SDKS = ["openai", "azure.storage.blob", "azure.search.documents", "azure.ai.agents", "azure.identity"]
+FIRST_PAINT = (
+    "from streamlit.testing.v1 import AppTest\n"
+    "AppTest.from_file('streamlit_app.py', default_timeout=60).run()\n"
+)
+
+
+def timed(code, runs):
+    """Median wall time of running `code` in a fresh interpreter, minus an empty interpreter's."""
+    def once(source):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", source], cwd=ROOT, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return time.perf_counter() - start
+    baseline = statistics.median(once("pass") for _ in range(runs))
+    return statistics.median(once(code) for _ in range(runs)) - baseline
+
+
+def slowest_imports(module, top):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        self_time = parts[0].replace("import time:", "").strip()
+        if len(parts) == 3 and self_time.isdigit():
+            rows.append((int(self_time), parts[2].strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules to list")
+    args = parser.parse_args()
+
+    print(f"median of {args.runs} fresh interpreters (interpreter startup subtracted)\n")
+    lazy = timed("import orchestrator", args.runs)
+    print(f"{'import orchestrator':<24} {lazy * 1000:8.0f} ms")
+    eager = timed("; ".join(f"import {m}" for m in EAGER_SDKS) + "; import orchestrator", args.runs)
+    print(f"{'eager SDK imports':<24} {eager * 1000:8.0f} ms")
+    try:
+        import streamlit  # noqa: F401
+        paint = timed(FIRST_PAINT, args.runs)
+        print(f"{'first paint (AppTest)':<24} {paint * 1000:8.0f} ms")
+    except ImportError:
+        print(f"{'first paint (AppTest)':<24} {'n/a':>8}    (streamlit not installed)")
+
+    print("\nslowest modules importing orchestrator (self time):")
+    for micros, name in slowest_imports("orchestrator", args.top):
+        print(f"  {micros / 1000:7.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Time to first token vs total latency for a multi-intent request, blocking vs streaming.
+Fake agents spend --startup seconds before their first token (thread creation, tool calls),
+then emit --tokens tokens --token-interval seconds apart. Blocking mode shows nothing until the
+graph has joined every section; streaming mode shows each section's tokens as they arrive.
+
+    python -m benchmarks.bench_streaming --startup 1.5 --tokens 120 --token-interval 0.02
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import threading
+import time
+from request_graph import build_request_graph
+
+QUERY = "What does my plan cover for a crown, how much will it cost, and find a dentist in Cadillac"
+PLAN = "baseplan.pdf"
+
+
+def fake_agents(args):
+    def tokens(reply):
+        time.sleep(args.startup)
+        for i in range(args.tokens):
+            time.sleep(args.token_interval)
+            yield f"{reply}{i} "
+
+    def blocking(reply):
+        return lambda *a: "".join(tokens(reply))
+
+    def streaming(reply):
+        return lambda *a: tokens(reply)
+
+    return {
+        "classify_intent": lambda query: "coverage,provider_search,cost_estimate",
+        "coverage": lambda query, plan: (time.sleep(args.startup + args.tokens * args.token_interval)
+                                         or "Delta Dental PPO dentists 50%, Delta Dental Premier dentists 40%."),
+        "provider": blocking("provider"),
+        "cost": blocking("cost"),
+        "coverage_stream": streaming("coverage"),
+        "provider_stream": streaming("provider"),
+        "cost_stream": streaming("cost"),
+    }
+
+
+def measure(agents, stream):
+    start = time.perf_counter()
+    first = []
+    lock = threading.Lock()
+
+    def emit(section, delta):
+        with lock:
+            if not first:
+                first.append(time.perf_counter() - start)
+
+    graph = build_request_graph(QUERY, PLAN, agents, emit=emit if stream else None)
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(graph.run())
+    total = time.perf_counter() - start
+    return (first[0] if stream else total), total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--startup", type=float, default=1.5, help="Seconds before an agent's first token")
+    parser.add_argument("--tokens", type=int, default=120, help="Tokens per agent reply")
+    parser.add_argument("--token-interval", type=float, default=0.02, help="Seconds between tokens")
+    args = parser.parse_args()
+
+    agents = fake_agents(args)
+    print(f"{'mode':<10} {'time to first token':>20} {'total':>8}")
+    for name, stream in (("blocking", False), ("streaming", True)):
+        ttft, total = measure(agents, stream)
+        print(f"{name:<10} {ttft:>19.2f}s {total:>7.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark the local vector index engines: brute-force cosine vs HNSW, plus BM25 and
+reciprocal-rank fusion for hybrid queries.
+Uses synthetic 1536-dim vectors and synthetic chunk text so it runs without Azure. The vectors sit
+around topic centers and each query is a perturbed corpus row, as with real embeddings; uniformly
+random 1536-dim vectors have no near neighbours for any graph index to find. The HNSW run is at
+HNSW_THRESHOLD, the smallest corpus that gets a graph, and fails unless recall@10 is at least
+HNSW_MIN_RECALL and queries are faster than brute force.
+
+    python -m benchmarks.bench_vector_store --chunks 300 --chunks 5000 --hnsw-chunks 20000
+"""
+import argparse
+import time
+import numpy as np
+from lexical_index import BM25Index, reciprocal_rank_fusion
+from vector_store import BruteForceIndex, HnswIndex, HNSW_THRESHOLD, normalize
+
+DIMENSIONS = 1536
+HNSW_MIN_RECALL = 0.95
+
+
+def synthetic_corpus(chunk_count, query_count, rng, clusters=200):
+    """Chunks around topic centers, and queries near corpus rows (a paraphrase of an indexed answer)."""
+    centers = rng.standard_normal((clusters, DIMENSIONS))
+    vectors = normalize(centers[rng.integers(0, clusters, chunk_count)] + 0.8 * rng.standard_normal((chunk_count, DIMENSIONS)))
+    picks = rng.integers(0, chunk_count, query_count)
+    queries = normalize(vectors[picks] + 0.05 * rng.standard_normal((query_count, DIMENSIONS)))
+    return vectors, queries
+
+
+def time_queries(index, queries, top, rows=None):
+    start = time.perf_counter()
+    results = [index.search(q, top=top, rows=rows) for q in queries]
+    elapsed = time.perf_counter() - start
+    return results, elapsed / len(queries) * 1e6
+
+
+def run(chunk_count, query_count, top):
+    rng = np.random.default_rng(0)
+    vectors, queries = synthetic_corpus(chunk_count, query_count, rng)
+
+    brute = BruteForceIndex(vectors)
+    exact, brute_us = time_queries(brute, queries, top)
+    print(f"\n{chunk_count} chunks, {query_count} queries, top={top}")
+    print(f"  brute force: {brute_us:,.1f} µs/query")
+
+    # Same filter shape as source eq 'baseplan.pdf': one file's rows out of the corpus
+    rows = np.arange(0, chunk_count, 5)
+    _, filtered_us = time_queries(brute, queries, top, rows)
+    print(f"  brute force (source filter, {len(rows)} rows): {filtered_us:,.1f} µs/query")
+
+    # Zipf-distributed vocabulary, ~250 tokens per chunk like a 1500-character plan chunk
+    vocabulary = [f"term{i}" for i in range(5000)]
+    weights = 1 / np.arange(1, len(vocabulary) + 1)
+    weights /= weights.sum()
+    texts = [" ".join(rng.choice(vocabulary, 250, p=weights)) for _ in range(chunk_count)]
+    text_queries = [" ".join(rng.choice(vocabulary, 3, p=weights)) for _ in range(query_count)]
+    start = time.perf_counter()
+    lexical = BM25Index.build(texts)
+    print(f"  bm25 build: {time.perf_counter() - start:,.2f} s")
+    start = time.perf_counter()
+    lexical_hits = [lexical.search(q, top=50) for q in text_queries]
+    print(f"  bm25:        {(time.perf_counter() - start) / query_count * 1e6:,.1f} µs/query")
+    vector_hits = [brute.search(q, top=50) for q in queries]
+    start = time.perf_counter()
+    for v, t in zip(vector_hits, lexical_hits):
+        reciprocal_rank_fusion([v, t], top=top)
+    print(f"  rrf (50 + 50 candidates): {(time.perf_counter() - start) / query_count * 1e6:,.1f} µs/query")
+
+
+
+def run_hnsw(chunk_count, query_count, top):
+    """HNSW against brute force on the same corpus; exits non-zero below HNSW_MIN_RECALL or without a speedup."""
+    rng = np.random.default_rng(0)
+    vectors, queries = synthetic_corpus(chunk_count, query_count, rng)
+    exact, brute_us = time_queries(BruteForceIndex(vectors), queries, top)
+    print(f"\nhnsw: {chunk_count} chunks, {query_count} queries, top={top}")
+    start = time.perf_counter()
+    hnsw = HnswIndex.build(vectors)
+    print(f"  build:       {time.perf_counter() - start:,.1f} s")
+    approx, hnsw_us = time_queries(hnsw, queries, top)
+    recall = np.mean([
+        len({r for r, _ in a} & {r for r, _ in e}) / len(e)
+        for a, e in zip(approx, exact)
+    ])
+    print(f"  brute force: {brute_us:,.1f} µs/query")
+    print(f"  hnsw:        {hnsw_us:,.1f} µs/query ({brute_us / hnsw_us:.1f}x), recall@{top} {recall:.3f}")
+    if recall < HNSW_MIN_RECALL or hnsw_us >= brute_us:
+        raise SystemExit(f"hnsw below target: recall@{top} {recall:.3f} (need {HNSW_MIN_RECALL}), "
+                         f"{hnsw_us:,.1f} vs {brute_us:,.1f} µs/query")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, action="append", help="Corpus size (repeatable)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top", type=int, default=3)
+    parser.add_argument("--hnsw-chunks", type=int, default=HNSW_THRESHOLD, help="Corpus size of the HNSW run")
+    parser.add_argument("--hnsw-top", type=int, default=10)
+    parser.add_argument("--no-hnsw", action="store_true", help="Skip the (slow) HNSW build")
+    args = parser.parse_args()
+
+    for chunk_count in args.chunks or [300, 5000]:
+        run(chunk_count, args.queries, args.top)
+    if not args.no_hnsw:
+        run_hnsw(args.hnsw_chunks, args.queries, args.hnsw_top)
@@ -0,0 +1,65 @@
+"""
+Offline accuracy vs latency of the local intent classifier, to pick INTENT_CONFIDENCE_THRESHOLD.
+k-fold cross-validation over data/intent_examples.jsonl (plus INTENT_LOG if present). For each
+threshold: how many queries the local model answers, its exact-match accuracy on those, and the
+expected end-to-end accuracy/latency when the rest go to the router agent (assumed correct, at
+--router-latency seconds per call).
+
+    python -m benchmarks.eval_intent_classifier --folds 5 --router-latency 2.5
+"""
+import argparse
+import random
+import time
+from intent_classifier import IntentModel, load_examples, INTENTS, GENERAL
+
+THRESHOLDS = [0.0, 0.2, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95]
+
+
+def canonical(intents):
+    return [i for i in INTENTS if i in intents] or [GENERAL]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--router-latency", type=float, default=2.5)
+    parser.add_argument("--verbose", action="store_true", help="Print misclassified queries")
+    args = parser.parse_args()
+
+    examples = load_examples()
+    random.Random(0).shuffle(examples)
+    predictions = []  # (correct, confidence, seconds)
+    train_seconds = 0.0
+    for fold in range(args.folds):
+        test = examples[fold::args.folds]
+        train = [e for i, e in enumerate(examples) if i % args.folds != fold]
+        start = time.perf_counter()
+        model = IntentModel.train(train)
+        train_seconds += time.perf_counter() - start
+        for query, expected in test:
+            start = time.perf_counter()
+            intents, confidence = model.predict(query)
+            elapsed = time.perf_counter() - start
+            correct = intents == canonical(expected)
+            predictions.append((correct, confidence, elapsed))
+            if args.verbose and not correct:
+                print(f"  {confidence:.2f} {query!r}: got {intents}, expected {canonical(expected)}")
+
+    count = len(predictions)
+    local_ms = sum(p[2] for p in predictions) / count * 1000
+    print(f"{count} labeled queries, {args.folds}-fold; train {train_seconds / args.folds * 1000:.0f} ms, "
+          f"predict {local_ms:.3f} ms/query\n")
+    print(f"{'threshold':>9} {'local':>7} {'local acc':>10} {'overall acc':>12} {'mean latency':>13}")
+    for threshold in THRESHOLDS:
+        local = [p for p in predictions if p[1] >= threshold]
+        local_correct = sum(p[0] for p in local)
+        routed = count - len(local)
+        overall = (local_correct + routed) / count
+        latency = local_ms / 1000 + routed / count * args.router_latency
+        local_acc = f"{local_correct / len(local):.1%}" if local else "-"
+        print(f"{threshold:>9.2f} {len(local) / count:>7.0%} {local_acc:>10} {overall:>12.1%} {latency:>12.2f}s")
+    print(f"{'router':>9} {0:>7.0%} {'-':>10} {1:>12.1%} {args.router_latency:>12.2f}s")
+
+
+if __name__ == "__main__":
+    main()
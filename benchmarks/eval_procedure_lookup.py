@@ -0,0 +1,127 @@
+"""
+Hit rate of procedure lookup over lay phrasings: the original substring scan in
+get_procedure_cost vs ProcedureIndex. A phrasing is a hit@k when one of the expected
+procedures is among the first k results.
+
+    python -m benchmarks.eval_procedure_lookup [--verbose]
+"""
+import argparse
+import json
+from procedure_index import ProcedureIndex
+
+PROCEDURES_FILE = "data/procedure_costs.json"
+
+# (what a member types, acceptable catalog names)
+PHRASINGS = [
+    ("root canals", ["Root Canal - Molar", "Root Canal - Premolar", "Root Canal - Front Tooth"]),
+    ("root canal on a molar", ["Root Canal - Molar"]),
+    ("root canal front tooth", ["Root Canal - Front Tooth"]),
+    ("rct premolar", ["Root Canal - Premolar"]),
+    ("tooth pulled", ["Extraction - Non-surgical", "Extraction - Surgical"]),
+    ("getting a tooth pulled", ["Extraction - Non-surgical", "Extraction - Surgical"]),
+    ("wisdom teeth removal", ["Extraction - Wisdom Tooth"]),
+    ("wisdom teeth", ["Extraction - Wisdom Tooth"]),
+    ("surgical extraction", ["Extraction - Surgical"]),
+    ("extration", ["Extraction - Non-surgical", "Extraction - Surgical", "Extraction - Wisdom Tooth"]),
+    ("D2740", ["Crown - Permanent"]),
+    ("d1110", ["Cleaning - Regular (Adult)"]),
+    ("D7240", ["Extraction - Wisdom Tooth"]),
+    ("crown", ["Crown - Permanent", "Crown - Stainless Steel (Child)"]),
+    ("cap on my tooth", ["Crown - Permanent"]),
+    ("porcelain crown", ["Crown - Permanent"]),
+    ("kids crown", ["Crown - Stainless Steel (Child)"]),
+    ("cavity", ["Filling - Silver (1 Surface)", "Filling - White/Composite (Back, 1 Surface)",
+                "Filling - White/Composite (Front, 1 Surface)"]),
+    ("cavity filling", ["Filling - Silver (1 Surface)", "Filling - White/Composite (Back, 1 Surface)",
+                        "Filling - White/Composite (Front, 1 Surface)"]),
+    ("amalgam filling", ["Filling - Silver (1 Surface)"]),
+    ("tooth colored filling", ["Filling - White/Composite (Back, 1 Surface)", "Filling - White/Composite (Front, 1 Surface)"]),
+    ("white filling 2 surfaces back tooth", ["Filling - White/Composite (Back, 2 Surfaces)"]),
+    ("teeth cleaning", ["Cleaning - Regular (Adult)"]),
+    ("cleaning", ["Cleaning - Regular (Adult)", "Cleaning - Child"]),
+    ("kids cleaning", ["Cleaning - Child"]),
+    ("deep cleaning", ["Periodontal Cleaning"]),
+    ("scaling and root planing", ["Periodontal Cleaning"]),
+    ("checkup", ["Exam - Established Patient"]),
+    ("new patient exam", ["Exam - New Patient"]),
+    ("emergency visit", ["Exam - Emergency"]),
+    ("toothache", ["Pain Relief Treatment - Minor", "Exam - Emergency"]),
+    ("xrays", ["X-ray - Bitewing (2)", "X-ray - Bitewing (4)", "X-ray - Panoramic", "X-ray - Full Mouth Series",
+               "X-ray - Periapical (First)"]),
+    ("x ray", ["X-ray - Bitewing (2)", "X-ray - Bitewing (4)", "X-ray - Panoramic", "X-ray - Full Mouth Series",
+               "X-ray - Periapical (First)"]),
+    ("panoramic xray", ["X-ray - Panoramic"]),
+    ("bitewings", ["X-ray - Bitewing (2)", "X-ray - Bitewing (4)"]),
+    ("full mouth x-rays", ["X-ray - Full Mouth Series"]),
+    ("braces", ["Braces - Adult", "Braces - Adolescent"]),
+    ("braces for my teenager", ["Braces - Adolescent"]),
+    ("invisalign", ["Braces - Adult"]),
+    ("orthodontic treatment", ["Braces - Adult", "Braces - Adolescent"]),
+    ("dentures", ["Denture - Upper Removable (Full)", "Denture - Lower Removable (Full)"]),
+    ("false teeth", ["Denture - Upper Removable (Full)", "Denture - Lower Removable (Full)"]),
+    ("partial denture upper", ["Partial Denture - Upper"]),
+    ("implants", ["Implant - Single Tooth Replacement"]),
+    ("dental implant", ["Implant - Single Tooth Replacement"]),
+    ("teeth whitening", ["Bleaching"]),
+    ("whitening", ["Bleaching"]),
+    ("veneers", ["Veneer - Porcelain Laminate (Laboratory)"]),
+    ("sealants", ["Sealant (per Tooth)"]),
+    ("fluoride treatment", ["Fluoride - Varnish", "Fluoride - Non-Varnish"]),
+    ("night guard", ["Occlusal Guard - Full Arch"]),
+    ("guard for grinding", ["Occlusal Guard - Full Arch"]),
+    ("sports mouth guard", ["Mouthguard - Athletic (custom fabricated)"]),
+    ("gum graft", ["Tissue (Gum) Graft"]),
+    ("sedation", ["General Anesthesia"]),
+    ("being put under", ["General Anesthesia"]),
+    ("bridge", ["Bridge - 3 Unit (Pontic/False Tooth)", "Bridge - 3 Unit (Restorative Crowns)"]),
+    ("debridement", ["Full Mouth Debridement"]),
+    ("anesthesia", ["General Anesthesia"]),
+    ("root canel", ["Root Canal - Molar", "Root Canal - Premolar", "Root Canal - Front Tooth"]),
+]
+
+
+def substring_lookup(procedures, query):
+    """The original get_procedure_cost matching: name substring, then category substring."""
+    keyword = query.lower()
+    matches = [p for p in procedures if keyword in p["name"].lower()]
+    if not matches:
+        matches = [p for p in procedures if keyword in p["category"].lower()]
+    return matches
+
+
+def hit(results, expected, k):
+    return any(p["name"] in expected for p in results[:k])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    with open(PROCEDURES_FILE, encoding="utf-8") as f:
+        procedures = json.load(f)["procedures"]
+    names = {p["name"] for p in procedures}
+    for _, expected in PHRASINGS:
+        assert set(expected) <= names, f"unknown procedure in {expected}"
+
+    index = ProcedureIndex(procedures)
+    totals = {"substring@1": 0, "substring@3": 0, "index@1": 0, "index@3": 0}
+    for query, expected in PHRASINGS:
+        old = substring_lookup(procedures, query)
+        new = [p for p, _ in index.search(query)]
+        totals["substring@1"] += hit(old, expected, 1)
+        totals["substring@3"] += hit(old, expected, 3)
+        totals["index@1"] += hit(new, expected, 1)
+        totals["index@3"] += hit(new, expected, 3)
+        if args.verbose or not hit(new, expected, 3):
+            top = ", ".join(f"{p['name']} ({s:.2f})" for p, s in index.search(query, limit=3)) or "no match"
+            print(f"{'ok  ' if hit(new, expected, 1) else 'MISS'} {query!r:<40} -> {top}")
+
+    count = len(PHRASINGS)
+    print(f"\n{count} phrasings")
+    for name, value in totals.items():
+        print(f"  {name:<12} {value:>3}/{count}  {value / count:.0%}")
+
+
+if __name__ == "__main__":
+    main()
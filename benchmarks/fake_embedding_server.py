@@ -0,0 +1,107 @@
+"""
+Local fake Azure OpenAI embeddings endpoint for tuning ingest throughput.
+Returns the same deterministic vectors as the in-process fake (fake_services), simulates per-request
+and per-item latency, and answers 429 with Retry-After once a requests-per-second
+budget is exceeded.
+
+    python -m benchmarks.fake_embedding_server --port 8089 --rps 5
+    AZURE_OPENAI_ENDPOINT=http://127.0.0.1:8089 OPENAI_API_KEY=fake python ingest.py
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from fake_services.openai_service import fake_embedding
+
+
+class RateLimiter:
+    """Fixed one-second window request counter."""
+
+    def __init__(self, requests_per_second):
+        self.requests_per_second = requests_per_second
+        self.window = int(time.time())
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        if not self.requests_per_second:
+            return True
+        with self.lock:
+            now = int(time.time())
+            if now != self.window:
+                self.window, self.count = now, 0
+            self.count += 1
+            return self.count <= self.requests_per_second
+
+
+def make_handler(latency, per_item_latency, limiter, stats):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not self.path.split("?")[0].endswith("/embeddings"):
+                self.send_error(404)
+                return
+
+            if not limiter.allow():
+                stats["throttled"] += 1
+                self._send(429, {"error": {"code": "429", "message": "Rate limit exceeded"}}, {"retry-after-ms": "250"})
+                return
+
+            texts = body.get("input", [])
+            if isinstance(texts, str):
+                texts = [texts]
+            time.sleep(latency + per_item_latency * len(texts))
+            stats["requests"] += 1
+            stats["items"] += len(texts)
+
+            dimensions = body.get("dimensions") or 1536
+            data = [{"object": "embedding", "index": i, "embedding": fake_embedding(t, dimensions)} for i, t in enumerate(texts)]
+            tokens = sum(len(t.split()) for t in texts)
+            self._send(200, {
+                "object": "list",
+                "data": data,
+                "model": body.get("model", "fake-embedding"),
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+            })
+
+        def _send(self, status, payload, headers=None):
+            raw = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def start_server(port=0, latency=0.05, per_item_latency=0.0005, requests_per_second=0):
+    """Start the server on a background thread. Returns (server, stats)."""
+    stats = {"requests": 0, "items": 0, "throttled": 0}
+    handler = make_handler(latency, per_item_latency, RateLimiter(requests_per_second), stats)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per request")
+    parser.add_argument("--per-item-latency", type=float, default=0.0005, help="Extra seconds per input")
+    parser.add_argument("--rps", type=int, default=0, help="Requests per second before 429 (0 = unlimited)")
+    args = parser.parse_args()
+
+    server, _ = start_server(args.port, args.latency, args.per_item_latency, args.rps)
+    print(f"Fake embeddings endpoint on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
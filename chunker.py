@@ -0,0 +1,276 @@
+# Structure-aware chunking for plan documents — the default ingest.py chunker (CHUNKER=structure)
+# Splits a parsed plan file at its sections instead of every CHUNK_SIZE characters:
+#   - headings: "Label – text" lines ("Deductible – None."), FAQ questions and short title-like
+#     lines ("Basic Services"); a title wrapped over several PDF lines is read as one heading
+#   - benefit tables: each row ending in three percentages (coverage_table.ROW_RE) stays whole with
+#     its wrapped lines, and every chunk of a table repeats the column header ("Plan Pays ...")
+#     under its heading path ("Covered Services > Basic Services")
+#   - page furniture (short lines with digits repeated on every page, e.g. form numbers) is dropped
+# Sections are packed into chunks of at most CHUNK_TOKENS tokens. Every section in a chunk starts
+# with its heading path, and a chunk smaller than MIN_CHUNK_TOKENS takes the next section too.
+# chunk_document() also returns each chunk's heading paths and category keys (the coverage table's
+# category_key plus procedures the text mentions), which ingest.py stores as filterable fields.
+# Tokens are counted as words and punctuation marks, close to the embedding tokenizer for English.
+# benchmarks/bench_chunker.py compares it with the recursive character splitter.
+
+import os
+import re
+from collections import Counter
+from coverage_table import ROW_RE, TABLE_START_RE, TABLE_END_RE, DASH_RE, category_key, procedure_categories
+
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "350"))
+# A chunk smaller than this also takes the next section, even under another heading
+MIN_CHUNK_TOKENS = 60
+HEADING_MAX_WORDS = 8
+LABEL_MAX_WORDS = 6
+QUESTION_MAX_WORDS = 30
+PATH_SEPARATOR = " > "
+# Heading of a benefit table that has no heading of its own
+TABLE_HEADING = "Covered Services"
+
+TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+BULLET_RE = re.compile(r"^[➢•▪●◦]")
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+TERMINAL_RE = re.compile(r"[.,;:!?]$")
+SENTENCE_END = (".", "!", "?", ":")
+# Column headers wrapped one word per line ("Plan" / "Pays")
+TABLE_HEADER_RE = re.compile(r"^(plan|pays)\b", re.IGNORECASE)
+NOT_A_LABEL_RE = re.compile(r"[\d%$,]")
+
+
+def count_tokens(text):
+    return len(TOKEN_RE.findall(text))
+
+
+class Section:
+    """A heading path, the table column header (if any) and the units of text under it."""
+
+    def __init__(self, path, header=""):
+        self.path = path
+        self.header = header
+        self.units = []  # (text, category keys of table rows); procedures the text mentions are found per segment
+
+    def add(self, text, categories=()):
+        self.units.append((text, set(categories)))
+
+
+class _Parser:
+    """Line-by-line state machine that turns a document into Sections."""
+
+    def __init__(self):
+        self.sections = []
+        self.section = Section(())
+        self.titles = []     # short title-like lines not yet known to be a heading
+        self.title_words = 0  # words in self.titles
+        self.paragraph = []  # lines of the paragraph or bullet being read
+        self.table = None    # top heading of the benefit table being read
+        self.header = []     # its column header lines
+        self.rows_seen = False
+        self.pending = []    # table row text wrapped over several lines
+
+    # ── Sections ──────────────────────────────────────────────────────────────
+    def flush(self):
+        if self.paragraph:
+            self.section.add(" ".join(self.paragraph))
+            self.paragraph = []
+
+    def open(self, path, header=""):
+        self.flush()
+        previous = self.section
+        if previous.units:
+            self.sections.append(previous)
+        self.section = Section(path, header)
+        # A heading with nothing under it ("Frequently Asked Questions") stays in the text
+        if not previous.units and len(previous.path) == 1 and previous.path != path[:1] and not header:
+            self.section.add(previous.path[0])
+
+    def resolve_titles(self, heading):
+        """Open the buffered title lines as a heading, or keep them as paragraph text."""
+        titles, self.titles, self.title_words = self.titles, [], 0
+        if not titles:
+            return
+        if heading:
+            self.open((" ".join(titles),))
+        else:
+            self.paragraph.extend(titles)
+
+    # ── Benefit tables ────────────────────────────────────────────────────────
+    def start_table(self, line):
+        self.flush()
+        # The column header ("Delta Dental PPO™ Dentist ... Plan Pays") was read as title lines
+        self.header = self.titles + [line]
+        self.titles, self.title_words = [], 0
+        # A heading directly above the table ("Covered Services –") is the table's heading
+        self.table = self.section.path[0] if self.section.path and not self.section.units else TABLE_HEADING
+        self.rows_seen = False
+        self.pending = []
+        self.open((self.table,), " ".join(self.header))
+
+    def table_line(self, line):
+        match = ROW_RE.match(line)
+        if match:
+            row_text = " ".join(self.pending + [match.group("text")]).strip()
+            name = re.sub(r"\s*\(.*?\)\s*", " ", DASH_RE.split(row_text, maxsplit=1)[0])
+            self.section.add(" ".join(self.pending + [line]), [category_key(name)] if name.strip() else [])
+            self.pending = []
+            self.rows_seen = True
+        elif not self.rows_seen and TABLE_HEADER_RE.match(line):
+            self.header.append(line)
+            self.section.header = " ".join(self.header)
+        elif self.pending or DASH_RE.search(line):
+            # Row text that wraps has a dash; subheadings ("Basic Services") do not
+            self.pending.append(line)
+        else:
+            self.open((self.table, line), " ".join(self.header))
+
+    def end_table(self, line):
+        if self.pending:
+            self.section.add(" ".join(self.pending))
+        self.open((self.table,))
+        self.table = None
+        # A closing row without percentages ("Orthodontic Age Limit – through age 18") belongs to the table
+        if DASH_RE.search(line) and not re.match(r"^[*➢]|maximum payment", line, re.IGNORECASE):
+            self.section.add(line)
+            return True
+        return False
+
+    # ── Lines ─────────────────────────────────────────────────────────────────
+    def continues_paragraph(self):
+        return bool(self.paragraph) and not self.paragraph[-1].endswith(SENTENCE_END)
+
+    def feed(self, line):
+        if not line:
+            # Wrapped titles are not split by blank lines, so titles before one are a heading
+            self.resolve_titles(heading=True)
+            self.flush()
+            return
+        if self.table is not None:
+            if not TABLE_END_RE.search(line):
+                self.table_line(line)
+                return
+            if self.end_table(line):
+                return
+        if TABLE_START_RE.search(line):
+            self.start_table(line)
+            return
+
+        words = line.split()
+        # The dash pattern is slow to search, so only lines with a dash character are searched
+        dash = DASH_RE.search(line) if "-" in line or "–" in line or "—" in line else None
+        bullet = bool(BULLET_RE.match(line))
+        starts_upper = line[0].isupper()
+        continues = self.continues_paragraph()
+        if not bullet and line.rstrip("\"'”’ ").endswith("?") and len(words) <= QUESTION_MAX_WORDS \
+                and (starts_upper or self.titles) and not continues:
+            question = " ".join(self.titles + [line])
+            self.titles, self.title_words = [], 0
+            self.open((question,))
+            return
+        if not bullet and len(words) <= HEADING_MAX_WORDS and (starts_upper or self.titles) \
+                and not TERMINAL_RE.search(line) and not NOT_A_LABEL_RE.search(line) and not dash \
+                and (not continues or TABLE_HEADER_RE.match(line)) \
+                and self.title_words + len(words) <= 2 * HEADING_MAX_WORDS:
+            self.titles.append(line)
+            self.title_words += len(words)
+            return
+        label = line[:dash.start()] if dash else ""
+        if dash and not bullet and starts_upper and len(label.split()) <= LABEL_MAX_WORDS \
+                and not NOT_A_LABEL_RE.search(label) and not continues:
+            rest = line[dash.end():]
+            self.resolve_titles(heading=True)
+            self.open((label.strip(),))
+            if rest.strip():
+                self.paragraph.append(rest.strip())
+            return
+
+        # A lowercase line continues the wrapped title lines before it ("Choose" / "your plan ...")
+        self.resolve_titles(heading=starts_upper)
+        if bullet:
+            self.flush()
+        self.paragraph.append(line)
+
+    def finish(self):
+        if self.table is not None and self.pending:
+            self.section.add(" ".join(self.pending))
+        self.resolve_titles(heading=False)
+        self.open(())
+        return self.sections
+
+
+def parse_sections(text):
+    """The document as a list of Sections, in reading order."""
+    lines = [" ".join(line.split()) for line in text.splitlines()]
+    # Page furniture: short lines with digits that repeat (form numbers, page footers)
+    counts = Counter(lines)
+    furniture = {line for line, count in counts.items()
+                 if count > 1 and line and len(line.split()) <= HEADING_MAX_WORDS
+                 and re.search(r"\d", line) and not ROW_RE.match(line)}
+    parser = _Parser()
+    for line in lines:
+        if line not in furniture:
+            parser.feed(line)
+    return parser.finish()
+
+
+# ── Token budgeting ───────────────────────────────────────────────────────────
+def _pack(pieces, budget, separator):
+    """Join consecutive (text, tokens, categories) pieces into groups of at most `budget` tokens."""
+    groups = []
+    for text, tokens, categories in pieces:
+        if groups and groups[-1][1] + tokens <= budget:
+            last_text, last_tokens, last_categories = groups[-1]
+            groups[-1] = (last_text + separator + text, last_tokens + tokens, last_categories | categories)
+        else:
+            groups.append((text, tokens, set(categories)))
+    return groups
+
+
+def _split(text, budget, categories):
+    """(text, tokens, categories) pieces of at most `budget` tokens: whole sentences where possible."""
+    tokens = count_tokens(text)
+    if tokens <= budget:
+        return [(text, tokens, categories)]
+    sentences = SENTENCE_RE.split(text)
+    if len(sentences) == 1:
+        words = text.split()
+        step = max(1, budget // 2)  # a word is one or two tokens
+        return _pack([(w, count_tokens(w), categories) for w in words], step, " ") if len(words) > 1 \
+            else [(text, tokens, categories)]
+    pieces = [piece for sentence in sentences for piece in _split(sentence, budget, categories)]
+    return _pack(pieces, budget, " ")
+
+
+def _segments(section, budget):
+    """(text, tokens, categories) for a section: its units in runs of at most `budget` tokens, each under its headings."""
+    prefix = "\n".join(filter(None, [PATH_SEPARATOR.join(section.path), section.header]))
+    prefix_tokens = count_tokens(prefix)
+    room = max(budget - prefix_tokens, budget // 2)
+    pieces = [piece for text, categories in section.units for piece in _split(text, room, categories)]
+    # Procedures the headings and text mention, matched once per segment rather than per line
+    return [((prefix + "\n" + text) if prefix else text, tokens + prefix_tokens,
+             categories.union(procedure_categories(PATH_SEPARATOR.join(section.path) + "\n" + text)))
+            for text, tokens, categories in _pack(pieces, room, "\n")]
+
+
+def chunk_document(text, budget=CHUNK_TOKENS):
+    """
+    Chunk one parsed document along its headings and benefit tables.
+    :return: [{"text", "headings": [heading path, ...], "categories": [category key, ...]}]
+    """
+    chunks = []
+    current = None
+    for section in parse_sections(text):
+        for segment, tokens, categories in _segments(section, budget):
+            # Table subsections share a chunk; a new top-level heading starts one unless the last is small
+            if current and current["tokens"] + tokens <= budget and \
+                    (section.path[:1] == current["top"] or current["tokens"] < MIN_CHUNK_TOKENS):
+                current["text"] += "\n\n" + segment
+                current["tokens"] += tokens
+            else:
+                current = {"text": segment, "tokens": tokens, "top": section.path[:1], "headings": [], "categories": set()}
+                chunks.append(current)
+            path = PATH_SEPARATOR.join(section.path)
+            if path and path not in current["headings"]:
+                current["headings"].append(path)
+            current["categories"] |= categories
+    return [{"text": c["text"], "headings": c["headings"], "categories": sorted(c["categories"])} for c in chunks]
@@ -0,0 +1,151 @@
+# Deterministic cost answers — the cost chain without the cost estimator agent
+# With coverage known (coverage_table.py, or the coverage agent on a table miss) a cost
+# question is answered in one local pass:
+#   resolve_procedure   the procedure(s) the question is about, via ProcedureIndex
+#   estimate            PPO and Premier out-of-pocket for each, applying the plan's deductible
+#                       (when it applies to the category) and the remaining annual maximum
+#   render              a templated answer
+# Optionally the rendered text alone is sent to an LLM for wording (one call, no tools), so a
+# cost question costs zero or one model round trips instead of one per network tier.
+
+import os
+import re
+from procedure_index import tokenize, expand, STOP_WORDS
+from task_graph import fallback
+
+# agent: cost estimator agent per network tier; deterministic: computed + templated here
+COST_MODE = os.getenv("COST_MODE", "agent")
+# In deterministic mode, send the templated answer to AZURE_OPENAI_DEPLOYMENT for wording
+COST_LLM_WORDING = os.getenv("COST_LLM_WORDING", "false").lower() in ("1", "true", "yes")
+MAX_PROCEDURES = 3
+
+MONEY = r"\$?\s?(\d[\d,]*(?:\.\d+)?)"
+USED_RE = re.compile(r"(?:used|spent|already (?:paid|claimed))\D{0,20}?" + MONEY, re.IGNORECASE)
+REMAINING_RE = re.compile(MONEY + r"\s*(?:left|remaining)|(?:remaining|left)\D{0,20}?" + MONEY, re.IGNORECASE)
+DEDUCTIBLE_MET_RE = re.compile(r"(met|reached|satisfied|paid)\s+(my\s+|the\s+)?deductible", re.IGNORECASE)
+
+
+def _amount(text):
+    return float(text.replace(",", "").replace("$", "")) if text else None
+
+
+def resolve_procedure(query, index, limit=MAX_PROCEDURES):
+    """
+    Procedures a cost question is about, as [(procedure, score)].
+    The whole question is often too wordy to match, so every 1-3 word window is looked up too and
+    the best-scoring window wins; its matches are narrowed to those sharing the most of the
+    question's words ("filling with 2 surfaces" keeps only the 2-surface fillings).
+    """
+    query = re.sub(r"\$\s?[\d,.]+", " ", query)  # dollar amounts are benefit usage, not procedure words
+    best = index.lookup(query)
+    best_key = (best[0][1], 99) if best else (0.0, 0)
+    words = re.findall(r"[\w+$-]+", query.lower())
+    for size in (3, 2, 1):
+        for i in range(len(words) - size + 1):
+            window = " ".join(words[i:i + size])
+            if all(t in STOP_WORDS for t in tokenize(window)):
+                continue
+            ranked = index.lookup(window)
+            if ranked and (ranked[0][1], size) > best_key:
+                best, best_key = ranked, (ranked[0][1], size)
+    if not best:
+        return []
+    query_tokens = set(expand(tokenize(query))) - STOP_WORDS
+    overlap = {i: len(index.token_sets[i] & query_tokens) for i, _ in best}
+    most = max(overlap.values())
+    return [(index.procedures[i], score) for i, score in best if overlap[i] == most][:limit]
+
+
+def member_usage(query):
+    """(remaining annual maximum if the member said so, used amount, deductible already met)."""
+    remaining = REMAINING_RE.search(query)
+    used = USED_RE.search(query)
+    return (
+        _amount(remaining.group(1) or remaining.group(2)) if remaining else None,
+        _amount(used.group(1)) if used else 0.0,
+        bool(DEDUCTIBLE_MET_RE.search(query)),
+    )
+
+
+def _patient_cost(cost, percent, deductible, remaining_max):
+    """Out-of-pocket for one fee: deductible first, then coinsurance, then anything above the maximum."""
+    deductible_part = min(cost, deductible)
+    plan_pays = (cost - deductible_part) * percent / 100.0
+    if remaining_max is not None:
+        plan_pays = min(plan_pays, remaining_max)
+    return cost - plan_pays
+
+
+def estimate(procedure, coverage, query=""):
+    """
+    PPO and Premier out-of-pocket ranges for one procedure.
+    :param coverage: lookup_coverage / extract_coverage_percent result ("ppo" and "premier" are required;
+        "deductible", "deductible_applies" and "annual_maximum" are used when present).
+    :return: {"ppo": (low, high), "premier": (low, high), "deductible": float, "remaining_maximum": float or None}
+    """
+    remaining, used, deductible_met = member_usage(query)
+    deductible = 0.0
+    if coverage.get("deductible_applies") and not deductible_met:
+        deductible = _amount(coverage.get("deductible")) or 0.0
+    if remaining is None and coverage.get("annual_maximum"):
+        remaining = max(0.0, _amount(coverage["annual_maximum"]) - used)
+    result = {"deductible": deductible, "remaining_maximum": remaining}
+    for tier in ("ppo", "premier"):
+        percent = max(0.0, min(100.0, float(coverage.get(tier) or 0)))
+        result[tier] = tuple(_patient_cost(procedure[key], percent, deductible, remaining)
+                             for key in ("cost_low", "cost_high"))
+    return result
+
+
+def _money_range(low, high):
+    return f"${low:,.0f}" if round(low) == round(high) else f"${low:,.0f} - ${high:,.0f}"
+
+
+def render(matches, coverage, query=""):
+    """Templated cost answer for the resolved procedures."""
+    if not matches:
+        return ("I couldn't match that to a procedure in our cost data. Try: cleaning, filling, crown, root canal, "
+                "extraction, wisdom tooth, braces, denture, x-ray, implant, sealant, veneer, fluoride, exam.")
+    same = coverage["ppo"] == coverage["premier"]
+    lines = []
+    if coverage.get("category"):
+        lines.append(f"This falls under **{coverage['category']}**.")
+    lines.append(f"Coverage is the same for PPO and Premier dentists at {coverage['ppo']}%." if same else
+                 f"Your plan pays {coverage['ppo']}% with a Delta Dental PPO dentist and "
+                 f"{coverage['premier']}% with a Delta Dental Premier dentist.")
+    notes = []
+    for procedure, _ in matches:
+        result = estimate(procedure, coverage, query)
+        full = _money_range(procedure["cost_low"], procedure["cost_high"])
+        if same:
+            lines.append(f"\n**{procedure['name']}** (typical fee {full}): estimated out-of-pocket "
+                         f"{_money_range(*result['ppo'])}.")
+        else:
+            lines.append(f"\n**{procedure['name']}** (typical fee {full}):\n"
+                         f"- With a Delta Dental PPO dentist: {_money_range(*result['ppo'])}\n"
+                         f"- With a Delta Dental Premier dentist: {_money_range(*result['premier'])}")
+        if result["deductible"] and not notes:
+            notes.append(f"Includes your ${result['deductible']:,.0f} deductible.")
+        if result["remaining_maximum"] is not None and not any("maximum" in n for n in notes):
+            notes.append(f"Assumes ${result['remaining_maximum']:,.0f} of your annual maximum is left; "
+                         f"anything the plan would pay beyond that is yours.")
+    if notes:
+        lines.append("\n" + " ".join(notes))
+    lines.append("\nEstimates use typical fees for the area; your dentist's actual fee may differ.")
+    return "\n".join(lines)
+
+
+def answer_cost_question(query, coverage, index, reword=None):
+    """
+    Cost answer without the cost estimator agent.
+    :param index: ProcedureIndex over the procedure cost data.
+    :param reword: optional (question, answer) -> str; one LLM call that only rewords the answer.
+    """
+    answer = render(resolve_procedure(query, index), coverage, query)
+    if reword:
+        try:
+            return reword(query, answer)
+        except Exception as e:
+            print(f"  → Cost answer wording skipped ({e})")
+            fallback(f"cost answer wording skipped: {e}")
+    return answer
@@ -2,19 +2,27 @@
 
 # Downloads procedure_costs.json from blob
 # get_procedure_cost(procedure, coverage_percent) → finds matching procedures, calculates out-of-pocket
+# Matching goes through ProcedureIndex (procedure_index.py): lay terms, typos and CDT codes
+# all land on the first call, ranked by match score
 # Agent passes plan context so it knows coverage %
+# COST_MODE=deterministic skips the agent: estimate_cost_answer computes both network tiers
+# locally (cost_answer.py) and, with COST_LLM_WORDING, has the LLM reword only the final text
 
 import os
 import json
 from dotenv import load_dotenv
-from azure.storage.blob import BlobServiceClient
-from azure.ai.agents import AgentsClient
-from azure.ai.agents.models import FunctionTool, MessageTextContent, MessageRole, AgentThreadCreationOptions, ThreadMessageOptions
-from azure.identity import DefaultAzureCredential
+from agent_clients import register_tools, run_agent_text, stream_agent_text
+from procedure_index import ProcedureIndex
+from answer_cache import data_hash
+from resources import resource
+from services import blob_service_client
+from cost_answer import answer_cost_question, COST_LLM_WORDING
+from tracing import span
 
 load_dotenv()
 
 AZURE_AI_PROJECT_ENDPOINT = os.getenv("AZURE_AI_PROJECT_ENDPOINT")
+AZURE_OPENAI_DEPLOYMENT = os.getenv("AZURE_OPENAI_DEPLOYMENT")
 AZURE_STORAGE_CONNECTION_STRING = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
 COST_ESTIMATOR_AGENT_ID = os.getenv("COST_ESTIMATOR_AGENT_ID")
 CONTAINER_NAME = "procedurecosts"
@@ -22,30 +30,36 @@ CONTAINER_NAME = "procedurecosts"
 
 def load_procedure_costs():
     """Download procedure_costs.json from Azure Blob Storage."""
-    blob_service_client = BlobServiceClient.from_connection_string(AZURE_STORAGE_CONNECTION_STRING)
-    container = blob_service_client.get_container_client(CONTAINER_NAME)
+    container = blob_service_client(AZURE_STORAGE_CONNECTION_STRING).get_container_client(CONTAINER_NAME)
     blob_data = container.download_blob("procedure_costs.json").readall()
     data = json.loads(blob_data)
     return data["procedures"]
 
 
-# Load once at module level
-PROCEDURES = load_procedure_costs()
+def _load_procedure_data():
+    procedures = load_procedure_costs()
+    return {"PROCEDURES": procedures, "PROCEDURES_VERSION": data_hash(procedures), "PROCEDURE_INDEX": ProcedureIndex(procedures)}
+
+
+# Downloaded on first use, once per process
+procedure_data = resource("procedures", _load_procedure_data)
+
+
+def __getattr__(name):
+    """PROCEDURES, PROCEDURES_VERSION and PROCEDURE_INDEX load on first access."""
+    if name in ("PROCEDURES", "PROCEDURES_VERSION", "PROCEDURE_INDEX"):
+        return procedure_data.get()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def get_procedure_cost(procedure: str, coverage_percent: str = "0") -> str:
     """
     Look up the cost of a dental procedure and calculate patient out-of-pocket cost.
-    :param procedure: Name or keyword of the procedure (e.g. cleaning, root canal, crown, extraction, wisdom tooth, filling, braces, denture, x-ray, implant, sealant, veneer, fluoride, exam).
+    :param procedure: Name, keyword, everyday phrasing or CDT code of the procedure (e.g. cleaning, root canal, crown, tooth pulled, wisdom teeth, cavity filling, braces, dentures, x-ray, implant, D2740).
     :param coverage_percent: Insurance coverage percentage as a number 0-100 (e.g. '80' for 80% coverage). Default '0' for no insurance.
     :return: Cost estimate and out-of-pocket calculation.
     """
-    keyword = procedure.lower()
-    matches = [p for p in PROCEDURES if keyword in p["name"].lower()]
-
-    if not matches:
-        # Try matching by category
-        matches = [p for p in PROCEDURES if keyword in p["category"].lower()]
+    matches = procedure_data.get()["PROCEDURE_INDEX"].search(procedure)
 
     if not matches:
         return f"No cost data found for '{procedure}'. Try: cleaning, filling, crown, root canal, extraction, wisdom tooth, braces, denture, x-ray, implant, sealant, veneer, fluoride, exam."
@@ -58,7 +72,7 @@ def get_procedure_cost(procedure: str, coverage_percent: str = "0") -> str:
     coverage = max(0.0, min(1.0, coverage))
 
     output = []
-    for p in matches:
+    for p, score in matches:
         avg_cost = (p["cost_low"] + p["cost_high"]) / 2
         patient_low = p["cost_low"] * (1 - coverage)
         patient_high = p["cost_high"] * (1 - coverage)
@@ -67,7 +81,8 @@ def get_procedure_cost(procedure: str, coverage_percent: str = "0") -> str:
             f"Procedure: {p['name']}\n"
             f"Category: {p['category']}\n"
             f"Full Cost: ${p['cost_low']:,.0f} - ${p['cost_high']:,.0f}\n"
-            f"Average Cost: ${avg_cost:,.0f}"
+            f"Average Cost: ${avg_cost:,.0f}\n"
+            f"Match Score: {score:.2f}"
         )
 
         if coverage > 0:
@@ -81,52 +96,64 @@ def get_procedure_cost(procedure: str, coverage_percent: str = "0") -> str:
     return "\n\n---\n\n".join(output)
 
 
+def get_procedure_cost_tool(procedure: str, coverage_percent: str = "0") -> str:
+    """
+    Look up the cost of a dental procedure and calculate patient out-of-pocket cost.
+    :param procedure: Name, keyword, everyday phrasing or CDT code of the procedure (e.g. cleaning, root canal, crown, tooth pulled, wisdom teeth, cavity filling, braces, dentures, x-ray, implant, D2740).
+    :param coverage_percent: Insurance coverage percentage as a number 0-100 (e.g. '80' for 80% coverage). Default '0' for no insurance.
+    :return: Cost estimate and out-of-pocket calculation.
+    """
+    return get_procedure_cost(procedure, coverage_percent)
+
+
+register_tools(get_procedure_cost_tool)
+
+
 def run_cost_estimator_agent(user_query: str, plan_filter: str = None):
     """Run the cost estimator agent with cost lookup tool."""
-    agents_client = AgentsClient(
-        endpoint=AZURE_AI_PROJECT_ENDPOINT,
-        credential=DefaultAzureCredential(),
-    )
-
-    def get_procedure_cost_tool(procedure: str, coverage_percent: str = "0") -> str:
-        """
-        Look up the cost of a dental procedure and calculate patient out-of-pocket cost.
-        :param procedure: Name or keyword of the procedure (e.g. cleaning, root canal, crown, extraction, wisdom tooth, filling, braces, denture, x-ray, implant, sealant, veneer, fluoride, exam).
-        :param coverage_percent: Insurance coverage percentage as a number 0-100 (e.g. '80' for 80% coverage). Default '0' for no insurance.
-        :return: Cost estimate and out-of-pocket calculation.
-        """
-        return get_procedure_cost(procedure, coverage_percent)
-
-    functions = FunctionTool(functions=[get_procedure_cost_tool])
-
-    with agents_client:
-        agents_client.enable_auto_function_calls(functions)
-
-        # Add plan context to help agent know coverage percentages
-        enhanced_query = user_query
-        if plan_filter:
-            enhanced_query += f"\n(User's plan: {plan_filter})"
-
-        run = agents_client.create_thread_and_process_run(
-            agent_id=COST_ESTIMATOR_AGENT_ID,
-            thread=AgentThreadCreationOptions(
-                messages=[ThreadMessageOptions(role="user", content=enhanced_query)]
-            ),
+    # Add plan context to help agent know coverage percentages
+    enhanced_query = user_query
+    if plan_filter:
+        enhanced_query += f"\n(User's plan: {plan_filter})"
+
+    response_text = run_agent_text(COST_ESTIMATOR_AGENT_ID, enhanced_query, name="cost_estimator")
+# NOTED OUT PRINT STATEMENT SO ORCHESTRATOR DOES NOT DOUBLE OUTPUT
+    #print(f"\nCost Estimator: {response_text}")
+    return response_text or "No response generated."
+
+
+def stream_cost_estimator_agent(user_query: str, plan_filter: str = None):
+    """Like run_cost_estimator_agent, but yields the reply text as it streams."""
+    enhanced_query = user_query
+    if plan_filter:
+        enhanced_query += f"\n(User's plan: {plan_filter})"
+    yield from stream_agent_text(COST_ESTIMATOR_AGENT_ID, enhanced_query, name="cost_estimator")
+
+
+def word_cost_answer(question: str, answer: str) -> str:
+    """One chat completion that rewords a computed cost answer; numbers must come back unchanged."""
+    from coverage_agent import get_openai_client
+    with span("openai.chat", model=AZURE_OPENAI_DEPLOYMENT, purpose="cost_wording") as chat_span:
+        response = get_openai_client().chat.completions.create(
+            model=AZURE_OPENAI_DEPLOYMENT,
+            messages=[
+                {"role": "system", "content": "Reword this dental cost estimate as a friendly, concise answer to the "
+                                              "member's question. Keep every number, percentage and procedure name "
+                                              "exactly as given. Do not add new facts."},
+                {"role": "user", "content": f"Question: {question}\n\nEstimate:\n{answer}"},
+            ],
+            temperature=0,
         )
+        usage = getattr(response, "usage", None)
+        chat_span.set(prompt_tokens=getattr(usage, "prompt_tokens", None),
+                      completion_tokens=getattr(usage, "completion_tokens", None))
+    return response.choices[0].message.content or answer
 
-        messages = list(agents_client.messages.list(thread_id=run.thread_id))
 
-        response_text = None
-        for msg in messages:
-            if msg.role == MessageRole.AGENT:
-                for item in msg.content:
-                    if isinstance(item, MessageTextContent):
-                        response_text = item.text.value
-                        break
-                break
-# NOTED OUT PRINT STATEMENT SO ORCHESTRATOR DOES NOT DOUBLE OUTPUT
-        #print(f"\nCost Estimator: {response_text}")
-        return response_text or "No response generated."
+def estimate_cost_answer(user_query: str, coverage: dict) -> str:
+    """Deterministic cost answer for both network tiers, without the cost estimator agent."""
+    return answer_cost_question(user_query, coverage, procedure_data.get()["PROCEDURE_INDEX"],
+                                reword=word_cost_answer if COST_LLM_WORDING else None)
 
 
 # ── Entry point for standalone testing ────────────────────────────────────────
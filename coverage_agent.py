@@ -1,12 +1,16 @@
 from asyncio import run
 import os
 from dotenv import load_dotenv
-from azure.search.documents import SearchClient
-from azure.search.documents.models import VectorizedQuery
-from azure.core.credentials import AzureKeyCredential
-from openai import AzureOpenAI
 from typing import Annotated
 from pydantic import Field
+from contextvars import ContextVar
+from agent_clients import register_tools, run_agent_text, stream_agent_text
+from embedding_cache import EmbeddingCache, EMBEDDING_DIMENSIONS, EMBEDDING_OPTIONS
+from coverage_table import procedure_categories
+from resources import resource
+from services import openai_client as create_openai_client, search_client
+from tracing import span
+from task_graph import fallback
 
 # Load environment variables
 load_dotenv()
@@ -19,13 +23,99 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 AZURE_SEARCH_ENDPOINT = os.getenv("AZURE_SEARCH_ENDPOINT")
 AZURE_SEARCH_API_KEY = os.getenv("AZURE_SEARCH_API_KEY")
 INDEX_NAME = "dental-plans"
+# Retrieval backend: "azure" (Azure AI Search) or "local" (in-process index written by ingest.py)
+RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "azure").lower()
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", "local_index")
+# "hybrid" (vector + BM25, fused by reciprocal-rank fusion), "vector" or "lexical" (no embedding call)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid").lower()
+# Chunks returned to the agent per search
+SEARCH_TOP = int(os.getenv("SEARCH_TOP", "3"))
+# Rows each ranking contributes to the fusion (local backend)
+RRF_CANDIDATES = int(os.getenv("RRF_CANDIDATES", "50"))
+# Search only chunks tagged with the procedure category a query names ("root canal" -> endodontic,
+# see chunker.py), returning CATEGORY_SEARCH_TOP chunks; an empty result retries unfiltered
+CATEGORY_FILTER = os.getenv("CATEGORY_FILTER", "true").lower() in ("1", "true", "yes")
+CATEGORY_SEARCH_TOP = int(os.getenv("CATEGORY_SEARCH_TOP", "2"))
+
+# Azure OpenAI client (the openai package is slow to import, so both wait for first use)
+openai_client = resource("openai_client", create_openai_client)
+
+
+def get_openai_client():
+    return openai_client.get()
+
+# Query embeddings: in-process LRU + on-disk store shared by every worker process (its directory
+# is created and read on first use, so importing this module does not touch the filesystem)
+embedding_cache = resource("embedding_cache", lambda: EmbeddingCache(AZURE_EMBEDDING_DEPLOYMENT))
+
+_local_index = None
+
+
+def get_local_index():
+    """Load the local vector index once per process."""
+    global _local_index
+    if _local_index is None:
+        from vector_store import load_local_index
+        _local_index = load_local_index(LOCAL_INDEX_DIR, EMBEDDING_DIMENSIONS)
+    return _local_index
+
+
+def search_chunks(query: str, query_vector: list, plan_filter: str = None, top: int = SEARCH_TOP,
+                  categories: list = None) -> list:
+    """
+    Run one retrieval against the configured backend. Returns dicts with text and source.
+    :param query_vector: the query embedding, or None for a lexical-only search.
+    :param categories: only chunks tagged with any of these category keys.
+    """
+    source = plan_filter if plan_filter and plan_filter != "None" else None
+
+    if RETRIEVAL_BACKEND == "local":
+        index = get_local_index()
+        if query_vector is None:
+            return index.search_text(query, top=top, source=source, categories=categories)
+        if RETRIEVAL_MODE == "vector":
+            return index.search(query_vector, top=top, source=source, categories=categories)
+        return index.hybrid_search(query, query_vector, top=top, source=source, candidates=RRF_CANDIDATES,
+                                   categories=categories)
+
+    from azure.search.documents.models import VectorizedQuery
+
+    # Build vector query (Azure AI Search fuses it with the text query by RRF itself)
+    vector_queries = None
+    if query_vector is not None:
+        vector_queries = [VectorizedQuery(
+            vector=query_vector,
+            fields="embedding"
+        )]
+
+    # Connect to AI Search
+    client = search_client(AZURE_SEARCH_ENDPOINT, INDEX_NAME, AZURE_SEARCH_API_KEY)
+
+    # Apply source filter if plan specified, and the category filter if asked
+    clauses = [f"source eq '{source}'"] if source else []
+    if categories:
+        clauses.append("categories/any(c: " + " or ".join(f"c eq '{c}'" for c in categories) + ")")
+    filter_expr = " and ".join(clauses) or None
+
+    results = client.search(
+        search_text=query if RETRIEVAL_MODE != "vector" or query_vector is None else None,
+        vector_queries=vector_queries,
+        filter=filter_expr,
+        top=top,
+        select=["text", "source"]
+    )
+    return list(results)
+
+def embed_query(query: str) -> list:
+    with span("openai.embeddings", model=AZURE_EMBEDDING_DEPLOYMENT, dimensions=EMBEDDING_DIMENSIONS) as embed_span:
+        response = get_openai_client().embeddings.create(
+            input=query,
+            model=AZURE_EMBEDDING_DEPLOYMENT,
+            **EMBEDDING_OPTIONS
+        )
+        embed_span.set(prompt_tokens=getattr(response.usage, "prompt_tokens", None))
+    return response.data[0].embedding
 
-# Azure OpenAI client 
-openai_client = AzureOpenAI(
-    api_key=os.getenv("OPENAI_API_KEY"),
-    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-    api_version="2024-10-21"
-)
 
 # Tool: Search dental plan documents
 def search_dental_plan(
@@ -34,36 +124,30 @@ def search_dental_plan(
 ) -> str:
     """Search the dental plan documents for relevant coverage information."""
     try:
-        # Generate embedding for query
-        response = openai_client.embeddings.create(
-            input=query,
-            model=AZURE_EMBEDDING_DEPLOYMENT
-        )
-        query_vector = response.data[0].embedding
-
-        # Build vector query
-        vector_query = VectorizedQuery(
-            vector=query_vector,
-            fields="embedding"
-        )
-
-        # Connect to AI Search
-        search_client = SearchClient(
-            endpoint=AZURE_SEARCH_ENDPOINT,
-            index_name=INDEX_NAME,
-            credential=AzureKeyCredential(AZURE_SEARCH_API_KEY)
-        )
-
-        # Apply source filter if plan specified
-        filter_expr = f"source eq '{plan_filter}'" if plan_filter and plan_filter != "None" else None
-
-        results = search_client.search(
-            search_text=query,
-            vector_queries=[vector_query],
-            filter=filter_expr,
-            top=3,
-            select=["text", "source"]
-        )
+        # Generate embedding for query (cached by normalized text); lexical mode needs none
+        query_vector = None
+        if RETRIEVAL_MODE != "lexical":
+            try:
+                query_vector = embedding_cache.get().get_or_embed(query, embed_query)
+            except Exception as e:
+                # The local BM25 index can still answer without the embeddings endpoint
+                if RETRIEVAL_BACKEND != "local":
+                    raise
+                print(f"  → Embedding failed ({e}); searching the lexical index only")
+                fallback(f"embedding failed: {e}")
+
+        mode = RETRIEVAL_MODE if query_vector is not None else "lexical"
+        categories = procedure_categories(query, first_only=True) if CATEGORY_FILTER else []
+        with span("search", backend=RETRIEVAL_BACKEND, mode=mode, plan=plan_filter,
+                  categories=",".join(categories) or None) as search_span:
+            results = []
+            if categories:
+                results = search_chunks(query, query_vector, plan_filter, top=CATEGORY_SEARCH_TOP, categories=categories)
+            if not results:
+                if categories:
+                    search_span.set(category_fallback=True)
+                results = search_chunks(query, query_vector, plan_filter)
+            search_span.set(results=len(results))
 
         chunks = [doc["text"] for doc in results]
         if not chunks:
@@ -72,56 +156,44 @@ def search_dental_plan(
         return "\n\n---\n\n".join(chunks)
 
     except Exception as e:
+        fallback(f"coverage search failed: {e}")
         return f"Search error: {e}"
 
-# Main agent function 
-def run_coverage_agent(user_query: str, plan_filter: str = None):
-    from azure.ai.agents import AgentsClient
-    from azure.ai.agents.models import FunctionTool, MessageTextContent
-    from azure.identity import DefaultAzureCredential
+# Plan filter of the coverage run in progress. The shared client runs tools in the calling
+# thread, so each concurrent run sees its own value.
+_plan_filter = ContextVar("plan_filter", default=None)
 
-    agent_id = os.getenv("COVERAGE_AGENT_ID")
 
-    def search_dental_plan_tool(query: str) -> str:
-        """
-        Search dental plan documents for coverage information.
-        :param query: The user's dental coverage question.
-        :return: Relevant plan text chunks.
-        """
-        return search_dental_plan(query, plan_filter or "None")
+def search_dental_plan_tool(query: str) -> str:
+    """
+    Search dental plan documents for coverage information.
+    :param query: The user's dental coverage question.
+    :return: Relevant plan text chunks.
+    """
+    return search_dental_plan(query, _plan_filter.get() or "None")
 
-    functions = FunctionTool(functions=[search_dental_plan_tool])
 
-    agents_client = AgentsClient(
-        endpoint=AZURE_AI_PROJECT_ENDPOINT,
-        credential=DefaultAzureCredential(),
-    )
+register_tools(search_dental_plan_tool)
 
-    with agents_client:
-        agents_client.enable_auto_function_calls(functions)
 
-        from azure.ai.agents.models import AgentThreadCreationOptions, ThreadMessageOptions
-        from azure.ai.agents.models import FunctionTool, MessageTextContent, MessageRole
-        run = agents_client.create_thread_and_process_run(
-            agent_id=agent_id,
-            thread=AgentThreadCreationOptions(
-                messages=[ThreadMessageOptions(role="user", content=user_query)]
-            )
-        )
+# Main agent function 
+def run_coverage_agent(user_query: str, plan_filter: str = None):
+    token = _plan_filter.set(plan_filter)
+    try:
+        response_text = run_agent_text(os.getenv("COVERAGE_AGENT_ID"), user_query, name="coverage")
+    finally:
+        _plan_filter.reset(token)
+
+    print(f"\nCoverage Agent: {response_text}")
+    return response_text or "No response generated."
 
-        messages = list(agents_client.messages.list(thread_id=run.thread_id))
-       
-        response_text = None
-        for msg in messages:
-            if msg.role == MessageRole.AGENT:
-                for item in msg.content:
-                    if isinstance(item, MessageTextContent):
-                        response_text = item.text.value
-                        break
-                break  
-
-        print(f"\nCoverage Agent: {response_text}")
-        return response_text or "No response generated."
+def stream_coverage_agent(user_query: str, plan_filter: str = None):
+    """Like run_coverage_agent, but yields the reply text as it streams."""
+    token = _plan_filter.set(plan_filter)
+    try:
+        yield from stream_agent_text(os.getenv("COVERAGE_AGENT_ID"), user_query, name="coverage")
+    finally:
+        _plan_filter.reset(token)
 
 # ── Entry point ───────────────────────────────────────────────────────────────
 if __name__ == "__main__":
@@ -0,0 +1,222 @@
+# Structured coverage table — built by ingest.py from each plan's benefit summary
+# Each "Covered Services" row in a plan PDF ends with three percentages (PPO, Premier,
+# Nonparticipating dentist), e.g.
+#   Endodontic Services – root canals 50% 50% 50%
+# Rows are parsed into
+#   {category: {"description", "ppo", "premier", "out_of_network", "deductible_applies", "annual_maximum"}}
+# per plan file, plus the plan's annual / orthodontic lifetime maximum and deductible, and written
+# to COVERAGE_TABLE next to the local index. The cost chain reads coverage percentages from here
+# with a dictionary lookup and only asks the coverage agent when a plan or category is missing.
+
+import os
+import re
+import json
+
+COVERAGE_TABLE = os.getenv("COVERAGE_TABLE", os.path.join(os.getenv("LOCAL_INDEX_DIR", "local_index"), "coverage_table.json"))
+
+ROW_RE = re.compile(r"^(?P<text>.*?)\s*(?P<ppo>\d{1,3})%\s+(?P<premier>\d{1,3})%\s+(?P<oon>\d{1,3})%\s*$")
+TABLE_START_RE = re.compile(r"^(plan\s+)?pays\b", re.IGNORECASE)
+TABLE_END_RE = re.compile(r"^(\*|➢|maximum payment|orthodontic age limit)", re.IGNORECASE)
+DASH_RE = re.compile(r"\s*[–—-]\s+|\s*[–—]\s*")
+ANNUAL_MAX_RE = re.compile(r"(?:maximum payment\s*[–—-]|annual maximum\s*:)\s*(\$[\d,]+)([^.]*?except ([^.]+))?", re.IGNORECASE)
+ORTHO_MAX_RE = re.compile(r"(\$[\d,]+) per (?:member|person) total\s+per\s+lifetime\s+on\s+orthodontic|"
+                          r"lifetime orthodontic maximum\s*:\s*(\$[\d,]+)", re.IGNORECASE)
+DEDUCTIBLE_RE = re.compile(r"deductible\s*[–—:-]\s*(none|\$[\d,]+)", re.IGNORECASE)
+DEDUCTIBLE_EXEMPT_RE = re.compile(r"deductible[^.]*does not apply to ([^.]+)", re.IGNORECASE)
+
+# Query keyword -> category keys to try in order (see category_key). Longer phrases first so
+# "deep cleaning" is not read as a routine cleaning.
+PROCEDURE_CATEGORIES = [
+    ("deep cleaning", ["periodontic"]),
+    ("scaling", ["periodontic"]),
+    ("gum disease", ["periodontic"]),
+    ("gum", ["periodontic"]),
+    ("root canal", ["endodontic"]),
+    ("wisdom tooth", ["extraction", "oral surgery"]),
+    ("wisdom teeth", ["extraction", "oral surgery"]),
+    ("extraction", ["extraction", "oral surgery"]),
+    ("pulled", ["extraction", "oral surgery"]),
+    ("crown repair", ["minor restorative"]),
+    ("crown", ["major restorative"]),
+    ("filling", ["minor restorative"]),
+    ("cavity", ["minor restorative"]),
+    ("implant", ["prosthodontic"]),
+    ("bridge", ["prosthodontic"]),
+    ("denture", ["prosthodontic"]),
+    ("braces", ["orthodontic"]),
+    ("orthodont", ["orthodontic"]),
+    ("invisalign", ["orthodontic"]),
+    ("x-ray", ["radiograph"]),
+    ("xray", ["radiograph"]),
+    ("radiograph", ["radiograph"]),
+    ("sealant", ["sealant"]),
+    ("veneer", ["veneer"]),
+    ("biopsy", ["brush biopsy"]),
+    ("fluoride", ["diagnostic and preventive", "preventive"]),
+    ("cleaning", ["diagnostic and preventive", "preventive"]),
+    ("checkup", ["diagnostic and preventive", "diagnostic"]),
+    ("exam", ["diagnostic and preventive", "diagnostic"]),
+    ("emergency", ["palliative treatment", "palliative"]),
+    ("pain", ["palliative treatment", "palliative"]),
+    # Category names themselves, as in the coverage queries request_graph.py writes ("Endodontic Services")
+    ("endodontic", ["endodontic"]),
+    ("periodontic", ["periodontic"]),
+    ("prosthodontic", ["prosthodontic"]),
+    ("minor restorative", ["minor restorative"]),
+    ("major restorative", ["major restorative"]),
+    ("oral surgery", ["oral surgery"]),
+    ("diagnostic", ["diagnostic and preventive", "diagnostic"]),
+    ("preventive", ["diagnostic and preventive", "preventive"]),
+    ("palliative", ["palliative treatment", "palliative"]),
+]
+# Every keyword in one pattern, whole words with plural / adjective endings ("x-rays", "orthodontics");
+# alternatives are tried in list order, so "deep cleaning" is matched before "cleaning"
+PROCEDURE_RE = re.compile(r"\b(" + "|".join(re.escape(keyword) for keyword, _ in PROCEDURE_CATEGORIES) +
+                          r")(?:s|es|ed|ic|ics|ist|ists)?\b")
+PROCEDURE_RANKS = {keyword: rank for rank, (keyword, _) in enumerate(PROCEDURE_CATEGORIES)}
+
+
+def category_key(name):
+    """'Endodontic Services' and 'Endodontics' -> 'endodontic'."""
+    words = re.sub(r"[^a-z ]", " ", name.lower().replace("&", " and ")).split()
+    words = [w[:-1] if w.endswith("s") and len(w) > 3 else w for w in words if w not in ("services", "service")]
+    return " ".join(words)
+
+
+def procedure_categories(text, first_only=False):
+    """
+    Category keys for the procedures a text mentions: "root canals and crowns" ->
+    ["endodontic", "major restorative"].
+    :param first_only: keys of the first keyword only, in PROCEDURE_CATEGORIES order (how a query is read).
+    """
+    ranks = sorted({PROCEDURE_RANKS[keyword] for keyword in PROCEDURE_RE.findall(text.lower())})
+    if first_only:
+        return list(PROCEDURE_CATEGORIES[ranks[0]][1]) if ranks else []
+    found = []
+    for rank in ranks:
+        found.extend(key for key in PROCEDURE_CATEGORIES[rank][1] if key not in found)
+    return found
+
+
+def parse_coverage_table(text):
+    """
+    Coverage rows and plan-level limits from a plan's text; {} when the text has no table.
+    :return: {"annual_maximum", "orthodontic_maximum", "deductible", "categories": {name: row}}
+    """
+    categories = {}
+    in_table, pending = False, []
+    for line in text.splitlines():
+        line = " ".join(line.split())
+        if not line:
+            continue
+        if not in_table:
+            in_table = bool(TABLE_START_RE.search(line))
+            continue
+        if TABLE_END_RE.search(line):
+            if categories:
+                break
+            continue
+        match = ROW_RE.match(line)
+        if not match:
+            # Section headings ("Basic Services") have no dash; row text that wraps does
+            if pending or DASH_RE.search(line):
+                pending.append(line)
+            continue
+        row_text = " ".join(pending + [match.group("text")]).strip()
+        pending = []
+        name, description = (DASH_RE.split(row_text, maxsplit=1) + [""])[:2]
+        name = re.sub(r"\s*\(.*?\)\s*", " ", name).strip() or row_text
+        categories[name] = {
+            "description": description.strip(),
+            "ppo": int(match.group("ppo")),
+            "premier": int(match.group("premier")),
+            "out_of_network": int(match.group("oon")),
+        }
+    if not categories:
+        return {}
+
+    annual = ANNUAL_MAX_RE.search(text)
+    ortho = ORTHO_MAX_RE.search(text)
+    deductible = DEDUCTIBLE_RE.search(text)
+    exempt = DEDUCTIBLE_EXEMPT_RE.search(text)
+    # Services the annual maximum does not count ("on all services, except diagnostic and preventive services, ...")
+    uncapped = " ".join(annual.group(3).lower().split()) if annual and annual.group(3) else ""
+    table = {
+        "annual_maximum": annual.group(1) if annual else None,
+        "orthodontic_maximum": (ortho.group(1) or ortho.group(2)) if ortho else None,
+        "deductible": None if not deductible or deductible.group(1).lower() == "none" else deductible.group(1),
+        "categories": categories,
+    }
+    for name, row in categories.items():
+        if deductible is None:
+            row["deductible_applies"] = None  # the summary does not say
+        elif table["deductible"] is None:
+            row["deductible_applies"] = False
+        else:
+            row["deductible_applies"] = not (exempt and category_key(name).split()[0] in exempt.group(1).lower())
+        key = category_key(name)
+        if key.startswith("orthodontic") and table["orthodontic_maximum"]:
+            row["annual_maximum"] = table["orthodontic_maximum"]
+        elif uncapped and (key.split()[0] in uncapped or (row["description"] and row["description"].lower() in uncapped)):
+            row["annual_maximum"] = None
+        else:
+            row["annual_maximum"] = table["annual_maximum"]
+    return table
+
+
+def save_coverage_table(plans, version, path=COVERAGE_TABLE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "plans": plans}, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+_loaded = (None, None)  # (mtime, plans)
+
+
+def load_coverage_table(path=COVERAGE_TABLE):
+    """{plan file: table} as last written by ingest.py; re-read only when the file changes."""
+    global _loaded
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+    if _loaded[0] != mtime:
+        try:
+            with open(path, encoding="utf-8") as f:
+                plans = json.load(f).get("plans", {})
+        except (OSError, ValueError):
+            plans = {}
+        _loaded = (mtime, plans)
+    return _loaded[1]
+
+
+def find_category(table, query):
+    """
+    (category name, row) in this plan's table for the procedure the query mentions, or None.
+    Keywords match as whole words ("gum" not in "begum"); when the plan has no row for the
+    first keyword's categories, the next keyword the query mentions is tried.
+    """
+    by_key = {category_key(name): name for name in table.get("categories", {})}
+    for key in procedure_categories(query):
+        if key in by_key:
+            return by_key[key], table["categories"][by_key[key]]
+    return None
+
+
+def lookup_coverage(query, plan_filter, path=COVERAGE_TABLE):
+    """
+    Coverage for the procedure in `query` under one plan, in extract_coverage_percent's format
+    ({"ppo": "50", "premier": "50", ...}) plus the row's other fields; None when the plan has no
+    table or the category is not in it (the caller then asks the coverage agent).
+    """
+    if not plan_filter:
+        return None
+    table = load_coverage_table(path).get(plan_filter)
+    found = find_category(table, query) if table else None
+    if not found:
+        return None
+    name, row = found
+    return dict(row, category=name, ppo=str(row["ppo"]), premier=str(row["premier"]),
+                out_of_network=str(row["out_of_network"]), deductible=table.get("deductible"))
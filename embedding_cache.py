@@ -0,0 +1,210 @@
+# Query embedding cache — in-process LRU in front of a persistent on-disk store
+# Keys are sha256(deployment + normalized text); normalization collapses whitespace and case,
+# so the orchestrator's canned coverage prompts always hit.
+# Disk layout, one directory per embedding deployment and size (EMBEDDING_DIMENSIONS):
+#   EMBEDDING_CACHE_DIR/<deployment>/<dimensions>/vectors.f32   append-only float32 rows, read via np.memmap
+#   EMBEDDING_CACHE_DIR/<deployment>/<dimensions>/keys.log      "<key> <row> <dimensions>" lines, appended after the row
+#   EMBEDDING_CACHE_DIR/<deployment>/<dimensions>/.lock         flock held while appending
+# text-embedding-3 vectors are Matryoshka embeddings: their leading components are a valid
+# smaller embedding. So after the dimensions are reduced, a miss first looks in the wider
+# stores of the same deployment and truncates + renormalizes what it finds instead of re-embedding.
+# Appends are serialized with an exclusive file lock and a key line is written only after its
+# row, so several processes (Streamlit workers) can share the store and pick up each other's
+# entries by re-reading the tail of keys.log on a miss.
+
+import os
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from tracing import span, record
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process use only
+    fcntl = None
+
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "embedding_cache")
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "1024"))
+# Embedding size for ingest, queries and the index schema. Sent as the `dimensions` parameter
+# only when set (text-embedding-3 models); unset keeps the deployment's native 1536.
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS") or 1536)
+EMBEDDING_OPTIONS = {"dimensions": EMBEDDING_DIMENSIONS} if os.getenv("EMBEDDING_DIMENSIONS") else {}
+
+
+def normalize_text(text):
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+
+def truncate_embedding(vector, dimensions=EMBEDDING_DIMENSIONS):
+    """The first `dimensions` components of a Matryoshka embedding, renormalized to unit length."""
+    vector = np.asarray(vector, dtype=np.float32)[..., :dimensions]
+    norms = np.linalg.norm(vector, axis=-1, keepdims=True)
+    return vector / np.where(norms == 0, 1.0, norms)
+
+
+def cache_key(text, deployment):
+    return hashlib.sha256(f"{deployment}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class DiskTier:
+    """Append-only float32 rows plus a key log, shared between processes."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.keys_path = os.path.join(directory, "keys.log")
+        self.lock_path = os.path.join(directory, ".lock")
+        self.rows = {}          # key -> row
+        self.dimensions = None
+        self._keys_offset = 0   # bytes of keys.log already read
+        self._map = None
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self):
+        """Read key lines appended since the last refresh (possibly by other processes)."""
+        if not os.path.exists(self.keys_path):
+            return
+        with open(self.keys_path, "rb") as f:
+            f.seek(self._keys_offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1  # ignore a line still being written
+        for line in data[:end].decode("ascii").splitlines():
+            key, row, dimensions = line.split()
+            self.rows[key] = int(row)
+            self.dimensions = int(dimensions)
+        self._keys_offset += end
+
+    def _vector(self, row):
+        needed = (row + 1) * self.dimensions
+        if self._map is None or self._map.shape[0] < needed:
+            self._map = np.memmap(self.vectors_path, dtype=np.float32, mode="r")
+        return self._map[row * self.dimensions:needed]
+
+    def get(self, key):
+        with self._lock:
+            if key not in self.rows:
+                self.refresh()
+            row = self.rows.get(key)
+            if row is None:
+                return None
+            return self._vector(row).tolist()
+
+    def put(self, key, vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock, open(self.lock_path, "a") as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self.refresh()
+                if key in self.rows:
+                    return
+                if self.dimensions not in (None, len(vector)):
+                    raise ValueError(f"Embedding has {len(vector)} dimensions, cache holds {self.dimensions}")
+                with open(self.vectors_path, "ab") as f:
+                    row, torn = divmod(f.tell(), 4 * len(vector))
+                    if torn:  # a writer died mid-row; its key line was never written
+                        f.truncate(row * 4 * len(vector))
+                    f.write(vector.tobytes())
+                with open(self.keys_path, "ab") as f:
+                    f.write(f"{key} {row} {len(vector)}\n".encode("ascii"))
+                self.refresh()
+            finally:
+                if fcntl:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class EmbeddingCache:
+    def __init__(self, deployment, cache_dir=EMBEDDING_CACHE_DIR, max_entries=EMBEDDING_CACHE_SIZE,
+                 dimensions=EMBEDDING_DIMENSIONS):
+        """
+        :param deployment: Embedding deployment name; part of every key and the disk directory.
+        :param cache_dir: Root of the persistent tier; None or "" keeps the cache in memory only.
+        :param max_entries: Entries in the in-process LRU tier.
+        :param dimensions: Size of the cached embeddings; wider stores are truncated to it on a miss.
+        """
+        self.deployment = deployment
+        self.dimensions = dimensions
+        self.max_entries = max_entries
+        self.memory = OrderedDict()
+        self.disk = None
+        self.wider = []  # read-only stores of the same deployment with more dimensions, widest last
+        if cache_dir:
+            root = os.path.join(cache_dir, deployment or "default")
+            self.disk = DiskTier(os.path.join(root, str(dimensions)))
+            sizes = sorted(int(d) for d in os.listdir(root) if d.isdigit() and int(d) > dimensions)
+            self.wider = [DiskTier(os.path.join(root, str(size))) for size in sizes]
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "truncated_hits": 0, "misses": 0, "embed_seconds": 0.0}
+
+    def _remember(self, key, vector):
+        with self._lock:
+            self.memory[key] = vector
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.max_entries:
+                self.memory.popitem(last=False)
+
+    def get(self, text):
+        key = cache_key(text, self.deployment)
+        with self._lock:
+            vector = self.memory.get(key)
+            if vector is not None:
+                self.memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                record(embedding_cache="memory")
+                return vector
+        if self.disk:
+            vector = self.disk.get(key)
+            if vector is not None:
+                self._remember(key, vector)
+                with self._lock:
+                    self.stats["disk_hits"] += 1
+                record(embedding_cache="disk")
+                return vector
+            for tier in self.wider:
+                vector = tier.get(key)
+                if vector is not None:
+                    vector = truncate_embedding(vector, self.dimensions).tolist()
+                    self.put(text, vector)
+                    with self._lock:
+                        self.stats["truncated_hits"] += 1
+                    record(embedding_cache="truncated")
+                    return vector
+        return None
+
+    def put(self, text, vector):
+        key = cache_key(text, self.deployment)
+        self._remember(key, vector)
+        if self.disk:
+            self.disk.put(key, vector)
+
+    def get_or_embed(self, text, embed):
+        """Cached embedding of `text`, calling `embed(text)` (and timing it) on a miss."""
+        with span("embedding") as embedding_span:
+            vector = self.get(text)
+            if vector is not None:
+                return vector
+            embedding_span.set(embedding_cache="miss")
+            start = time.perf_counter()
+            vector = embed(text)
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.stats["misses"] += 1
+                self.stats["embed_seconds"] += elapsed
+            self.put(text, vector)
+            return vector
+
+    def report(self):
+        """Hit counts, hit rate and the embedding time hits saved (at the mean miss latency)."""
+        with self._lock:
+            stats = dict(self.stats)
+        hits = stats["memory_hits"] + stats["disk_hits"] + stats["truncated_hits"]
+        lookups = hits + stats["misses"]
+        mean_latency = stats["embed_seconds"] / stats["misses"] if stats["misses"] else 0.0
+        stats["hit_rate"] = hits / lookups if lookups else 0.0
+        stats["saved_seconds"] = hits * mean_latency
+        return stats
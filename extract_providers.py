@@ -0,0 +1,288 @@
+# Provider directory extraction — pdfstoextract/*.pdf → provider JSON
+# Parses Delta Dental "Find a dentist" PDF exports page by page and streams provider
+# records out of a line-based state machine, so memory is bounded by one PDF's pages
+# plus the deduplicated records.
+# Providers listed in more than one directory (e.g. both the PPO and the Premier export)
+# are merged: networks and accepts_new_patients are unioned, other fields keep the first value.
+# Output matches the schema provider_finder_agent.search_providers expects:
+#   {"providers": [{name, specialty, office_name, address, city, state, zip, phone, email, hours,
+#                   dentaqual_rating, networks, accepts_new_patients, education, gender,
+#                   languages, office_services, lat, lon}]}
+# lat/lon come from the bundled zip centroid table (geo.py).
+#
+# Usage:
+#   python extract_providers.py                                  # all PDFs in pdfstoextract/
+#   python extract_providers.py --merge "data/1stproviders (1).json" --out data/providers_statewide.json
+#   python extract_providers.py --upload                          # also upload to the providersjson container
+
+import os
+import re
+import glob
+import json
+import time
+import argparse
+import unicodedata
+from pdf_text import extract_pages
+from geo import geocode_provider, load_zip_centroids
+
+PDF_DIR = "pdfstoextract"
+DEFAULT_OUTPUT = os.path.join("data", "providers_statewide.json")
+SEED_PROVIDERS = os.path.join("data", "1stproviders (1).json")
+
+# "Label: value" lines → schema field. Labels differ between the two export formats.
+FIELD_LABELS = {
+    "dentist office name": "office_name",
+    "dental office name": "office_name",
+    "address": "address",
+    "dentist phone": "phone",
+    "phone number": "phone",
+    "email": "email",
+    "extended hours": "hours",
+    "dentaqual rating": "dentaqual_rating",
+    "dentist networks": "networks",
+    "education": "education",
+    "gender": "gender",
+    "provider languages": "languages",
+    "office services": "office_services",
+    # Present in the PDFs but not part of the provider schema
+    "race/ethnicity": None,
+    "race": None,
+}
+
+HEADER_RE = re.compile(r"^([^:()]+?) \(([A-Za-z /-]+)\)$")
+LABEL_RE = re.compile(r"^([A-Za-z/ ]+):\s*(.*)$")
+FOOTER_RE = re.compile(r"^(\d{1,2}/\d{1,2}/\d{2,4}, \d{1,2}:\d{2} [AP]M\b|https?://)")
+NETWORK_RE = re.compile(r"([^,()]+?)\s*\((accepts new patients|not accepting new patients)\)")
+ADDRESS_NO_COMMAS_RE = re.compile(r"^(.*?) ([A-Z]{2}) (\d{5})(?:-\d{4})?$")
+STATE_SUFFIX_RE = re.compile(r"_[A-Za-z]{2}\b")
+
+
+def normalize_line(line):
+    # NFKC folds the "ﬃ" ligature in "Oﬃce" back to "ffi"
+    return unicodedata.normalize("NFKC", line).strip()
+
+
+def iter_lines(path):
+    """Yield the normalized text lines of one PDF, page by page."""
+    with open(path, "rb") as f:
+        data = f.read()
+    for page in extract_pages(data):
+        for line in page.splitlines():
+            line = normalize_line(line)
+            if line and not FOOTER_RE.match(line):
+                yield line
+
+
+def iter_raw_records(lines):
+    """Group lines into {header, fields} records. Continuation lines join the previous field."""
+    record, field = None, None
+    for line in lines:
+        header = HEADER_RE.match(line)
+        if header and "accept" not in line.lower():
+            if record:
+                yield record
+            record = {"name": header.group(1).strip(), "specialty": header.group(2).strip()}
+            field = None
+            continue
+        if record is None:
+            continue  # intro text before the first dentist
+
+        label = LABEL_RE.match(line)
+        if label and label.group(1).strip().lower() in FIELD_LABELS:
+            field = FIELD_LABELS[label.group(1).strip().lower()]
+            if field:
+                record[field] = label.group(2).strip()
+        elif field:
+            record[field] = f"{record[field]} {line}".strip()
+    if record:
+        yield record
+
+
+def _title(value):
+    return value.title() if value.isupper() else value
+
+
+def _split_list(value):
+    return [part.strip() for part in value.split(",") if part.strip()] if value else []
+
+
+_cities = None
+
+
+def _centroid_cities(centroids):
+    """{lowercase city: city} for every city in the zip centroid table, built once."""
+    global _cities
+    if _cities is None:
+        _cities = {city.lower(): city for _, _, city in centroids.values()}
+    return _cities
+
+
+def parse_address(raw, known_cities):
+    """Return (street, city, state, zip) from either export's address format."""
+    raw = re.sub(r"\s+", " ", raw).strip()
+    parts = [p.strip() for p in raw.split(",") if p.strip()]
+    if len(parts) >= 4:
+        # "Office Name, 1 Woodward Ave Ste 1625, Detroit, MI, 48226"
+        zip_code, state, city = parts[-1], parts[-2], parts[-3]
+        street_parts = parts[:-3]
+        if len(street_parts) > 1 and not street_parts[0][:1].isdigit():
+            street_parts = street_parts[1:]
+        return ", ".join(street_parts), _title(city), state.upper(), zip_code[:5]
+
+    # "5055 N M 37 MESICK MI 49668" — no delimiter between street and city
+    match = ADDRESS_NO_COMMAS_RE.match(raw.replace(",", ""))
+    if not match:
+        return raw, "", "", ""
+    rest, state, zip_code = match.groups()
+    words = rest.split()
+    # Any Michigan city in the zip centroid table or seen so far, longest match first
+    centroids = load_zip_centroids()
+    cities = dict(_centroid_cities(centroids), **known_cities)
+    centroid = centroids.get(zip_code)
+    for size in (3, 2, 1):
+        candidate = " ".join(words[-size:]).lower()
+        if len(words) > size and candidate in cities:
+            return _title(" ".join(words[:-size])), cities[candidate], state, zip_code
+    if centroid:
+        return _title(rest), centroid[2], state, zip_code
+    # Unknown zip: guess the last word is the city
+    return _title(" ".join(words[:-1])), _title(words[-1]), state, zip_code
+
+
+def parse_phone(raw):
+    digits = re.sub(r"\D", "", raw or "")
+    if len(digits) == 10:
+        return f"({digits[:3]}) {digits[3:6]}-{digits[6:]}"
+    return (raw or "").strip()
+
+
+def parse_networks(raw):
+    networks, accepting = [], {}
+    for name, status in NETWORK_RE.findall(raw or ""):
+        name = re.sub(r"\s+", " ", name).strip()
+        if name not in accepting:
+            networks.append(name)
+        accepting[name] = accepting.get(name, False) or status == "accepts new patients"
+    return networks, accepting
+
+
+def to_provider(raw, known_cities):
+    """Convert a raw PDF record into the provider schema."""
+    office_name = raw.get("office_name", "")
+    street, city, state, zip_code = parse_address(raw.get("address", ""), known_cities)
+    networks, accepting = parse_networks(raw.get("networks", ""))
+    rating = raw.get("dentaqual_rating")
+    try:
+        rating = float(rating) if rating else None
+    except ValueError:
+        rating = None
+
+    provider = {
+        "name": _title(raw["name"]),
+        "specialty": raw["specialty"],
+        "office_name": office_name,
+        "address": f"{street}, {city}, {state} {zip_code}".strip(", "),
+        "city": city,
+        "state": state,
+        "zip": zip_code,
+        "phone": parse_phone(raw.get("phone")),
+        "email": raw.get("email", "").lower(),
+        "hours": raw.get("hours", ""),
+        "dentaqual_rating": rating,
+        "networks": networks,
+        "accepts_new_patients": accepting,
+        "education": STATE_SUFFIX_RE.sub("", raw.get("education", "")),
+        "gender": raw.get("gender", ""),
+        "languages": _split_list(raw.get("languages")),
+        "office_services": _split_list(raw.get("office_services")),
+    }
+    point = geocode_provider(provider)
+    provider["lat"], provider["lon"] = point if point else (None, None)
+    return provider
+
+
+def provider_key(provider):
+    """Same dentist at the same office: name + zip + phone digits."""
+    name = re.sub(r"[^a-z]", "", provider["name"].lower())
+    return name, provider["zip"], re.sub(r"\D", "", provider["phone"])
+
+
+def merge_provider(existing, new):
+    for network in new["networks"]:
+        if network not in existing["networks"]:
+            existing["networks"].append(network)
+    for network, accepting in new["accepts_new_patients"].items():
+        existing["accepts_new_patients"][network] = existing["accepts_new_patients"].get(network, False) or accepting
+    for field, value in new.items():
+        if not existing.get(field) and value:
+            existing[field] = value
+
+
+def known_cities_from(providers):
+    return {p["city"].lower(): p["city"] for p in providers if p.get("city")}
+
+
+def extract(paths, seed=None):
+    """Stream every PDF into a deduplicated {key: provider} dict. Returns (providers, stats)."""
+    providers = {}
+    known_cities = known_cities_from(seed or [])
+    for provider in seed or []:
+        providers.setdefault(provider_key(provider), provider)
+
+    stats = {"files": 0, "rows": 0, "duplicates": 0}
+    for path in paths:
+        rows = 0
+        for raw in iter_raw_records(iter_lines(path)):
+            provider = to_provider(raw, known_cities)
+            key = provider_key(provider)
+            if key in providers:
+                merge_provider(providers[key], provider)
+                stats["duplicates"] += 1
+            else:
+                providers[key] = provider
+                if provider["city"]:
+                    known_cities.setdefault(provider["city"].lower(), provider["city"])
+            rows += 1
+        stats["files"] += 1
+        stats["rows"] += rows
+        print(f"  {os.path.basename(path)}: {rows} rows")
+    return list(providers.values()), stats
+
+
+def upload(path, blob_name):
+    from services import blob_service_client
+    from provider_finder_agent import CONTAINER_NAME
+    container = blob_service_client(os.getenv("AZURE_STORAGE_CONNECTION_STRING")).get_container_client(CONTAINER_NAME)
+    with open(path, "rb") as f:
+        container.upload_blob(blob_name, f, overwrite=True)
+    print(f"Uploaded {path} → {CONTAINER_NAME}/{blob_name}")
+
+
+# ── Main ──────────────────────────────────────────
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract provider directory PDFs into provider JSON.")
+    parser.add_argument("pdfs", nargs="*", help=f"PDFs to extract (default: {PDF_DIR}/*.pdf)")
+    parser.add_argument("--out", default=DEFAULT_OUTPUT)
+    parser.add_argument("--merge", metavar="JSON", help=f"Existing provider JSON to merge into, e.g. '{SEED_PROVIDERS}'")
+    parser.add_argument("--upload", action="store_true", help="Upload the output to the providersjson blob container")
+    args = parser.parse_args()
+
+    paths = args.pdfs or sorted(glob.glob(os.path.join(PDF_DIR, "*.pdf")))
+    seed = None
+    if args.merge:
+        with open(args.merge, encoding="utf-8") as f:
+            seed = json.load(f)["providers"]
+
+    start = time.perf_counter()
+    providers, stats = extract(paths, seed)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"providers": providers}, f, indent=2)
+    elapsed = time.perf_counter() - start
+
+    print(f"\n{stats['rows']} rows from {stats['files']} PDFs, {stats['duplicates']} duplicates merged")
+    print(f"{len(providers)} providers written to {args.out} in {elapsed:.1f}s")
+
+    if args.upload:
+        from dotenv import load_dotenv
+        load_dotenv()
+        upload(args.out, os.path.basename(args.out))
@@ -0,0 +1,23 @@
+# Local stand-ins for the Azure services the app talks to, selected by FAKE_SERVICES (services.py)
+#   agents.py          — AgentsClient: runs the registered function tools and answers with
+#                        rule-based (or scripted, FAKE_AGENT_SCRIPT) replies, blocking or streamed
+#   openai_service.py  — Azure OpenAI: deterministic embeddings and a pass-through chat model
+#   storage.py         — Blob Storage and AI Search backed by the files in data/
+# Latencies are configurable so benchmarks can model the real services' round trips.
+
+import os
+
+# Files the fake blob containers and the fake search index are built from
+FAKE_DATA_DIR = os.getenv("FAKE_DATA_DIR", "data")
+# Uploaded blobs and the fake search index are kept here between runs
+FAKE_SERVICES_DIR = os.getenv("FAKE_SERVICES_DIR", ".fake_services")
+
+# Simulated latencies (seconds)
+FAKE_AGENT_LATENCY = float(os.getenv("FAKE_AGENT_LATENCY", "0"))        # per model turn of an agent run
+FAKE_TOKEN_INTERVAL = float(os.getenv("FAKE_TOKEN_INTERVAL", "0"))      # between streamed tokens
+FAKE_OPENAI_LATENCY = float(os.getenv("FAKE_OPENAI_LATENCY", "0"))      # per embeddings / chat request
+FAKE_SEARCH_LATENCY = float(os.getenv("FAKE_SEARCH_LATENCY", "0"))      # per search request
+FAKE_BLOB_LATENCY = float(os.getenv("FAKE_BLOB_LATENCY", "0"))          # per blob download
+
+# Optional JSON file of scripted agent replies (see agents.py)
+FAKE_AGENT_SCRIPT = os.getenv("FAKE_AGENT_SCRIPT")
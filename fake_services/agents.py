@@ -0,0 +1,268 @@
+# Fake Foundry AgentsClient
+# Implements the parts of azure.ai.agents.AgentsClient the app uses — threads.create,
+# create_thread_and_process_run, messages.list, runs.stream and enable_auto_function_calls —
+# and returns the SDK's own model objects, so the agent modules run unchanged.
+# Each agent ID (from .env, or the placeholders in services.py) maps to a role. A run:
+#   1. sleeps FAKE_AGENT_LATENCY (the model deciding what to do)
+#   2. answers from FAKE_AGENT_SCRIPT if a scripted rule matches, otherwise runs the role's
+#      rule below, which calls the registered function tools the way the real agent would
+#   3. sleeps FAKE_AGENT_LATENCY again if a tool was called (the model reading the result)
+# Streaming runs emit the reply word by word, FAKE_TOKEN_INTERVAL apart. Completed runs report
+# FAKE_AGENT_MODEL and word-count token usage, like the real run's model and usage fields.
+# FAKE_AGENT_SCRIPT is a JSON file: {"<role or agent id>": [{"match": "<regex>", "reply": "<text>"}]}
+
+import os
+import re
+import json
+import time
+import uuid
+import threading
+from fake_services import FAKE_AGENT_LATENCY, FAKE_TOKEN_INTERVAL, FAKE_AGENT_SCRIPT
+
+AGENT_ROLES = {
+    "ROUTER_AGENT_ID": "router",
+    "COVERAGE_AGENT_ID": "coverage",
+    "PROVIDER_FINDER_AGENT_ID": "provider_finder",
+    "COST_ESTIMATOR_AGENT_ID": "cost_estimator",
+}
+FAKE_AGENT_MODEL = "fake-agent-model"
+# Longest tool output quoted back in a reply
+MAX_REPLY_CHARS = 1500
+
+INTENT_KEYWORDS = {
+    "coverage": ("cover", "plan", "deductible", "maximum", "percent", "benefit", "waiting period", "compare", "difference"),
+    "provider_search": ("dentist", "provider", "orthodontist", "endodontist", "oral surgeon", "find", "near", "office"),
+    "cost_estimate": ("cost", "price", "how much", "pay", "afford", "out-of-pocket", "out of pocket", "$"),
+}
+SPECIALTIES = {
+    "orthodont": "Orthodontist", "braces": "Orthodontist", "endodont": "Endodontist", "root canal": "Endodontist",
+    "oral surgeon": "Oral Surgeon", "periodont": "Periodontist", "pediatric": "Pediatric Dentist",
+    "prosthodont": "Prosthodontist", "general dentist": "General Dentist",
+}
+ZIP_RE = re.compile(r"\b(4[89]\d{3})\b")
+CITY_RE = re.compile(r"\b(?:in|near|around)\s+((?:[A-Z][a-z]+\s?){1,3})")
+PERCENT_RE = re.compile(r"(\d{1,3})\s*%")
+COST_BOILERPLATE_RE = re.compile(
+    r"Calculate the out-of-pocket cost for a procedure with[^.]*\.|Coverage percentage for[^.]*?is: \d+%\.?|\(User's plan:[^)]*\)")
+
+
+# ── Rule-based replies: (content, call_tool) -> text ───────────────────────────
+def router_reply(content, call_tool):
+    text = content.lower()
+    intents = [intent for intent, words in INTENT_KEYWORDS.items() if any(w in text for w in words)]
+    return ",".join(intents) or "general"
+
+
+def coverage_reply(content, call_tool):
+    result = call_tool("search_dental_plan_tool", query=content)
+    return f"Here is what the plan documents say:\n\n{result[:MAX_REPLY_CHARS]}"
+
+
+def provider_finder_reply(content, call_tool):
+    arguments = {}
+    zip_code = ZIP_RE.search(content)
+    city = CITY_RE.search(content)
+    if zip_code:
+        arguments["near"] = zip_code.group(1)
+    elif city:
+        arguments["city"] = city.group(1).strip()
+    lowered = content.lower()
+    specialty = next((name for word, name in SPECIALTIES.items() if word in lowered), None)
+    if specialty:
+        arguments["specialty"] = specialty
+    if "premier" in lowered:
+        arguments["network"] = "Delta Dental Premier"
+    elif "ppo" in lowered:
+        arguments["network"] = "Delta Dental PPO"
+    result = call_tool("search_providers_tool", **arguments)
+    return f"Here are the providers I found:\n\n{result[:MAX_REPLY_CHARS]}"
+
+
+def cost_estimator_reply(content, call_tool):
+    percent = PERCENT_RE.search(content)
+    procedure = " ".join(COST_BOILERPLATE_RE.sub(" ", content).split())
+    result = call_tool("get_procedure_cost_tool", procedure=procedure, coverage_percent=percent.group(1) if percent else "0")
+    return f"Here is the cost estimate:\n\n{result[:MAX_REPLY_CHARS]}"
+
+
+RULES = {
+    "router": router_reply,
+    "coverage": coverage_reply,
+    "provider_finder": provider_finder_reply,
+    "cost_estimator": cost_estimator_reply,
+}
+
+
+def load_script(path):
+    if not path:
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return {key: [(re.compile(rule["match"], re.I), rule["reply"]) for rule in rules] for key, rules in json.load(f).items()}
+
+
+# ── Client ───────────────────────────────────────────────────────────────────
+class FakeAgentsClient:
+    def __init__(self, latency=FAKE_AGENT_LATENCY, token_interval=FAKE_TOKEN_INTERVAL, script=FAKE_AGENT_SCRIPT):
+        self.latency = latency
+        self.token_interval = token_interval
+        self.script = load_script(script)
+        self.threads = _Threads(self)
+        self.messages = _Messages(self)
+        self.runs = _Runs(self)
+        self.stats = {"runs": 0, "tool_calls": 0}
+        self._tool = None
+        self._messages = {}  # thread id -> [ThreadMessage], newest first
+        self._lock = threading.Lock()
+
+    def enable_auto_function_calls(self, tools, max_retry=10):
+        self._tool = tools
+
+    def _add_message(self, thread_id, role, content, agent_id=None, run_id=None):
+        from azure.ai.agents.models import ThreadMessage, MessageTextContent, MessageTextDetails
+        message = ThreadMessage(
+            id=f"msg_{uuid.uuid4().hex[:24]}", object="thread.message", created_at=int(time.time()),
+            thread_id=thread_id, status="completed", role=role, agent_id=agent_id, run_id=run_id,
+            content=[MessageTextContent(text=MessageTextDetails(value=content, annotations=[]))],
+            attachments=[], metadata={},
+        )
+        with self._lock:
+            self._messages.setdefault(thread_id, []).insert(0, message)
+        return message
+
+    def _create_thread(self, messages=None):
+        from azure.ai.agents.models import AgentThread
+        thread = AgentThread(id=f"thread_{uuid.uuid4().hex[:24]}", object="thread", created_at=int(time.time()), metadata={})
+        with self._lock:
+            self._messages[thread.id] = []
+        for message in messages or []:
+            self._add_message(thread.id, message.role, message.content)
+        return thread
+
+    def _thread_run(self, thread_id, agent_id, status):
+        from azure.ai.agents.models import ThreadRun
+        return ThreadRun(id=f"run_{uuid.uuid4().hex[:24]}", object="thread.run", created_at=int(time.time()),
+                         thread_id=thread_id, agent_id=agent_id, status=status, instructions="", tools=[], metadata={})
+
+    @staticmethod
+    def _complete(run, prompt, reply):
+        from azure.ai.agents.models import RunStatus, RunCompletionUsage
+        prompt_tokens, completion_tokens = len(prompt.split()), len(reply.split())
+        run.status = RunStatus.COMPLETED
+        run.model = FAKE_AGENT_MODEL
+        run.usage = RunCompletionUsage(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                       total_tokens=prompt_tokens + completion_tokens)
+        return run
+
+    def call_tool(self, name, **arguments):
+        """Execute a registered function tool the way the SDK does for a requires_action run."""
+        from azure.ai.agents.models import RequiredFunctionToolCall, RequiredFunctionToolCallDetails
+        if self._tool is None:
+            return json.dumps({"error": f"No function tools enabled; cannot call {name}"})
+        with self._lock:
+            self.stats["tool_calls"] += 1
+        call = RequiredFunctionToolCall(id=f"call_{uuid.uuid4().hex[:24]}",
+                                        function=RequiredFunctionToolCallDetails(name=name, arguments=json.dumps(arguments)))
+        return str(self._tool.execute(call))
+
+    def role(self, agent_id):
+        return next((role for variable, role in AGENT_ROLES.items() if agent_id and os.getenv(variable) == agent_id), agent_id)
+
+    def reply(self, agent_id, content):
+        """The agent's reply text for a user message, with simulated model latency."""
+        with self._lock:
+            self.stats["runs"] += 1
+        role = self.role(agent_id)
+        if self.latency:
+            time.sleep(self.latency)
+        for pattern, text in self.script.get(agent_id, []) + self.script.get(role, []):
+            if pattern.search(content):
+                return text
+        rule = RULES.get(role)
+        if rule is None:
+            return f"(fake agent {agent_id}) {content}"
+        tool_calls = []
+
+        def call_tool(name, **arguments):
+            tool_calls.append(name)
+            return self.call_tool(name, **arguments)
+
+        text = rule(content, call_tool)
+        if tool_calls and self.latency:
+            time.sleep(self.latency)
+        return text
+
+    def _last_user_message(self, thread_id):
+        with self._lock:
+            messages = list(self._messages.get(thread_id, []))
+        return next((m.content[0].text.value for m in messages if m.role == "user"), "")
+
+    def create_thread_and_process_run(self, agent_id, thread=None, **kwargs):
+        from azure.ai.agents.models import RunStatus
+        created = self._create_thread(thread.messages if thread else None)
+        run = self._thread_run(created.id, agent_id, RunStatus.IN_PROGRESS)
+        content = self._last_user_message(created.id)
+        text = self.reply(agent_id, content)
+        self._add_message(created.id, "assistant", text, agent_id=agent_id, run_id=run.id)
+        return self._complete(run, content, text)
+
+    def close(self):
+        pass
+
+
+class _Threads:
+    def __init__(self, client):
+        self.client = client
+
+    def create(self, messages=None, **kwargs):
+        return self.client._create_thread(messages)
+
+
+class _Messages:
+    def __init__(self, client):
+        self.client = client
+
+    def list(self, thread_id, **kwargs):
+        with self.client._lock:
+            return iter(list(self.client._messages.get(thread_id, [])))
+
+
+class _Runs:
+    def __init__(self, client):
+        self.client = client
+
+    def stream(self, thread_id, agent_id, **kwargs):
+        return FakeRunStream(self.client, thread_id, agent_id)
+
+
+class FakeRunStream:
+    """Context manager yielding (event type, event data, None) like the SDK's AgentRunStream."""
+
+    def __init__(self, client, thread_id, agent_id):
+        self.client = client
+        self.thread_id = thread_id
+        self.agent_id = agent_id
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        from azure.ai.agents.models import (AgentStreamEvent, RunStatus, MessageDeltaChunk, MessageDelta,
+                                            MessageDeltaTextContent, MessageDeltaTextContentObject)
+        client = self.client
+        run = client._thread_run(self.thread_id, self.agent_id, RunStatus.IN_PROGRESS)
+        yield AgentStreamEvent.THREAD_RUN_CREATED, run, None
+        content = client._last_user_message(self.thread_id)
+        text = client.reply(self.agent_id, content)
+        message_id = f"msg_{uuid.uuid4().hex[:24]}"
+        for i, token in enumerate(re.findall(r"\S+\s*|\s+", text)):
+            if i and client.token_interval:
+                time.sleep(client.token_interval)
+            delta = MessageDelta(role="assistant", content=[
+                MessageDeltaTextContent(index=0, text=MessageDeltaTextContentObject(value=token))])
+            yield AgentStreamEvent.THREAD_MESSAGE_DELTA, MessageDeltaChunk(id=message_id, object="thread.message.delta", delta=delta), None
+        client._add_message(self.thread_id, "assistant", text, agent_id=self.agent_id, run_id=run.id)
+        yield AgentStreamEvent.THREAD_RUN_COMPLETED, client._complete(run, content, text), None
+        yield AgentStreamEvent.DONE, "[DONE]", None
@@ -0,0 +1,86 @@
+# Fake Azure OpenAI client
+# embeddings.create returns deterministic feature-hashed bag-of-words vectors: the same text
+# always gets the same vector and texts sharing words score higher, so retrieval over fake
+# embeddings still ranks relevant chunks first. Like text-embedding-3 (Matryoshka embeddings),
+# a smaller `dimensions` is the renormalized prefix of the full vector: every feature is hashed
+# into each nested prefix band (first 64, 128, 256, ... components), so a prefix keeps every
+# word, just with more collisions. chat.completions.create returns the last user
+# message (minus a "Question: ..." preamble), which is what the cost wording call needs.
+
+import re
+import time
+import hashlib
+import threading
+from types import SimpleNamespace
+import numpy as np
+from fake_services import FAKE_OPENAI_LATENCY
+
+DEFAULT_DIMENSIONS = 1536
+# Nested prefix bands each feature is hashed into; the last band is the full vector
+PREFIX_BANDS = (64, 128, 256, 512, 1024)
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def fake_embedding(text, dimensions=DEFAULT_DIMENSIONS):
+    """Deterministic unit vector for a piece of text (hashed words and word pairs)."""
+    full = max(dimensions, DEFAULT_DIMENSIONS)
+    bands = [b for b in PREFIX_BANDS if b < full] + [full]
+    vector = np.zeros(full, dtype=np.float32)
+    tokens = TOKEN_RE.findall(text.lower())
+    for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=5 * len(bands)).digest()
+        for i, band in enumerate(bands):
+            bucket = int.from_bytes(digest[5 * i:5 * i + 4], "little") % band
+            vector[bucket] += 1.0 if digest[5 * i + 4] & 1 else -1.0
+    vector = vector[:dimensions]
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        vector[0], norm = 1.0, 1.0
+    return (vector / norm).tolist()
+
+
+class _Embeddings:
+    def __init__(self, owner):
+        self.owner = owner
+
+    def create(self, input, model=None, dimensions=None, **kwargs):
+        texts = [input] if isinstance(input, str) else list(input)
+        self.owner._request(len(texts))
+        data = [SimpleNamespace(object="embedding", index=i, embedding=fake_embedding(t, dimensions or DEFAULT_DIMENSIONS))
+                for i, t in enumerate(texts)]
+        tokens = sum(len(t.split()) for t in texts)
+        return SimpleNamespace(object="list", data=data, model=model,
+                               usage=SimpleNamespace(prompt_tokens=tokens, total_tokens=tokens))
+
+
+class _Completions:
+    def __init__(self, owner):
+        self.owner = owner
+
+    def create(self, model=None, messages=(), **kwargs):
+        self.owner._request(0)
+        content = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+        content = re.sub(r"^Question:.*?\n\n(Estimate:\n)?", "", content, flags=re.S)
+        message = SimpleNamespace(role="assistant", content=content)
+        return SimpleNamespace(model=model, choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")])
+
+
+class FakeOpenAI:
+    """Stands in for openai.AzureOpenAI: embeddings.create and chat.completions.create."""
+
+    def __init__(self, latency=FAKE_OPENAI_LATENCY):
+        self.latency = latency
+        self.embeddings = _Embeddings(self)
+        self.chat = SimpleNamespace(completions=_Completions(self))
+        self.stats = {"requests": 0, "embedded": 0}
+        self._lock = threading.Lock()
+
+    def _request(self, embedded):
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["embedded"] += embedded
+        if self.latency:
+            time.sleep(self.latency)
+
+    def close(self):
+        pass
@@ -0,0 +1,252 @@
+# Fake Blob Storage and Azure AI Search
+# Blob: every container reads from FAKE_DATA_DIR (CONTAINER_FILES picks which files belong to
+# which container); uploads go to FAKE_SERVICES_DIR/blob/<container>/ and shadow data/.
+# Search: one in-memory index per index name, saved to FAKE_SERVICES_DIR/search/<index>/ in the
+# local index format (vector_store.py) after every write, so a fake ingest run and a later app
+# run see the same documents. An index that has never been written is seeded from the plan
+# files in data/, chunked like ingest.py and embedded with fake_embedding. Search ranks by
+# cosine similarity for a vector query and by BM25 for search_text; a query with both is
+# fused by reciprocal-rank fusion, like the service's hybrid search. Filters may combine
+# "source eq '...'" and "categories/any(c: c eq '...' or ...)" with "and".
+
+import os
+import re
+import glob
+import time
+import fnmatch
+import hashlib
+import threading
+from types import SimpleNamespace
+import numpy as np
+from fake_services import FAKE_DATA_DIR, FAKE_SERVICES_DIR, FAKE_BLOB_LATENCY, FAKE_SEARCH_LATENCY
+from fake_services.openai_service import fake_embedding
+from embedding_cache import EMBEDDING_DIMENSIONS
+from lexical_index import BM25Index, reciprocal_rank_fusion
+from vector_store import normalize, save_local_index, load_local_documents
+
+# Container -> file patterns in FAKE_DATA_DIR (containers not listed see every file)
+CONTAINER_FILES = {
+    "dentalplanpdfs": ("*.pdf", "*.txt"),
+    "providersjson": ("*providers*.json",),
+    "procedurecosts": ("procedure_costs.json",),
+}
+# Rows each ranking contributes to a hybrid query's fusion (the service uses 50)
+HYBRID_CANDIDATES = 50
+SOURCE_FILTER = r"source\s+eq\s+'(?:[^']|'')*'"
+CATEGORY_FILTER = r"categories/any\(c:\s*c\s+eq\s+'(?:[^']|'')*'(?:\s+or\s+c\s+eq\s+'(?:[^']|'')*')*\s*\)"
+CLAUSE = f"(?:{SOURCE_FILTER}|{CATEGORY_FILTER})"
+FILTER_RE = re.compile(rf"^\s*{CLAUSE}(?:\s+and\s+{CLAUSE})*\s*$")
+VALUE_RE = re.compile(r"'((?:[^']|'')*)'")
+
+
+def _filter_rows(docs, rows, filter):
+    """The rows matching a supported OData filter."""
+    if not FILTER_RE.match(filter):
+        raise ValueError(f"Fake search only supports \"source eq '...'\" and \"categories/any(c: c eq '...')\" "
+                         f"filters joined by 'and', got: {filter}")
+    for clause in re.findall(CLAUSE, filter):
+        values = {value.replace("''", "'") for value in VALUE_RE.findall(clause)}
+        if clause.startswith("source"):
+            rows = [i for i in rows if docs[i]["source"] in values]
+        else:
+            rows = [i for i in rows if values.intersection(docs[i].get("categories") or [])]
+    return np.array(rows, dtype=np.int64)
+
+
+def _not_found(message):
+    from azure.core.exceptions import ResourceNotFoundError
+    return ResourceNotFoundError(message)
+
+
+# ── Blob Storage ─────────────────────────────────────────────────────────────
+class FakeBlobServiceClient:
+    def __init__(self, data_dir=FAKE_DATA_DIR, latency=FAKE_BLOB_LATENCY):
+        self.data_dir = data_dir
+        self.latency = latency
+
+    @classmethod
+    def from_connection_string(cls, connection_string, **kwargs):
+        return cls()
+
+    def get_container_client(self, container):
+        return FakeContainerClient(container, self.data_dir, self.latency)
+
+    def close(self):
+        pass
+
+
+class FakeContainerClient:
+    def __init__(self, container, data_dir=FAKE_DATA_DIR, latency=FAKE_BLOB_LATENCY):
+        self.container = container
+        self.data_dir = data_dir
+        self.latency = latency
+        self.upload_dir = os.path.join(FAKE_SERVICES_DIR, "blob", container)
+
+    def _paths(self):
+        """{blob name: file path}, uploads shadowing data/."""
+        patterns = CONTAINER_FILES.get(self.container, ("*",))
+        paths = {}
+        for path in sorted(glob.glob(os.path.join(self.data_dir, "*"))):
+            name = os.path.basename(path)
+            if os.path.isfile(path) and any(fnmatch.fnmatch(name, p) for p in patterns):
+                paths[name] = path
+        for path in sorted(glob.glob(os.path.join(self.upload_dir, "*"))):
+            paths[os.path.basename(path)] = path
+        return paths
+
+    def list_blobs(self, **kwargs):
+        for name, path in self._paths().items():
+            stat = os.stat(path)
+            etag = hashlib.sha256(f"{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:16]
+            yield SimpleNamespace(name=name, etag=f'"0x{etag.upper()}"', size=stat.st_size, container=self.container)
+
+    def download_blob(self, blob, **kwargs):
+        path = self._paths().get(blob)
+        if path is None:
+            raise _not_found(f"The specified blob does not exist: {self.container}/{blob}")
+        if self.latency:
+            time.sleep(self.latency)
+        with open(path, "rb") as f:
+            data = f.read()
+        return SimpleNamespace(readall=lambda: data, content_as_text=lambda encoding="utf-8": data.decode(encoding))
+
+    def upload_blob(self, name, data, overwrite=False, **kwargs):
+        path = os.path.join(self.upload_dir, name)
+        if os.path.exists(path) and not overwrite:
+            from azure.core.exceptions import ResourceExistsError
+            raise ResourceExistsError(f"The specified blob already exists: {self.container}/{name}")
+        os.makedirs(self.upload_dir, exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data.read() if hasattr(data, "read") else data.encode("utf-8") if isinstance(data, str) else data)
+
+
+# ── AI Search ────────────────────────────────────────────────────────────────
+class FakeSearchIndex:
+    """Documents of one index, persisted in the local index format after every write."""
+
+    def __init__(self, name, seed=True):
+        self.name = name
+        self.path = os.path.join(FAKE_SERVICES_DIR, "search", name)
+        self.lock = threading.Lock()
+        self.documents = load_local_documents(self.path)
+        if self.documents is None:
+            self.documents = {doc["id"]: doc for doc in (seed_documents() if seed else [])}
+            self._save()
+        self._snapshot = None
+
+    def _save(self):
+        save_local_index(list(self.documents.values()), self.path)
+        self._snapshot = None
+
+    def write(self, upserts=(), deletes=()):
+        with self.lock:
+            for doc in upserts:
+                self.documents[doc["id"]] = dict(self.documents.get(doc["id"], {}), **doc)
+            for key in deletes:
+                self.documents.pop(key, None)
+            self._save()
+
+    def clear(self):
+        self.write(deletes=list(self.documents))
+
+    def snapshot(self):
+        """(documents, normalized embedding matrix, BM25 index) in matching order."""
+        with self.lock:
+            if self._snapshot is None:
+                docs = list(self.documents.values())
+                matrix = normalize([d["embedding"] for d in docs]) if docs else np.zeros((0, 0), dtype=np.float32)
+                self._snapshot = docs, matrix, BM25Index.build([d["text"] for d in docs])
+            return self._snapshot
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(name, seed=True):
+    with _indexes_lock:
+        if name not in _indexes:
+            _indexes[name] = FakeSearchIndex(name, seed)
+        return _indexes[name]
+
+
+def seed_documents():
+    """Chunk and fake-embed the plan files in data/, the way ingest.py would."""
+    from ingest import parse_file, split_document, chunk_id
+    container = FakeContainerClient("dentalplanpdfs")
+    documents = []
+    for name, path in container._paths().items():
+        with open(path, "rb") as f:
+            text = parse_file(name, f.read())
+        for chunk in (split_document(text) if text else []):
+            documents.append({"id": chunk_id(name, chunk["text"]), "text": chunk["text"], "source": name,
+                              "headings": chunk["headings"], "categories": chunk["categories"],
+                              "embedding": fake_embedding(chunk["text"], EMBEDDING_DIMENSIONS)})
+    return documents
+
+
+class FakeSearchIndexClient:
+    def __init__(self, endpoint=None, credential=None, **kwargs):
+        self.endpoint = endpoint
+
+    def delete_index(self, index):
+        get_index(getattr(index, "name", index), seed=False).clear()
+
+    def create_or_update_index(self, index):
+        get_index(index.name)
+        return index
+
+    def close(self):
+        pass
+
+
+class FakeSearchClient:
+    def __init__(self, endpoint=None, index_name=None, credential=None, latency=FAKE_SEARCH_LATENCY, **kwargs):
+        self.endpoint = endpoint
+        self.index = get_index(index_name)
+        self.latency = latency
+
+    def upload_documents(self, documents, **kwargs):
+        self.index.write(upserts=documents)
+        return [SimpleNamespace(key=doc["id"], succeeded=True, status_code=201) for doc in documents]
+
+    merge_or_upload_documents = upload_documents
+
+    def delete_documents(self, documents, **kwargs):
+        self.index.write(deletes=[doc["id"] for doc in documents])
+        return [SimpleNamespace(key=doc["id"], succeeded=True, status_code=200) for doc in documents]
+
+    def get_document_count(self):
+        return len(self.index.documents)
+
+    def search(self, search_text=None, vector_queries=None, filter=None, top=50, select=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        docs, matrix, lexical = self.index.snapshot()
+        rows = np.arange(len(docs))
+        if filter:
+            rows = _filter_rows(docs, rows, filter)
+        if len(rows) == 0:
+            return []
+
+        depth = max(top, HYBRID_CANDIDATES)
+        rankings = []
+        if vector_queries:
+            query_vector = normalize(vector_queries[0].vector)
+            if matrix.shape[1] != len(query_vector):
+                from azure.core.exceptions import HttpResponseError
+                raise HttpResponseError(f"The vector query's dimensions ({len(query_vector)}) must match the "
+                                        f"field's dimensions ({matrix.shape[1]}); re-run ingest.py")
+            scores = matrix[rows] @ query_vector
+            rankings.append([(int(rows[i]), float(scores[i])) for i in np.argsort(-scores, kind="stable")[:depth]])
+        if search_text and search_text != "*":
+            rankings.append(lexical.search(search_text, top=depth, rows=rows))
+        if len(rankings) == 1:
+            hits = rankings[0][:top]
+        elif rankings:
+            hits = reciprocal_rank_fusion(rankings, top=top)
+        else:
+            hits = [(int(row), 1.0) for row in rows[:top]]
+
+        fields = select or ["id", "text", "source"]
+        return [dict({f: docs[row].get(f) for f in fields}, **{"@search.score": score}) for row, score in hits]
@@ -0,0 +1,171 @@
+# Geocoding + spatial index for nearest-provider search
+# Geocodes come from a bundled offline table, data/mi_zip_centroids.csv (zip, city, lat, lon),
+# so no geocoding service is called at load or query time.
+# GridIndex buckets points into square cells a few miles wide. A "k nearest within R miles"
+# query scans rings of cells outward from the query point and stops as soon as the next ring
+# cannot contain anything closer than the current k-th result. Distances to a cell's points are
+# one NumPy expression, and filters are only tested on points close enough to enter the top k.
+
+import os
+import csv
+import math
+import heapq
+import numpy as np
+
+ZIP_CENTROIDS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "mi_zip_centroids.csv")
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE_LAT = 69.0
+# Filters with at most this many candidates skip the grid walk
+SMALL_FILTER = 256
+
+_zip_centroids = None
+
+
+def read_zip_centroids(path):
+    """Return {zip: (lat, lon, city)} from a zip centroid CSV."""
+    table = {}
+    with open(path, encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            table[row["zip"]] = (float(row["lat"]), float(row["lon"]), row["city"])
+    return table
+
+
+def load_zip_centroids():
+    """The bundled centroid table, read once per process."""
+    global _zip_centroids
+    if _zip_centroids is None:
+        _zip_centroids = read_zip_centroids(ZIP_CENTROIDS_FILE)
+    return _zip_centroids
+
+
+def geocode_provider(provider, centroids=None):
+    """(lat, lon) for a provider record: its own coordinates if present, else its zip centroid."""
+    if provider.get("lat") is not None and provider.get("lon") is not None:
+        return float(provider["lat"]), float(provider["lon"])
+    centroids = centroids if centroids is not None else load_zip_centroids()
+    point = centroids.get(str(provider.get("zip", ""))[:5])
+    return (point[0], point[1]) if point else None
+
+
+def resolve_location(location, centroids=None):
+    """
+    Turn a user location into (lat, lon).
+    Accepts a 5-digit zip ("49684"), coordinates ("44.76,-85.62"), or a city name ("Traverse City").
+    Returns None when the location is unknown.
+    """
+    location = (location or "").strip()
+    if not location:
+        return None
+    centroids = centroids if centroids is not None else load_zip_centroids()
+
+    if "," in location:
+        try:
+            lat, lon = (float(part) for part in location.split(",", 1))
+            return lat, lon
+        except ValueError:
+            location = location.split(",", 1)[0].strip()  # "Traverse City, MI"
+
+    if location[:5].isdigit():
+        point = centroids.get(location[:5])
+        return (point[0], point[1]) if point else None
+
+    # City name: average of that city's zip centroids
+    city = location.lower()
+    points = [(lat, lon) for lat, lon, name in centroids.values() if name.lower() == city]
+    if not points:
+        return None
+    return sum(p[0] for p in points) / len(points), sum(p[1] for p in points) / len(points)
+
+
+def haversine_miles(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(a))
+
+
+def haversine_miles_array(lat, lon, lats, lons):
+    """haversine_miles from one point to arrays of points (lats, lons in radians)."""
+    lat, lon = math.radians(lat), math.radians(lon)
+    a = np.sin((lats - lat) / 2) ** 2 + math.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GridIndex:
+    """Uniform lat/lon grid over (id, lat, lon) points."""
+
+    def __init__(self, points, cell_miles=5.0):
+        self.cell_miles = cell_miles
+        self.cell_lat = cell_miles / MILES_PER_DEGREE_LAT
+        # Size longitude cells at the northernmost point so a cell is never narrower than cell_miles
+        max_lat = max((abs(lat) for _, lat, _ in points), default=45.0)
+        self.cell_lon = cell_miles / (MILES_PER_DEGREE_LAT * math.cos(math.radians(max_lat)))
+        cells = {}
+        self.coords = {}
+        for point_id, lat, lon in points:
+            cells.setdefault(self._cell(lat, lon), []).append((point_id, lat, lon))
+            self.coords[point_id] = (lat, lon)
+        # Per cell: ids, and lat / lon in radians, so a cell's distances are one array expression
+        self.cells = {}
+        for cell, cell_points in cells.items():
+            ids, lats, lons = zip(*cell_points)
+            self.cells[cell] = (np.array(ids), np.radians(lats), np.radians(lons))
+
+    def _cell(self, lat, lon):
+        return int(math.floor(lat / self.cell_lat)), int(math.floor(lon / self.cell_lon))
+
+    def _ring(self, center, radius):
+        ci, cj = center
+        if radius == 0:
+            yield center
+            return
+        for dj in range(-radius, radius + 1):
+            yield ci - radius, cj + dj
+            yield ci + radius, cj + dj
+        for di in range(-radius + 1, radius):
+            yield ci + di, cj - radius
+            yield ci + di, cj + radius
+
+    def nearest(self, lat, lon, k=10, radius_miles=25.0, allowed=None):
+        """
+        [(id, miles)] for the k closest points within radius_miles, closest first (ties by id).
+        :param allowed: set of ids to keep, or any container answering `id in allowed`.
+        """
+        if isinstance(allowed, (set, frozenset)) and len(allowed) <= SMALL_FILTER:
+            # A narrow filter (one specialty in one city) is cheaper to check directly
+            hits = []
+            for point_id in allowed:
+                if point_id in self.coords:
+                    miles = haversine_miles(lat, lon, *self.coords[point_id])
+                    if miles <= radius_miles:
+                        hits.append((point_id, miles))
+            return sorted(hits, key=lambda r: (r[1], r[0]))[:k]
+
+        center = self._cell(lat, lon)
+        best = []  # heap of (-miles, -id): best[0] is the current k-th result
+        max_ring = int(math.ceil(radius_miles / self.cell_miles)) + 1
+        for ring in range(max_ring + 1):
+            for cell in self._ring(center, ring):
+                if cell not in self.cells:
+                    continue
+                ids, lats, lons = self.cells[cell]
+                miles = haversine_miles_array(lat, lon, lats, lons)
+                bound = -best[0][0] if len(best) == k else radius_miles
+                close = np.flatnonzero(miles <= bound)
+                # Closest first, so the filter is only tested on points that can still enter the top k
+                order = close[np.argsort(miles[close], kind="stable")]
+                for point_miles, point_id in zip(miles[order].tolist(), ids[order].tolist()):
+                    entry = (-point_miles, -point_id)
+                    if len(best) == k and entry <= best[0]:
+                        if entry[0] < best[0][0]:
+                            break
+                        continue
+                    if allowed is not None and point_id not in allowed:
+                        continue
+                    if len(best) < k:
+                        heapq.heappush(best, entry)
+                    else:
+                        heapq.heapreplace(best, entry)
+            # Anything in ring+1 is at least `ring` whole cells away
+            if len(best) == k and -best[0][0] <= ring * self.cell_miles:
+                break
+        return sorted(((-pid, -neg) for neg, pid in best), key=lambda r: (r[1], r[0]))
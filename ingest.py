@@ -1,18 +1,28 @@
 import os
-from azure.storage.blob import BlobServiceClient
-from azure.search.documents import SearchClient
-from azure.search.documents.indexes import SearchIndexClient
 from azure.search.documents.indexes.models import (
     SearchIndex, SimpleField, SearchFieldDataType,
     SearchableField, VectorSearch, HnswAlgorithmConfiguration,
-    VectorSearchProfile, SearchField
+    VectorSearchProfile, SearchField, ScalarQuantizationCompression,
+    ScalarQuantizationParameters, RescoringOptions
 )
-from azure.core.credentials import AzureKeyCredential
-from openai import AzureOpenAI
-from pypdf import PdfReader
+from openai import RateLimitError
 from dotenv import load_dotenv
-import io
-import uuid
+import sys
+import json
+import time
+import random
+import hashlib
+import functools
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pipeline import Pipeline, Stage
+from pdf_text import extract_text
+from vector_store import save_local_index, load_local_documents
+from quantization import EMBEDDING_STORAGE, RESCORE_OVERSAMPLING
+from embedding_cache import EMBEDDING_DIMENSIONS, EMBEDDING_OPTIONS
+from coverage_table import parse_coverage_table, load_coverage_table, save_coverage_table, procedure_categories
+from chunker import chunk_document
+from resources import resource
+from services import openai_client as create_openai_client, blob_service_client, search_client, search_index_client
 
 load_dotenv()
 AZURE_STORAGE_CONNECTION_STRING = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
@@ -25,125 +35,378 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 CONTAINER_NAME = "dentalplanpdfs"
 INDEX_NAME = "dental-plans"
 CHUNK_SIZE = 1500
+# "structure" (chunker.py: plan sections and benefit tables, CHUNK_TOKENS per chunk) or
+# "recursive" (the generic CHUNK_SIZE-character splitter)
+CHUNKER = os.getenv("CHUNKER", "structure").lower()
+# Local copy of the index for RETRIEVAL_BACKEND=local (see vector_store.py)
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", "local_index")
+# Manifest of blob ETags, file hashes and chunk IDs from the last run (used by --incremental)
+MANIFEST_PATH = os.getenv("INGEST_MANIFEST", os.path.join(LOCAL_INDEX_DIR, "manifest.json"))
 
-# Connect to Azure OpenAI for embeddings
-openai_client = AzureOpenAI(
-    api_key=os.getenv("OPENAI_API_KEY"),
-    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-    api_version="2024-10-21"
-)
+# Embedding / upload tuning
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))     # chunks per embeddings.create request
+EMBED_MAX_WORKERS = int(os.getenv("EMBED_MAX_WORKERS", "4"))    # concurrent embedding requests
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "6"))    # attempts per batch on 429
+UPLOAD_BATCH_SIZE = int(os.getenv("UPLOAD_BATCH_SIZE", "256"))  # documents per upload_documents call
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "4"))      # concurrent blob downloads
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "2"))            # concurrent file parses
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "2"))  # files buffered between stages
+
+# Connect to Azure OpenAI for embeddings (FAKE_SERVICES swaps in the local stand-ins, see services.py)
+# max_retries=0 — get_embeddings owns the 429 backoff so retries are not compounded.
+# Created on first use, so fake_services can import the chunking helpers without credentials.
+openai_client = resource("ingest_openai_client", lambda: create_openai_client(max_retries=0))
 # Connect to Blob Storage
-def download_blobs():
-    blob_service_client = BlobServiceClient.from_connection_string(AZURE_STORAGE_CONNECTION_STRING)
-    container = blob_service_client.get_container_client(CONTAINER_NAME)
-    files = {}
-    for blob in container.list_blobs():
-        data = container.download_blob(blob.name).readall()
-        files[blob.name] = data
-    return files
+def get_container():
+    return blob_service_client(AZURE_STORAGE_CONNECTION_STRING).get_container_client(CONTAINER_NAME)
+
+def iter_blobs(container):
+    """Yield blob properties one at a time — nothing is downloaded until a stage asks for it."""
+    yield from container.list_blobs()
 
 # Parse files 
 def parse_file(filename, data):
     if filename.endswith(".pdf"):
-        reader = PdfReader(io.BytesIO(data))
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-        return text
+        return extract_text(data)
     elif filename.endswith(".txt"):
         return data.decode("utf-8")
     else:
         return ""
     
 # Chunk text
-def chunk_text(text, chunk_size=1500, overlap=200):
+@functools.lru_cache(maxsize=None)
+def _recursive_splitter(chunk_size, overlap):
+    # Built once per size: the langchain import and splitter setup cost more than a split
     from langchain_text_splitters import RecursiveCharacterTextSplitter
-    splitter = RecursiveCharacterTextSplitter(
+    return RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=overlap,
         separators=["\n\n", "\n", ".", "?", "!", " ", ""]
     )
-    return splitter.split_text(text)
+
+def chunk_text(text, chunk_size=CHUNK_SIZE, overlap=200):
+    return _recursive_splitter(chunk_size, overlap).split_text(text)
+
+def split_document(text):
+    """Chunk dicts ({"text", "headings", "categories"}) for one parsed file, with the CHUNKER strategy."""
+    if CHUNKER == "recursive":
+        return [{"text": piece, "headings": [], "categories": procedure_categories(piece)} for piece in chunk_text(text)]
+    return chunk_document(text)
 
 # Embeddings 
-print("ENDPOINT:", os.getenv("AZURE_OPENAI_ENDPOINT"))
-print("EMBEDDING:", os.getenv("AZURE_EMBEDDING_DEPLOYMENT"))
 def get_embedding(text):
-    response = openai_client.embeddings.create(
+    response = openai_client.get().embeddings.create(
         input=text,
-        model=os.getenv("AZURE_EMBEDDING_DEPLOYMENT")
+        model=os.getenv("AZURE_EMBEDDING_DEPLOYMENT"),
+        **EMBEDDING_OPTIONS
     )
     return response.data[0].embedding
 
+
+def _retry_delay(error, attempt):
+    """Seconds to wait after a 429: the server's Retry-After if given, else jittered exponential backoff."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    retry_after = headers.get("retry-after-ms")
+    if retry_after:
+        return float(retry_after) / 1000
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return min(30.0, 2 ** attempt) * (0.5 + random.random() / 2)
+
+
+def get_embeddings(texts):
+    """Embed a batch of texts in one embeddings.create request, backing off on 429 responses."""
+    for attempt in range(EMBED_MAX_RETRIES):
+        try:
+            response = openai_client.get().embeddings.create(
+                input=texts,
+                model=os.getenv("AZURE_EMBEDDING_DEPLOYMENT"),
+                **EMBEDDING_OPTIONS
+            )
+            return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+        except RateLimitError as e:
+            if attempt == EMBED_MAX_RETRIES - 1:
+                raise
+            delay = _retry_delay(e, attempt)
+            print(f"  429 from embeddings, retrying batch of {len(texts)} in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def embed_chunks(chunks, batch_size=EMBED_BATCH_SIZE, max_workers=EMBED_MAX_WORKERS):
+    """
+    Embed chunks in batches on a bounded pool of concurrent requests.
+    Yields (chunk, embedding) pairs as each batch completes, not in input order.
+    """
+    batches = [chunks[i:i + batch_size] for i in range(0, len(chunks), batch_size)]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(get_embeddings, batch): batch for batch in batches}
+        for future in as_completed(futures):
+            yield from zip(futures[future], future.result())
+
 # create Azure Search index
-def create_index():
-    credential = AzureKeyCredential(AZURE_SEARCH_API_KEY)
-    index_client = SearchIndexClient(endpoint=AZURE_SEARCH_ENDPOINT, credential=credential)
+def create_index(recreate=True):
+    """Create the index. recreate=False leaves an existing index (and its documents) in place."""
+    index_client = search_index_client(AZURE_SEARCH_ENDPOINT, AZURE_SEARCH_API_KEY)
 
+    # EMBEDDING_STORAGE: float16 stores half-precision vectors; int8 adds scalar quantization,
+    # rescored against the preserved originals. The service has no product quantization, so pq
+    # only compacts the local index.
+    vector_type = SearchFieldDataType.Half if EMBEDDING_STORAGE == "float16" else SearchFieldDataType.Single
     fields = [
         SimpleField(name="id", type=SearchFieldDataType.String, key=True),
         SearchableField(name="text", type=SearchFieldDataType.String),
         SimpleField(name="source", type=SearchFieldDataType.String, filterable=True),
+        # Heading paths ("Covered Services > Basic Services") and category keys ("endodontic") of each chunk
+        SearchableField(name="headings", type=SearchFieldDataType.String, collection=True, filterable=True),
+        SimpleField(name="categories", type=SearchFieldDataType.Collection(SearchFieldDataType.String),
+                    filterable=True, facetable=True),
         SearchField(
             name="embedding",
-            type=SearchFieldDataType.Collection(SearchFieldDataType.Single),
+            type=SearchFieldDataType.Collection(vector_type),
             searchable=True,
-            vector_search_dimensions=1536,
+            vector_search_dimensions=EMBEDDING_DIMENSIONS,
             vector_search_profile_name="dental-vector-profile"
         )
     ]
 
+    compressions = []
+    if EMBEDDING_STORAGE == "int8":
+        compressions.append(ScalarQuantizationCompression(
+            compression_name="dental-int8",
+            parameters=ScalarQuantizationParameters(quantized_data_type="int8"),
+            rescoring_options=RescoringOptions(enable_rescoring=True, default_oversampling=RESCORE_OVERSAMPLING,
+                                               rescore_storage_method="preserveOriginals"),
+        ))
     vector_search = VectorSearch(
         algorithms=[HnswAlgorithmConfiguration(name="dental-hnsw")],
-        profiles=[VectorSearchProfile(name="dental-vector-profile", algorithm_configuration_name="dental-hnsw")]
+        compressions=compressions or None,
+        profiles=[VectorSearchProfile(name="dental-vector-profile", algorithm_configuration_name="dental-hnsw",
+                                      compression_name="dental-int8" if compressions else None)]
     )
 
     index = SearchIndex(name=INDEX_NAME, fields=fields, vector_search=vector_search)
-    try:
-        index_client.delete_index(INDEX_NAME)
-        print(f"Deleted existing index.")
-    except:
-        pass
+    if recreate:
+        try:
+            index_client.delete_index(INDEX_NAME)
+            print(f"Deleted existing index.")
+        except:
+            pass
     index_client.create_or_update_index(index)
     print(f"Index '{INDEX_NAME}' created/updated.")
 
-# Upload chunks to AI Search
-def upload_chunks(filename, chunks):
-    credential = AzureKeyCredential(AZURE_SEARCH_API_KEY)
-    search_client = SearchClient(
-        endpoint=AZURE_SEARCH_ENDPOINT,
-        index_name=INDEX_NAME,
-        credential=credential
-    )
+def get_search_client():
+    return search_client(AZURE_SEARCH_ENDPOINT, INDEX_NAME, AZURE_SEARCH_API_KEY)
+
+# Deterministic chunk IDs — the same text from the same source always gets the same key,
+# so re-ingesting an unchanged chunk is a no-op and a changed chunk gets a new key
+def chunk_id(source, text):
+    return hashlib.sha256(f"{source}\x00{text}".encode("utf-8")).hexdigest()[:40]
 
-    documents = []
-    for chunk in chunks:
-        embedding = get_embedding(chunk)
-        documents.append({
-            "id": str(uuid.uuid4()),
-            "text": chunk,
+def embed_documents(filename, chunks):
+    """Yield index documents for chunk dicts (see split_document) as their embeddings arrive, then report chunks/s."""
+    count = 0
+    start = time.perf_counter()
+    by_text = {chunk["text"]: chunk for chunk in chunks}
+    for text, embedding in embed_chunks(list(by_text)):
+        count += 1
+        yield {
+            "id": chunk_id(filename, text),
+            "text": text,
             "source": filename,
+            "headings": by_text[text]["headings"],
+            "categories": by_text[text]["categories"],
             "embedding": embedding
-        })
+        }
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"Embedded {count} chunks from {filename} in {elapsed:.1f}s ({rate:.1f} chunks/s)")
 
-    search_client.upload_documents(documents=documents)
-    print(f"Uploaded {len(documents)} chunks from {filename}")
+def upload_documents(documents, search_client=None):
+    """Upload documents to AI Search in fixed-size batches."""
+    search_client = search_client or get_search_client()
+    for i in range(0, len(documents), UPLOAD_BATCH_SIZE):
+        search_client.upload_documents(documents=documents[i:i + UPLOAD_BATCH_SIZE])
 
-# ── Main ──────────────────────────────────────────
-if __name__ == "__main__":
-    print("Creating index...")
-    create_index()
+def delete_chunks(ids):
+    """Remove chunks from the index by ID."""
+    ids = list(ids)
+    if not ids:
+        return
+    search_client = get_search_client()
+    for i in range(0, len(ids), UPLOAD_BATCH_SIZE):
+        search_client.delete_documents(documents=[{"id": key} for key in ids[i:i + UPLOAD_BATCH_SIZE]])
+    print(f"Deleted {len(ids)} stale chunks")
+
+# ── Manifest ──────────────────────────────────────
+def load_manifest(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        return {"index": INDEX_NAME, "embedding_dimensions": EMBEDDING_DIMENSIONS, "chunker": CHUNKER,
+                "version": 0, "files": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
 
-    print("Downloading files from Blob Storage...")
-    files = download_blobs()
+def ingest(incremental=False, monitor_interval=None):
+    """
+    Index every blob in the container.
+    Full mode recreates the index. Incremental mode keeps it online and only embeds/upserts
+    chunks that are new, deletes chunks that disappeared, and skips blobs whose ETag or
+    content hash is unchanged since the manifest was written.
 
-    for filename, data in files.items():
-        print(f"Processing: {filename}")
-        text = parse_file(filename, data)
-        if not text:
+    Runs as a streaming pipeline: download → parse → chunk → embed → upload, one file per
+    item, with bounded queues between stages so only a few files are in memory at once.
+    """
+    manifest = load_manifest()
+    if not incremental:
+        manifest = {"index": INDEX_NAME, "embedding_dimensions": EMBEDDING_DIMENSIONS, "chunker": CHUNKER,
+                    "version": manifest.get("version", 0), "files": {}}
+    local_documents = load_local_documents(LOCAL_INDEX_DIR) if incremental else {}
+    previous_tables = load_coverage_table() if incremental else {}
+    if incremental and (not manifest["files"] or local_documents is None or manifest.get("index") != INDEX_NAME):
+        print("No usable manifest/local index from a previous run — falling back to a full rebuild.")
+        return ingest(incremental=False, monitor_interval=monitor_interval)
+    # The index schema fixes the vector size, so a new EMBEDDING_DIMENSIONS re-embeds everything
+    if incremental and manifest.get("embedding_dimensions", 1536) != EMBEDDING_DIMENSIONS:
+        print(f"Index holds {manifest.get('embedding_dimensions', 1536)}-dim embeddings, "
+              f"EMBEDDING_DIMENSIONS is {EMBEDDING_DIMENSIONS} — falling back to a full rebuild.")
+        return ingest(incremental=False, monitor_interval=monitor_interval)
+    # Unchanged files keep their chunks, so a new CHUNKER re-chunks everything (manifests without one predate chunker.py)
+    if incremental and manifest.get("chunker", "recursive") != CHUNKER:
+        print(f"Index was chunked with CHUNKER={manifest.get('chunker', 'recursive')}, "
+              f"now {CHUNKER} — falling back to a full rebuild.")
+        return ingest(incremental=False, monitor_interval=monitor_interval)
+
+    print("Creating index..." if not incremental else "Ensuring index exists...")
+    create_index(recreate=not incremental)
+
+    container = get_container()
+    search_client = get_search_client()
+
+    # ── Stages: each takes one file item (a dict) and yields it onward ──
+    def download(blob):
+        entry = manifest["files"].get(blob.name)
+        item = {"filename": blob.name, "etag": blob.etag, "entry": entry, "unchanged": False}
+        if entry and entry["etag"] == blob.etag:
+            item["unchanged"] = True
+            yield item
+            return
+        data = container.download_blob(blob.name).readall()
+        item["sha256"] = hashlib.sha256(data).hexdigest()
+        if entry and entry["sha256"] == item["sha256"]:
+            item["unchanged"] = True
+        else:
+            item["data"] = data
+        yield item
+
+    def parse(item):
+        if not item["unchanged"]:
+            print(f"Processing: {item['filename']}")
+            item["text"] = parse_file(item["filename"], item.pop("data"))
+            item["coverage_table"] = parse_coverage_table(item["text"])
+        yield item
+
+    def chunk(item):
+        if not item["unchanged"]:
+            text = item.pop("text")
+            chunk_ids = {}
+            for piece in (split_document(text) if text else []):
+                chunk_ids.setdefault(chunk_id(item["filename"], piece["text"]), piece)
+            old_ids = set(item["entry"]["chunks"]) if item["entry"] else set()
+            item["chunk_ids"] = list(chunk_ids)
+            item["new_chunks"] = [c for key, c in chunk_ids.items() if key not in old_ids or key not in local_documents]
+            item["stale_ids"] = old_ids - chunk_ids.keys()
+            print(f"  {item['filename']}: {len(chunk_ids)} chunks, {len(item['new_chunks'])} new, {len(item['stale_ids'])} removed")
+        yield item
+
+    def embed(item):
+        # Hand documents to the upload stage in fixed-size batches as embeddings arrive;
+        # the file item itself follows last, carrying the remainder
+        if not item["unchanged"]:
+            pending = []
+            for document in embed_documents(item["filename"], item.pop("new_chunks")):
+                pending.append(document)
+                if len(pending) >= UPLOAD_BATCH_SIZE:
+                    yield {"filename": item["filename"], "partial": True, "documents": pending}
+                    pending = []
+            item["documents"] = pending
+        yield item
+
+    def upload(item):
+        if item.get("partial"):
+            upload_documents(item["documents"], search_client)
+        elif not item["unchanged"]:
+            upload_documents(item["documents"], search_client)
+            delete_chunks(item["stale_ids"])
+        yield item
+
+    pipeline = Pipeline([
+        Stage("download", download, workers=DOWNLOAD_WORKERS, queue_size=PIPELINE_QUEUE_SIZE),
+        Stage("parse", parse, workers=PARSE_WORKERS, queue_size=PIPELINE_QUEUE_SIZE),
+        Stage("chunk", chunk, workers=1, queue_size=PIPELINE_QUEUE_SIZE),
+        Stage("embed", embed, workers=2, queue_size=PIPELINE_QUEUE_SIZE),
+        Stage("upload", upload, workers=1, queue_size=PIPELINE_QUEUE_SIZE),
+    ], output_queue_size=PIPELINE_QUEUE_SIZE)
+
+    # Sink — the only place the manifest and local documents are written
+    documents = {}  # chunk id -> document, for the local index
+    coverage_tables = {}  # plan file -> structured coverage table
+    changed = False
+    seen = set()
+    for item in pipeline.run(iter_blobs(container), monitor_interval=monitor_interval):
+        filename = item["filename"]
+        seen.add(filename)
+        if item.get("partial"):
+            documents.update({doc["id"]: doc for doc in item["documents"]})
+            changed = True
+            continue
+        entry = item["entry"]
+        if item["unchanged"]:
+            entry["etag"] = item["etag"]
+            if filename in previous_tables:
+                coverage_tables[filename] = previous_tables[filename]
+            documents.update({key: local_documents[key] for key in entry["chunks"] if key in local_documents})
             continue
-        chunks = chunk_text(text)
-        print(f"  {len(chunks)} chunks generated")
-        upload_chunks(filename, chunks)
 
-    print("\nIngestion complete!")
\ No newline at end of file
+        documents.update({doc["id"]: doc for doc in item["documents"]})
+        documents.update({key: local_documents[key] for key in item["chunk_ids"] if key in local_documents and key not in documents})
+        manifest["files"][filename] = {"etag": item["etag"], "sha256": item["sha256"], "chunks": item["chunk_ids"]}
+        if item["coverage_table"]:
+            coverage_tables[filename] = item["coverage_table"]
+            print(f"  {filename}: coverage table with {len(item['coverage_table']['categories'])} categories")
+        changed = changed or bool(item["documents"] or item["stale_ids"])
+
+    for filename in set(manifest["files"]) - seen:
+        print(f"Removed from container: {filename}")
+        delete_chunks(manifest["files"].pop(filename)["chunks"])
+        changed = True
+
+    print("\nPipeline stages:")
+    print(pipeline.report())
+
+    if changed or not incremental:
+        manifest["version"] = manifest.get("version", 0) + 1
+    save_local_index(list(documents.values()), LOCAL_INDEX_DIR)
+    save_coverage_table(coverage_tables, manifest["version"])
+    save_manifest(manifest)
+    print(f"Local index written to {LOCAL_INDEX_DIR}/ ({len(documents)} chunks, version {manifest['version']})")
+    return pipeline
+
+# ── Main ──────────────────────────────────────────
+if __name__ == "__main__":
+    print("ENDPOINT:", os.getenv("AZURE_OPENAI_ENDPOINT"))
+    print("EMBEDDING:", os.getenv("AZURE_EMBEDDING_DEPLOYMENT"), f"({EMBEDDING_DIMENSIONS} dims)")
+    ingest(
+        incremental="--incremental" in sys.argv[1:],
+        monitor_interval=5.0 if "--progress" in sys.argv[1:] else None
+    )
+    print("\nIngestion complete!")
@@ -0,0 +1,207 @@
+# Local intent classifier — answers before the router agent does
+# Features per query: word unigrams/bigrams plus rule features from a keyword/pattern layer
+# ("how much", zip codes, known Michigan city names, "covered", greetings, ...).
+# Model: one-vs-rest logistic regression per intent, trained with NumPy at first use from
+#   data/intent_examples.jsonl   hand-labeled seed queries
+#   INTENT_LOG                   queries the router agent labeled (appended by router_agent.py)
+# so every low-confidence query that goes to the router becomes training data next start.
+# The log is deduplicated (a query's newest label wins; seed queries keep their hand label) and
+# capped at the newest INTENT_LOG_MAX_PER_INTENT queries per intent combination; get_model()
+# rewrites it to what it kept. Features are trained as a sparse (row, column) list, so memory
+# and time grow with the feature count of the examples, not examples × vocabulary.
+# Prediction: every intent with p >= 0.5 (general when none). Confidence is the least
+# certain of those yes/no decisions, scaled to [0, 1]; below INTENT_CONFIDENCE_THRESHOLD
+# the caller should ask the router agent instead.
+# Tune the threshold with: python -m benchmarks.eval_intent_classifier
+
+import os
+import re
+import json
+import threading
+import numpy as np
+
+INTENTS = ("coverage", "provider_search", "cost_estimate")
+GENERAL = "general"
+INTENT_EXAMPLES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "intent_examples.jsonl")
+INTENT_LOG = os.getenv("INTENT_LOG", "intent_log.jsonl")
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.7"))
+# Router-labeled queries kept per intent combination (newest first)
+INTENT_LOG_MAX_PER_INTENT = int(os.getenv("INTENT_LOG_MAX_PER_INTENT", "200"))
+
+# Rule layer: each pattern that matches adds a "rule:<name>" feature
+RULES = {
+    "coverage_words": r"\b(cover(ed|s|age)?|deductible|annual max(imum)?|maximum|benefits?|waiting period|"
+                      r"frequency|coinsurance|percent(age)?|in[- ]network|out[- ]of[- ]network|plan (pay|allow)s?)\b",
+    "plan_compare": r"\b(compare|difference|versus|vs\.?)\b",
+    "cost_words": r"\b(how much|cost(s|ing)?|price|pay|owe|out[- ]of[- ]pocket|afford|expensive|estimate|fee)\b|\$",
+    "provider_words": r"\b(find|near|nearby|close to|looking for|recommend|who (are|does|is)|list|show me|"
+                      r"accepting|open on|phone number)\b",
+    "provider_roles": r"\b(dentists?|orthodontists?|endodontists?|periodontists?|prosthodontists?|oral surgeons?|"
+                      r"providers?|specialists?)\b",
+    "zip_code": r"\b4[89]\d{3}\b",
+    "greeting": r"^\s*(hi|hello|hey|thanks|thank you|good (morning|afternoon|evening)|bye|ok|okay)\b",
+    "question_about_self": r"\b(who are you|what can you do|help me|help)\b",
+    "cdt_code": r"\bd\d{4}\b",
+}
+_RULES = {name: re.compile(pattern, re.IGNORECASE) for name, pattern in RULES.items()}
+TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def _known_cities():
+    try:
+        from geo import load_zip_centroids
+        return {city.lower() for _, _, city in load_zip_centroids().values()}
+    except OSError:
+        return set()
+
+
+_CITIES = None
+
+
+def features(query):
+    """Sparse feature list for one query."""
+    global _CITIES
+    if _CITIES is None:
+        _CITIES = _known_cities()
+    text = query.lower()
+    tokens = TOKEN_RE.findall(text)
+    feats = [f"w:{t}" for t in tokens]
+    feats += [f"b:{a}_{b}" for a, b in zip(tokens, tokens[1:])]
+    feats += [f"rule:{name}" for name, pattern in _RULES.items() if pattern.search(query)]
+    for size in (3, 2, 1):
+        for i in range(len(tokens) - size + 1):
+            if " ".join(tokens[i:i + size]) in _CITIES:
+                feats.append("rule:city")
+                break
+    if not tokens:
+        feats.append("rule:empty")
+    return feats
+
+
+def _read_examples(path):
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [(record["query"], record["intents"]) for record in map(json.loads, filter(str.strip, f))]
+
+
+def _normalize(query):
+    return " ".join(TOKEN_RE.findall(query.lower()))
+
+
+def _cap_log(examples, seen, max_per_intent=INTENT_LOG_MAX_PER_INTENT):
+    """Newest label per query not in `seen`, at most max_per_intent per intent combination, in log order."""
+    kept, counts = [], {}
+    for query, intents in reversed(examples):
+        key = _normalize(query)
+        label = tuple(sorted(intents))
+        if key in seen or counts.get(label, 0) >= max_per_intent:
+            continue
+        seen.add(key)
+        counts[label] = counts.get(label, 0) + 1
+        kept.append((query, intents))
+    return kept[::-1]
+
+
+def load_examples(paths=None):
+    """
+    [(query, [intents])] from the seed file and the router log (missing files are skipped).
+    Duplicate queries keep their first seed label or newest log label; the log is capped per intent.
+    """
+    seed_path, log_path = paths or (INTENT_EXAMPLES_FILE, INTENT_LOG)
+    examples, seen = [], set()
+    for query, intents in _read_examples(seed_path):
+        if _normalize(query) not in seen:
+            seen.add(_normalize(query))
+            examples.append((query, intents))
+    return examples + _cap_log(_read_examples(log_path), seen)
+
+
+def compact_log(path=INTENT_LOG):
+    """Rewrite the router log to the entries load_examples() keeps; returns how many were dropped."""
+    logged = _read_examples(path)
+    seen = {_normalize(query) for query, _ in _read_examples(INTENT_EXAMPLES_FILE)}
+    kept = _cap_log(logged, seen)
+    if len(kept) < len(logged):
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.writelines(json.dumps({"query": query, "intents": intents}) + "\n" for query, intents in kept)
+        os.replace(path + ".tmp", path)
+    return len(logged) - len(kept)
+
+
+class IntentModel:
+    def __init__(self, vocabulary, weights, bias):
+        self.vocabulary = vocabulary   # feature -> column
+        self.weights = weights         # (features, intents)
+        self.bias = bias               # (intents,)
+
+    @classmethod
+    def train(cls, examples, epochs=300, learning_rate=0.5, l2=1e-3):
+        vocabulary = {}
+        rows, columns = [], []  # nonzero entries of the binary example × feature matrix
+        for i, (query, _) in enumerate(examples):
+            for f in set(features(query)):
+                rows.append(i)
+                columns.append(vocabulary.setdefault(f, len(vocabulary)))
+        rows, columns = np.array(rows, dtype=np.int64), np.array(columns, dtype=np.int64)
+        # Every example has a feature (rule:empty at least) and every column an example, so
+        # x @ w and x.T @ e are segment sums over the entries grouped by row and by column
+        row_starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        by_column = np.argsort(columns, kind="stable")
+        column_rows = rows[by_column]
+        column_starts = np.flatnonzero(np.r_[True, np.diff(columns[by_column]) != 0])
+        y = np.array([[intent in intents for intent in INTENTS] for _, intents in examples], dtype=np.float32)
+
+        weights = np.zeros((len(vocabulary), len(INTENTS)), dtype=np.float32)
+        bias = np.zeros(len(INTENTS), dtype=np.float32)
+        for _ in range(epochs):
+            logits = np.add.reduceat(weights[columns], row_starts) + bias
+            p = 1.0 / (1.0 + np.exp(-logits))
+            error = (p - y) / len(examples)
+            weights -= learning_rate * (np.add.reduceat(error[column_rows], column_starts) + l2 * weights)
+            bias -= learning_rate * error.sum(axis=0)
+        return cls(vocabulary, weights, bias)
+
+    def probabilities(self, query):
+        columns = [self.vocabulary[f] for f in set(features(query)) if f in self.vocabulary]
+        logits = self.weights[columns].sum(axis=0) + self.bias
+        return 1.0 / (1.0 + np.exp(-logits))
+
+    def predict(self, query):
+        """(intents, confidence). intents is a list in INTENTS order, or ["general"]."""
+        p = self.probabilities(query)
+        intents = [intent for intent, prob in zip(INTENTS, p) if prob >= 0.5] or [GENERAL]
+        confidence = float(np.min(np.abs(p - 0.5)) * 2)
+        return intents, confidence
+
+
+def get_model():
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                if INTENT_LOG and os.path.exists(INTENT_LOG):
+                    dropped = compact_log(INTENT_LOG)
+                    if dropped:
+                        print(f"  → Intent log: dropped {dropped} duplicate or over-cap entries")
+                _model = IntentModel.train(load_examples())
+    return _model
+
+
+def classify_local(query):
+    """(comma-separated intents in run_orchestrator's format, confidence)."""
+    intents, confidence = get_model().predict(query)
+    return ",".join(intents), confidence
+
+
+def log_router_label(query, intent_raw):
+    """Append a router-agent label to INTENT_LOG as future training data."""
+    if not INTENT_LOG:
+        return
+    intents = [i.strip() for i in intent_raw.split(",") if i.strip()]
+    intents = [i for i in intents if i in INTENTS] or [GENERAL]
+    with _model_lock, open(INTENT_LOG, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"query": query, "intents": intents}) + "\n")
@@ -0,0 +1,114 @@
+# Local lexical index — BM25 over the ingested chunks, fused with vector results by RRF
+# ingest.py writes it next to the vector index in LOCAL_INDEX_DIR (see vector_store.py):
+#   lexical.npz — terms (sorted vocabulary), offsets (postings start per term, len(terms) + 1),
+#                 doc_ids / term_freqs (postings, grouped by term) and doc_lengths (tokens per chunk)
+# Tokens are lowercased alphanumerics with crude plural folding (procedure_index.stem), so
+# "annual maximum" matches "Annual Maximums" and CDT codes like "D0120" are single terms.
+# Exact terms rank correctly with no embedding call; hybrid retrieval fuses the BM25 and
+# vector rankings with reciprocal-rank fusion, the same way Azure AI Search ranks hybrid queries.
+
+import os
+import re
+import numpy as np
+from procedure_index import stem
+
+LEXICAL_FILE = "lexical.npz"
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Too common in plan documents to help ranking
+STOP_WORDS = {"a", "an", "the", "of", "for", "my", "to", "is", "are", "and", "or", "with", "on", "in", "at",
+              "by", "be", "it", "i", "me", "do", "does", "what", "how", "this", "that", "your", "you", "will"}
+BM25_K1 = 1.2
+BM25_B = 0.75
+# RRF constant: higher flattens the difference between top ranks
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+
+def tokenize(text):
+    return [stem(t) for t in TOKEN_RE.findall(text.lower()) if t not in STOP_WORDS]
+
+
+class BM25Index:
+    """Postings for every term, scored with Okapi BM25."""
+
+    def __init__(self, terms, offsets, doc_ids, term_freqs, doc_lengths, k1=BM25_K1, b=BM25_B):
+        self.term_ids = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.term_freqs = term_freqs
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        self.avg_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+
+    @classmethod
+    def build(cls, texts):
+        """Index a list of texts; row i of the index is texts[i]."""
+        postings = {}  # term -> {row: frequency}
+        lengths = []
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths.append(len(tokens))
+            for token in tokens:
+                counts = postings.setdefault(token, {})
+                counts[row] = counts.get(row, 0) + 1
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        doc_ids, term_freqs = [], []
+        for i, term in enumerate(terms):
+            rows = sorted(postings[term])
+            doc_ids.extend(rows)
+            term_freqs.extend(postings[term][r] for r in rows)
+            offsets[i + 1] = len(doc_ids)
+        return cls(terms, offsets, np.array(doc_ids, dtype=np.int32),
+                   np.array(term_freqs, dtype=np.uint16), np.array(lengths, dtype=np.int32))
+
+    def scores(self, query):
+        """BM25 score of every row for a query string (zeros where no term matches)."""
+        scores = np.zeros(len(self.doc_lengths), dtype=np.float32)
+        if not len(scores):
+            return scores
+        norms = self.k1 * (1 - self.b + self.b * self.doc_lengths / max(self.avg_length, 1e-9))
+        for token in set(tokenize(query)):
+            term = self.term_ids.get(token)
+            if term is None:
+                continue
+            start, end = self.offsets[term], self.offsets[term + 1]
+            rows = self.doc_ids[start:end]
+            tf = self.term_freqs[start:end].astype(np.float32)
+            idf = np.log(1 + (len(scores) - len(rows) + 0.5) / (len(rows) + 0.5))
+            scores[rows] += idf * tf * (self.k1 + 1) / (tf + norms[rows])
+        return scores
+
+    def search(self, query, top=3, rows=None):
+        """Return [(row, score)] for the best-scoring rows, optionally restricted to `rows`."""
+        scores = self.scores(query)
+        candidates = np.arange(len(scores)) if rows is None else np.asarray(rows)
+        candidates = candidates[scores[candidates] > 0]
+        if len(candidates) == 0:
+            return []
+        order = np.argsort(-scores[candidates], kind="stable")[:top]
+        return [(int(candidates[i]), float(scores[candidates[i]])) for i in order]
+
+    # ── Persistence ───────────────────────────────────────────────────────────
+    def save(self, path):
+        terms = np.array(sorted(self.term_ids, key=self.term_ids.get), dtype=str)
+        np.savez(path, terms=terms, offsets=self.offsets, doc_ids=self.doc_ids,
+                 term_freqs=self.term_freqs, doc_lengths=self.doc_lengths)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(data["terms"].tolist(), data["offsets"], data["doc_ids"], data["term_freqs"], data["doc_lengths"])
+
+
+def reciprocal_rank_fusion(rankings, top=3, k=RRF_K):
+    """
+    Fuse ranked lists of rows: each row scores sum(1 / (k + rank)) over the lists it appears in.
+    :param rankings: lists of (row, score) pairs, best first; only the order is used.
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, (row, _) in enumerate(ranking, start=1):
+            fused[row] = fused.get(row, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: -item[1])[:top]
@@ -1,151 +1,191 @@
 # Calls router agent → gets intent (coverage, provider_search, cost_estimate, general)
 # Delegates to the matching agent(s)
 # Supports multi-intent queries (e.g. "coverage,provider_search")
-# Cost queries chain: Coverage Agent (get PPO + Premier %) → Cost Estimator (calculate out-of-pocket)
-
-import os
-import re
-from dotenv import load_dotenv
-from azure.ai.agents import AgentsClient
-from azure.ai.agents.models import AgentThreadCreationOptions, ThreadMessageOptions, MessageTextContent, MessageRole
-from azure.identity import DefaultAzureCredential
+# Cost queries chain: coverage table from ingest (or Coverage Agent on a miss) → Cost Estimator (calculate out-of-pocket)
+# Each request runs as a task graph (request_graph.py): independent agents run concurrently
+# Data and SDK clients load on first use (resources.py); warm_up() preloads them in the background
+# stream_orchestrator() yields (section, text delta) events as the agents' streaming runs produce
+# text, for the Streamlit UI; time to first token is tracked next to total latency
+# Each request is traced (tracing.py); `python tracing.py report` lists the slowest stages
+
+import time
+import queue
+import asyncio
+import threading
 from concurrent.futures import ThreadPoolExecutor
 
 # Import agent runners
 from router_agent import classify_intent
-from coverage_agent import run_coverage_agent
-from provider_finder_agent import run_provider_finder_agent
-from cost_estimator_agent import run_cost_estimator_agent
-
-load_dotenv()
-
-AZURE_AI_PROJECT_ENDPOINT = os.getenv("AZURE_AI_PROJECT_ENDPOINT")
-
-
-def extract_coverage_percent(coverage_response: str) -> dict:
-    """Extract PPO and Premier coverage percentages from coverage agent response."""
-    result = {"ppo": "0", "premier": "0"}
-
-    text = coverage_response.lower()
-
-    # Try to find PPO-specific percentage
-    ppo_match = re.search(r'ppo[^0-9]*(\d{1,3})\s*%', text)
-    if ppo_match:
-        result["ppo"] = ppo_match.group(1)
-
-    # Try to find Premier-specific percentage
-    premier_match = re.search(r'premier[^0-9]*(\d{1,3})\s*%', text)
-    if premier_match:
-        result["premier"] = premier_match.group(1)
-
-    # If neither found, grab first percentage as fallback for both
-    if result["ppo"] == "0" and result["premier"] == "0":
-        fallback = re.findall(r'(\d{1,3})\s*%', coverage_response)
-        if fallback:
-            result["ppo"] = fallback[0]
-            result["premier"] = fallback[0]
-
-    # If only one found, use it for both
-    if result["ppo"] == "0" and result["premier"] != "0":
-        result["ppo"] = result["premier"]
-    elif result["premier"] == "0" and result["ppo"] != "0":
-        result["premier"] = result["ppo"]
-
-    return result
-
-# query cleaner
-def make_coverage_query(user_query: str) -> str:
-    """Extract procedure keyword and build clean coverage query using category name."""
-    procedure_to_category = {
-        "cleaning": "Diagnostic and Preventive Services",
-        "checkup": "Diagnostic and Preventive Services",
-        "exam": "Diagnostic and Preventive Services",
-        "fluoride": "Diagnostic and Preventive Services",
-        "filling": "Minor Restorative Services",
-        "crown": "Major Restorative Services",
-        "root canal": "Endodontic Services",
-        "wisdom tooth": "Oral Surgery Services",
-        "extraction": "Oral Surgery Services",
-        "braces": "Orthodontic Services",
-        "orthodontic": "Orthodontic Services",
-        "denture": "Prosthodontic Services",
-        "bridge": "Prosthodontic Services",
-        "implant": "Prosthodontic Services",
-        "x-ray": "Radiographs",
-        "gum disease": "Periodontic Services",
-        "sealant": "Sealants",
-        "veneer": "Veneers",
-    }
-    query_lower = user_query.lower()
-    for keyword, category in procedure_to_category.items():
-        if keyword in query_lower:
-            return f"What is the coverage percentage for {category}? Include deductible and annual maximum."
-    return user_query
+from coverage_agent import run_coverage_agent, stream_coverage_agent, embedding_cache, embed_query
+import provider_finder_agent
+import cost_estimator_agent
+from provider_finder_agent import run_provider_finder_agent, stream_provider_finder_agent
+from cost_estimator_agent import run_cost_estimator_agent, stream_cost_estimator_agent, estimate_cost_answer
+from agent_clients import get_metrics, get_agents_client
+from resources import resource, warm_up  # warm_up re-exported for streamlit_app.py and the benchmarks
+from answer_cache import AnswerCache, index_version
+from intent_classifier import classify_local, get_model, INTENT_CONFIDENCE_THRESHOLD
+from coverage_table import lookup_coverage
+from cost_answer import COST_MODE
+from request_graph import build_request_graph
+from tracing import request
+
+# Near-duplicate questions under the same plan are answered from here
+answer_cache = AnswerCache()
+
+AGENTS = {
+    "classify_intent": classify_intent,
+    "coverage": run_coverage_agent,
+    "provider": run_provider_finder_agent,
+    "cost": run_cost_estimator_agent,
+    "coverage_table": lookup_coverage,
+    "coverage_stream": stream_coverage_agent,
+    "provider_stream": stream_provider_finder_agent,
+    "cost_stream": stream_cost_estimator_agent,
+}
+if COST_MODE == "deterministic":
+    AGENTS["cost_answer"] = estimate_cost_answer
+
+
+# Loaded by warm_up() along with the provider/procedure data, the OpenAI client and the embedding cache
+resource("agents_client", get_agents_client)
+resource("intent_model", get_model)
+
+# Seconds from request start to the first text shown, and to the full answer
+latency = {"ttft": [], "total": []}
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def latency_report():
+    """p50/p95 time to first token and total latency over this process's requests."""
+    return {f"{name}_{label}": _percentile(values, q)
+            for name, values in latency.items() for label, q in (("p50", 0.5), ("p95", 0.95))}
+
+
+def data_version():
+    """
+    Changes whenever the plan index, provider data or cost data changes. Provider and cost data
+    count only once loaded: no cached answer can depend on data that was never loaded, and reading
+    the version must not download it.
+    """
+    providers, procedures = provider_finder_agent.provider_data, cost_estimator_agent.procedure_data
+    return (index_version(),
+            providers.get()["PROVIDERS_VERSION"] if providers.loaded else None,
+            procedures.get()["PROCEDURES_VERSION"] if procedures.loaded else None)
+
+
+async def run_orchestrator_async(user_query: str, plan_filter: str = None, emit=None):
+    """
+    Route query to the appropriate agent(s) based on intent, running independent agents concurrently.
+    :param emit: optional (section, text delta) callback; sections stream as their agents produce text.
+    """
+    with request(query=user_query, plan=plan_filter) as request_span:
+        print(f"\nUser: {user_query}")
+        start = time.perf_counter()
+        first_token = []
+
+        def timed_emit(section, delta):
+            if not first_token:
+                first_token.append(time.perf_counter() - start)
+            if emit:
+                emit(section, delta)
+
+        query_vector, version = None, data_version()
+        if answer_cache.enabled:
+            try:
+                query_vector = await asyncio.to_thread(embedding_cache.get().get_or_embed, user_query, embed_query)
+            except Exception as e:
+                print(f"  → Answer cache skipped (embedding failed: {e})")
+        if query_vector is not None:
+            # Confident local intents narrow the match; otherwise any intent may match
+            local_intent, confidence = classify_local(user_query)
+            known_intents = local_intent.split(",") if confidence >= INTENT_CONFIDENCE_THRESHOLD else None
+            cached = answer_cache.lookup(plan_filter, query_vector, version, intents=known_intents)
+            request_span.set(answer_cache="hit" if cached else "miss")
+            if cached:
+                print(f"  → Answer cache hit (similarity {cached['score']:.3f} to {cached['query']!r})")
+                print(f"\nResponse:\n{cached['answer']}")
+                timed_emit("answer", cached["answer"])
+                _record_latency(start, first_token, request_span)
+                return cached["answer"]
+
+        graph = build_request_graph(user_query, plan_filter, AGENTS, emit=timed_emit)
+        results = await graph.run()
+        intents, combined = results["plan"], results["answer"]
+        request_span.set(intents=",".join(intents))
+
+        print(f"\nResponse:\n{combined}")
+        graph.report()
+        _record_latency(start, first_token, request_span)
+        if graph.fallbacks:
+            # A degraded answer (failed search, empty reply, agent-derived coverage) is not reused
+            print(f"  → Answer not cached: {'; '.join(graph.fallbacks)}")
+        elif query_vector is not None:
+            # The graph may have loaded provider or cost data since the lookup
+            answer_cache.store(plan_filter, intents, query_vector, user_query, combined, data_version())
+        metrics = get_metrics()
+        print(f"  → Clients created: {metrics['clients_created']}, token fetches: {metrics['token_fetches']} "
+              f"(cache hits: {metrics['token_cache_hits']}), client requests: {metrics['client_requests']}")
+        if embedding_cache.loaded:
+            cache = embedding_cache.get().report()
+            print(f"  → Embedding cache: {cache['hit_rate']:.0%} hit rate "
+                  f"({cache['memory_hits']} memory / {cache['disk_hits']} disk / {cache['truncated_hits']} truncated / "
+                  f"{cache['misses']} misses), "
+                  f"~{cache['saved_seconds']:.2f}s embedding latency saved")
+        answers = answer_cache.report()
+        print(f"  → Answer cache: {answers['entries']} entries, {answers['hit_rate']:.0%} hit rate, "
+              f"{answers['invalidations']} invalidations")
+        return combined
+
+
+def _record_latency(start, first_token, request_span):
+    total = time.perf_counter() - start
+    ttft = first_token[0] if first_token else total
+    latency["ttft"].append(ttft)
+    latency["total"].append(total)
+    request_span.set(ttft=round(ttft, 4))
+    report = latency_report()
+    print(f"  → Time to first token: {ttft:.2f}s, total: {total:.2f}s "
+          f"(p50 over {len(latency['total'])} requests: {report['ttft_p50']:.2f}s / {report['total_p50']:.2f}s)")
 
-def is_comparison_query(query: str) -> bool:
-    keywords = ["difference", "compare", "vs", "versus", "between"]
-    q = query.lower()
-    return any(k in q for k in keywords)
 
 def run_orchestrator(user_query: str, plan_filter: str = None):
-    """Route query to the appropriate agent(s) based on intent."""
-    print(f"\nUser: {user_query}")
-
-    intent_raw = classify_intent(user_query)
-    intents = [i.strip() for i in intent_raw.split(",")]
-    print(f"Intent(s): {intents}")
-
-    responses = []
-    has_coverage = any("coverage" in i for i in intents)
-    has_provider = any("provider" in i for i in intents)
-    has_cost = any("cost" in i for i in intents)
-
-    # Run coverage and provider — parallel if both, otherwise individual
-    # Replace lines 99-109 with:
-    if has_coverage and has_provider:
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            coverage_future = executor.submit(run_coverage_agent, make_coverage_query(user_query), plan_filter)
-            provider_future = executor.submit(run_provider_finder_agent, user_query)
-            responses.append(coverage_future.result())
-            responses.append(provider_future.result())
-    else:
-        if has_coverage:
-            if is_comparison_query(user_query):
-                base_resp = run_coverage_agent(user_query, "baseplan.pdf")
-                premium_resp = run_coverage_agent(user_query, "premiumplan.pdf")
-                responses.append(f"**Base Plan:**\n{base_resp}\n\n**Premium Plan:**\n{premium_resp}")
-            else:
-                responses.append(run_coverage_agent(make_coverage_query(user_query), plan_filter))
-        if has_provider:
-            responses.append(run_provider_finder_agent(user_query))
-
-    #cost chain needs to be sequential to extract coverage % first, then pass to cost estimator
-    if has_cost:
-        coverage_query = f"What is the coverage percentage for {user_query}? Provide the percentage for both Delta Dental PPO dentists and Delta Dental Premier dentists separately."
-        print("  → Checking coverage first...")
-        coverage_response = run_coverage_agent(coverage_query, plan_filter)
-
-        coverage = extract_coverage_percent(coverage_response or "")
-        print(f" → Extracted coverage: PPO {coverage['ppo']}%, Premier {coverage['premier']}%")
-
-        ppo_query = f"Calculate the out-of-pocket cost for a procedure with {coverage['ppo']}% coverage. {user_query}"
-        ppo_response = run_cost_estimator_agent(ppo_query, plan_filter)
-
-        if coverage["ppo"] != coverage["premier"]:
-            premier_query = f"{user_query}\nCoverage percentage for Delta Dental Premier dentists is: {coverage['premier']}%. Calculate the out-of-pocket cost for a procedure with this coverage."
-            premier_response = run_cost_estimator_agent(premier_query, plan_filter)
-            combined_cost = f"**With a Delta Dental PPO dentist:** {ppo_response}\n\n**With a Delta Dental Premier dentist:** {premier_response}"
-        else:
-            combined_cost = f"**Coverage is the same for PPO and Premier dentists at {coverage['ppo']}%**, so the out-of-pocket cost is: {ppo_response}"
-        
-        responses.append(combined_cost)
-
-    if not responses:
-        responses.append("I can help with dental coverage questions, finding providers, or estimating costs. What would you like to know?")
-
-    combined = "\n\n---\n\n".join(responses)
-    print(f"\nResponse:\n{combined}")
-    return combined
+    """Synchronous wrapper for Streamlit and the CLI."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(run_orchestrator_async(user_query, plan_filter))
+    # Called from inside a running event loop: run ours on a separate thread
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, run_orchestrator_async(user_query, plan_filter)).result()
+
+
+def stream_orchestrator(user_query: str, plan_filter: str = None):
+    """
+    Yield (section, text delta) events while the request runs (sections: request_graph.SECTION_TITLES),
+    then ("done", full answer). For Streamlit: render each section as its deltas arrive.
+    """
+    events = queue.Queue()
+
+    def worker():
+        try:
+            answer = asyncio.run(run_orchestrator_async(user_query, plan_filter, emit=lambda *event: events.put(event)))
+            events.put(("done", answer))
+        except BaseException as e:
+            events.put(("error", e))
+
+    threading.Thread(target=worker, daemon=True).start()
+    while True:
+        section, payload = events.get()
+        if section == "error":
+            raise payload
+        yield section, payload
+        if section == "done":
+            return
 
 # ── Entry point ───────────────────────────────────────────────────────────────
 if __name__ == "__main__":
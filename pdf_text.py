@@ -0,0 +1,132 @@
+# PDF text extraction — page-level parallelism + persistent parse cache
+# Pages are split into contiguous ranges and extracted on a shared process pool
+# (pypdf is pure Python, so threads would serialize on the GIL).
+# Extracted text is cached on disk keyed by file hash and page number:
+#   PARSE_CACHE_DIR/<sha256 of file>/<page>.txt, plus pages.json once every page is cached
+# so re-runs skip unchanged PDFs completely without opening them.
+
+import os
+import io
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+PARSE_CACHE_DIR = os.getenv("PARSE_CACHE_DIR", "parse_cache")
+PARSE_PROCESSES = int(os.getenv("PARSE_PROCESSES", str(os.cpu_count() or 2)))
+# Below this many pages a process round trip costs more than it saves
+MIN_PAGES_PER_TASK = 4
+
+_pool = None
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PARSE_PROCESSES)
+    return _pool
+
+
+def _extract_range(data, start, stop):
+    """Worker: extract pages [start, stop) from PDF bytes."""
+    from pypdf import PdfReader
+    reader = PdfReader(io.BytesIO(data))
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _page_count(data):
+    from pypdf import PdfReader
+    return len(PdfReader(io.BytesIO(data)).pages)
+
+
+def _cache_dir(digest, cache_dir):
+    return os.path.join(cache_dir, digest)
+
+
+def _read_cached_pages(directory, pages):
+    cached = {}
+    for page in pages:
+        path = os.path.join(directory, f"{page}.txt")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                cached[page] = f.read()
+    return cached
+
+
+def _write_cached_pages(directory, texts, page_count):
+    os.makedirs(directory, exist_ok=True)
+    for page, text in texts.items():
+        tmp_path = os.path.join(directory, f"{page}.txt.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, os.path.join(directory, f"{page}.txt"))
+    with open(os.path.join(directory, "pages.json"), "w", encoding="utf-8") as f:
+        json.dump({"pages": page_count}, f)
+
+
+def extract_pages(data, parallel=True, cache_dir=PARSE_CACHE_DIR):
+    """
+    Return the text of every page of a PDF, in order.
+    :param data: PDF file bytes.
+    :param parallel: Extract page ranges on the process pool (False = serial, in-process).
+    :param cache_dir: Page text cache directory; None disables the cache.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    directory = _cache_dir(digest, cache_dir) if cache_dir else None
+
+    if directory and os.path.exists(os.path.join(directory, "pages.json")):
+        with open(os.path.join(directory, "pages.json"), encoding="utf-8") as f:
+            page_count = json.load(f)["pages"]
+        cached = _read_cached_pages(directory, range(page_count))
+        if len(cached) == page_count:
+            return [cached[page] for page in range(page_count)]
+    else:
+        page_count = _page_count(data)
+        cached = _read_cached_pages(directory, range(page_count)) if directory else {}
+
+    missing = [page for page in range(page_count) if page not in cached]
+    texts = {}
+    if missing:
+        ranges = _contiguous_ranges(missing)
+        if parallel and len(missing) >= MIN_PAGES_PER_TASK * 2:
+            ranges = [r for start, stop in ranges for r in _split(start, stop, PARSE_PROCESSES)]
+            futures = [(start, _get_pool().submit(_extract_range, data, start, stop)) for start, stop in ranges]
+            for start, future in futures:
+                for offset, text in enumerate(future.result()):
+                    texts[start + offset] = text
+        else:
+            for start, stop in ranges:
+                for offset, text in enumerate(_extract_range(data, start, stop)):
+                    texts[start + offset] = text
+        if directory:
+            _write_cached_pages(directory, texts, page_count)
+
+    cached.update(texts)
+    return [cached[page] for page in range(page_count)]
+
+
+def extract_text(data, parallel=True, cache_dir=PARSE_CACHE_DIR):
+    """Full PDF text: pages joined once, each followed by a newline."""
+    return "".join(page + "\n" for page in extract_pages(data, parallel, cache_dir))
+
+
+def _contiguous_ranges(pages):
+    ranges = []
+    for page in pages:
+        if ranges and ranges[-1][1] == page:
+            ranges[-1][1] = page + 1
+        else:
+            ranges.append([page, page + 1])
+    return [tuple(r) for r in ranges]
+
+
+def _split(start, stop, parts):
+    """Split [start, stop) into up to `parts` ranges of at least MIN_PAGES_PER_TASK pages."""
+    count = stop - start
+    parts = max(1, min(parts, count // MIN_PAGES_PER_TASK))
+    size, extra = divmod(count, parts)
+    ranges = []
+    for i in range(parts):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
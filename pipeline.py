@@ -0,0 +1,184 @@
+# Streaming pipeline — concurrent stages connected by bounded queues
+# Each stage is a function item -> iterable of output items, run on `workers` threads.
+# Queues are bounded, so a slow stage applies back-pressure upstream instead of letting
+# the earlier stages buffer the whole container in memory.
+# Per-stage stats (busy time, time starved for input, time blocked on output, queue depth)
+# show which stage is the bottleneck: it is the one that is busy while its neighbours wait.
+
+import queue
+import threading
+import time
+
+_DONE = object()
+
+
+class StageStats:
+    def __init__(self, name, workers, input_queue):
+        self.name = name
+        self.workers = workers
+        self.input_queue = input_queue
+        self.items_in = 0
+        self.items_out = 0
+        self.busy_seconds = 0.0
+        self.wait_in_seconds = 0.0   # idle, waiting for upstream
+        self.wait_out_seconds = 0.0  # blocked, downstream queue full
+        self.max_queue_depth = 0
+        self.lock = threading.Lock()
+
+    def queue_depth(self):
+        return self.input_queue.qsize() if self.input_queue is not None else 0
+
+    def as_dict(self):
+        return {
+            "stage": self.name,
+            "workers": self.workers,
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "busy_s": round(self.busy_seconds, 3),
+            "wait_in_s": round(self.wait_in_seconds, 3),
+            "wait_out_s": round(self.wait_out_seconds, 3),
+            "queue_depth": self.queue_depth(),
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+
+class Stage:
+    def __init__(self, name, fn, workers=1, queue_size=4):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.queue_size = queue_size
+
+
+class Pipeline:
+    """Run `source` through `stages`; iterate run() to consume the last stage's output."""
+
+    def __init__(self, stages, output_queue_size=4):
+        self.stages = stages
+        self.output_queue_size = output_queue_size
+        self.stats = []
+        self.error = None
+        self._failed = threading.Event()
+
+    def run(self, source, monitor_interval=None):
+        """Start every stage; yields the last stage's outputs. monitor_interval prints live queue depths."""
+        queues = [queue.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        queues.append(queue.Queue(maxsize=self.output_queue_size))
+        source_stats = StageStats("source", 1, None)
+        self.stats = [source_stats] + [
+            StageStats(stage.name, stage.workers, queues[i]) for i, stage in enumerate(self.stages)
+        ]
+
+        threads = [threading.Thread(target=self._feed, args=(source, queues[0], source_stats), daemon=True)]
+        for i, stage in enumerate(self.stages):
+            remaining = [stage.workers]
+            for _ in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=self._work,
+                    args=(stage, queues[i], queues[i + 1], self.stats[i + 1], remaining),
+                    daemon=True,
+                ))
+        for thread in threads:
+            thread.start()
+        done = threading.Event()
+        if monitor_interval:
+            threading.Thread(target=self._monitor, args=(monitor_interval, done), daemon=True).start()
+
+        output = queues[-1]
+        while True:
+            item = output.get()
+            if item is _DONE:
+                break
+            yield item
+
+        for thread in threads:
+            thread.join()
+        done.set()
+        if self.error is not None:
+            raise self.error
+
+    def _fail(self, error):
+        if self.error is None:
+            self.error = error
+        self._failed.set()
+
+    def _put(self, q, item, stats):
+        start = time.perf_counter()
+        q.put(item)
+        with stats.lock:
+            stats.wait_out_seconds += time.perf_counter() - start
+            stats.items_out += 1
+
+    def _feed(self, source, out_queue, stats):
+        try:
+            iterator = iter(source)
+            while not self._failed.is_set():
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                stats.busy_seconds += time.perf_counter() - start
+                stats.items_in += 1
+                self._put(out_queue, item, stats)
+        except Exception as e:
+            self._fail(e)
+        out_queue.put(_DONE)
+
+    def _work(self, stage, in_queue, out_queue, stats, remaining):
+        while True:
+            start = time.perf_counter()
+            item = in_queue.get()
+            waited = time.perf_counter() - start
+            with stats.lock:
+                stats.wait_in_seconds += waited
+
+            if item is _DONE:
+                # Let sibling workers see the sentinel; the last one out closes the next queue
+                in_queue.put(_DONE)
+                with stats.lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last:
+                    out_queue.put(_DONE)
+                return
+
+            with stats.lock:
+                stats.items_in += 1
+                stats.max_queue_depth = max(stats.max_queue_depth, in_queue.qsize() + 1)
+            if self._failed.is_set():
+                continue  # drain so upstream threads are not left blocked on a full queue
+
+            try:
+                outputs = iter(stage.fn(item))
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        result = next(outputs)
+                    except StopIteration:
+                        with stats.lock:
+                            stats.busy_seconds += time.perf_counter() - start
+                        break
+                    with stats.lock:
+                        stats.busy_seconds += time.perf_counter() - start
+                    self._put(out_queue, result, stats)
+            except Exception as e:
+                self._fail(e)
+
+    def report(self):
+        """Per-stage timing table, slowest (busiest per worker) stage marked."""
+        rows = [s.as_dict() for s in self.stats]
+        bottleneck = max(self.stats[1:], key=lambda s: s.busy_seconds / s.workers, default=None)
+        lines = [f"{'stage':<10} {'workers':>7} {'in':>6} {'out':>6} {'busy s':>8} {'wait in':>8} {'wait out':>8} {'max q':>6}"]
+        for row, stats in zip(rows, self.stats):
+            marker = "  <- bottleneck" if stats is bottleneck else ""
+            lines.append(
+                f"{row['stage']:<10} {row['workers']:>7} {row['items_in']:>6} {row['items_out']:>6} "
+                f"{row['busy_s']:>8.2f} {row['wait_in_s']:>8.2f} {row['wait_out_s']:>8.2f} {row['max_queue_depth']:>6}{marker}"
+            )
+        return "\n".join(lines)
+
+    def _monitor(self, interval, done):
+        while not done.wait(interval):
+            depths = ", ".join(f"{s.name}={s.queue_depth()}" for s in self.stats[1:])
+            print(f"  [pipeline] queue depth: {depths}")
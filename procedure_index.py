@@ -0,0 +1,319 @@
+# Procedure index — ranked fuzzy lookup behind get_procedure_cost
+# Built once at load time from the procedure list:
+#   token postings      stemmed name/category/alias token -> procedure ids
+#   trigram postings    trigram -> vocabulary tokens, so misspellings ("extration") still land,
+#                       and trigram -> procedure ids for exact name-substring matches
+#   synonyms            lay phrasings ("tooth pulled", "cavity", "checkup") -> catalog terms
+#   aliases             extra words indexed with a procedure ("porcelain" for Crown - Permanent)
+#   CDT codes           "D2740" -> the procedure it prices
+# A query is expanded (synonyms, stems, fuzzy tokens) and every procedure that shares a
+# token is scored by IDF-weighted token overlap, so one call returns every plausible match
+# ranked by score instead of an all-or-nothing substring check.
+
+import re
+import math
+from functools import lru_cache
+
+# CDT codes per catalog procedure name (ADA Code on Dental Procedures and Nomenclature)
+CDT_CODES = {
+    "Bleaching": ["D9972"],
+    "Braces - Adolescent": ["D8080"],
+    "Braces - Adult": ["D8090"],
+    "Bridge - 3 Unit (Pontic/False Tooth)": ["D6240"],
+    "Bridge - 3 Unit (Restorative Crowns)": ["D6750"],
+    "Crown - Stainless Steel (Child)": ["D2930"],
+    "Crown - Permanent": ["D2740", "D2750"],
+    "Full Mouth Debridement": ["D4355"],
+    "Cleaning - Regular (Adult)": ["D1110"],
+    "Cleaning - Child": ["D1120"],
+    "Exam - Emergency": ["D0140"],
+    "Exam - Established Patient": ["D0120"],
+    "Exam - New Patient": ["D0150"],
+    "Denture - Lower Removable (Full)": ["D5120"],
+    "Denture - Upper Removable (Full)": ["D5110"],
+    "Partial Denture - Lower": ["D5214"],
+    "Partial Denture - Upper": ["D5213"],
+    "Pain Relief Treatment - Minor": ["D9110"],
+    "Filling - Silver (1 Surface)": ["D2140"],
+    "Filling - Silver (2 Surfaces)": ["D2150"],
+    "Filling - Silver (3 Surfaces)": ["D2160"],
+    "Filling - Silver (4+ Surfaces)": ["D2161"],
+    "Filling - White/Composite (Back, 1 Surface)": ["D2391"],
+    "Filling - White/Composite (Back, 2 Surfaces)": ["D2392"],
+    "Filling - White/Composite (Back, 3 Surfaces)": ["D2393"],
+    "Filling - White/Composite (Back, 4+ Surfaces)": ["D2394"],
+    "Filling - White/Composite (Front, 1 Surface)": ["D2330"],
+    "Filling - White/Composite (Front, 2 Surfaces)": ["D2331"],
+    "Filling - White/Composite (Front, 3 Surfaces)": ["D2332"],
+    "Filling - White/Composite (Front, 4+ Surfaces)": ["D2335"],
+    "Fluoride - Non-Varnish": ["D1208"],
+    "Fluoride - Varnish": ["D1206"],
+    "General Anesthesia": ["D9222", "D9223"],
+    "Implant - Single Tooth Replacement": ["D6010"],
+    "Implant - Custom Abutment (includes placement)": ["D6057"],
+    "Mouthguard - Athletic (custom fabricated)": ["D9941"],
+    "Occlusal Guard - Full Arch": ["D9944"],
+    "Periodontal Cleaning": ["D4910"],
+    "Root Canal - Front Tooth": ["D3310"],
+    "Root Canal - Molar": ["D3330"],
+    "Root Canal - Premolar": ["D3320"],
+    "Sealant (per Tooth)": ["D1351"],
+    "Tissue (Gum) Graft": ["D4273"],
+    "Extraction - Non-surgical": ["D7140"],
+    "Extraction - Surgical": ["D7210"],
+    "Extraction - Wisdom Tooth": ["D7240"],
+    "Veneer - Porcelain Laminate (Laboratory)": ["D2962"],
+    "X-ray - Bitewing (2)": ["D0272"],
+    "X-ray - Bitewing (4)": ["D0274"],
+    "X-ray - Panoramic": ["D0330"],
+    "X-ray - Periapical (First)": ["D0220"],
+    "X-ray - Periapical (Each Additional)": ["D0230"],
+    "X-ray - Full Mouth Series": ["D0210"],
+}
+
+# Extra words a procedure should be found by, beyond its name and category
+ALIASES = {
+    "Crown - Permanent": "porcelain ceramic",
+    "Cleaning - Regular (Adult)": "routine",
+    "Exam - Established Patient": "routine periodic",
+    "Denture - Lower Removable (Full)": "complete",
+    "Denture - Upper Removable (Full)": "complete",
+    "Implant - Single Tooth Replacement": "missing",
+    "Full Mouth Debridement": "tartar",
+    "Tissue (Gum) Graft": "recession",
+}
+
+# Lay phrase -> catalog wording. The phrase's tokens are replaced by the catalog wording;
+# phrases are matched on whole (stemmed) tokens, longest first.
+SYNONYMS = {
+    "tooth pulled": "tooth extraction non-surgical",
+    "pulled": "extraction",
+    "pull": "extraction",
+    "removal": "extraction",
+    "removed": "extraction",
+    "yank": "extraction",
+    "oral surgery": "extraction surgical",
+    "wisdom teeth": "wisdom tooth extraction",
+    "cavity": "filling",
+    "amalgam": "silver filling",
+    "metal filling": "silver filling",
+    "tooth colored": "white composite",
+    "resin": "composite",
+    "cap": "crown",
+    "whitening": "bleaching",
+    "whiten": "bleaching",
+    "checkup": "exam established patient",
+    "check up": "exam established patient",
+    "visit": "exam",
+    "evaluation": "exam",
+    "consultation": "exam",
+    "radiograph": "x-ray",
+    "pano": "panoramic x-ray",
+    "fmx": "full mouth series x-ray",
+    "bitewings": "bitewing x-ray",
+    "teeth cleaning": "cleaning regular adult",
+    "prophy": "cleaning",
+    "prophylaxis": "cleaning",
+    "hygiene": "cleaning",
+    "deep cleaning": "periodontal cleaning",
+    "scaling": "periodontal cleaning",
+    "gum": "periodontal gum",
+    "endodontic": "root canal",
+    "rct": "root canal",
+    "nerve": "root canal",
+    "false teeth": "denture complete",
+    "plate": "partial denture",
+    "orthodontic": "braces",
+    "orthodontics": "braces",
+    "invisalign": "braces adult",
+    "aligner": "braces",
+    "kid": "child",
+    "children": "child",
+    "teen": "adolescent",
+    "teenager": "adolescent",
+    "night guard": "occlusal guard",
+    "grinding": "occlusal guard",
+    "bruxism": "occlusal guard",
+    "sports guard": "mouthguard athletic",
+    "mouth guard": "mouthguard",
+    "sedation": "general anesthesia",
+    "put under": "general anesthesia",
+    "toothache": "pain relief emergency",
+    "pain": "pain relief",
+    "replacement tooth": "implant",
+    "post": "implant abutment",
+    "back": "back molar premolar",
+    "incisor": "front",
+    "canine": "front",
+    "bicuspid": "premolar",
+}
+
+# The D prefix is required: a bare 4-digit number in a cost question is a price or a year
+CDT_RE = re.compile(r"\bd\s?(\d{4})\b", re.IGNORECASE)
+TOKEN_RE = re.compile(r"[a-z0-9+]+")
+# Stop words never score on their own
+STOP_WORDS = {"a", "an", "the", "of", "for", "my", "to", "get", "getting", "how", "much", "is", "does",
+              "cost", "price", "per", "and", "or", "with", "on", "in", "i", "me", "need", "do", "it", "what",
+              "treatment", "procedure", "dental", "service"}
+# Tokens at least this trigram-similar to a vocabulary token count as that token
+FUZZY_THRESHOLD = 0.5
+FUZZY_WEIGHT = 0.8
+# Matches scoring below this fraction of the best match are dropped
+RELATIVE_CUTOFF = 0.6
+MIN_SCORE = 0.3
+
+
+def stem(token):
+    """Crude plural folding: teeth -> tooth, canals -> canal, surfaces -> surface."""
+    if token == "teeth":
+        return "tooth"
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    text = text.lower().replace("x-ray", "xray").replace("x ray", "xray")
+    return [stem(t) for t in TOKEN_RE.findall(text)]
+
+
+def _trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# Synonym phrases in token form keyed by their first token, longest phrase first
+_SYNONYM_TOKENS = {}
+for _phrase, _target in sorted(SYNONYMS.items(), key=lambda item: -len(tokenize(item[0]))):
+    _tokens = tuple(tokenize(_phrase))
+    _SYNONYM_TOKENS.setdefault(_tokens[0], []).append((_tokens, tokenize(_target)))
+
+
+def expand(tokens):
+    """Tokens with every synonym phrase replaced by its catalog wording."""
+    expanded, i = [], 0
+    while i < len(tokens):
+        for phrase, target in _SYNONYM_TOKENS.get(tokens[i], ()):
+            if tuple(tokens[i:i + len(phrase)]) == phrase:
+                expanded.extend(target)
+                i += len(phrase)
+                break
+        else:
+            expanded.append(tokens[i])
+            i += 1
+    return expanded
+
+
+class ProcedureIndex:
+    def __init__(self, procedures):
+        self.procedures = procedures
+        self.postings = {}    # token -> set of procedure ids
+        self.trigrams = {}    # trigram -> set of vocabulary tokens
+        self.codes = {}       # "2740" -> procedure id
+        self.name_trigrams = {}  # trigram of a lowercased name -> procedure ids
+        self.names = [p["name"].lower() for p in procedures]
+        self.token_sets = []
+
+        for procedure_id, p in enumerate(procedures):
+            name_tokens = set(tokenize(p["name"])) - STOP_WORDS
+            self.token_sets.append(name_tokens)
+            tokens = name_tokens | set(tokenize(p["category"])) | set(tokenize(ALIASES.get(p["name"], "")))
+            tokens -= STOP_WORDS
+            for token in tokens:
+                self.postings.setdefault(token, set()).add(procedure_id)
+            name = self.names[procedure_id]
+            for i in range(len(name) - 2):
+                self.name_trigrams.setdefault(name[i:i + 3], set()).add(procedure_id)
+            for code in p.get("cdt_codes") or CDT_CODES.get(p["name"], []):
+                self.codes[code.upper().lstrip("D")] = procedure_id
+
+        count = len(procedures)
+        self.idf = {token: math.log(1 + count / len(ids)) for token, ids in self.postings.items()}
+        for token in self.postings:
+            for gram in _trigrams(token):
+                self.trigrams.setdefault(gram, set()).add(token)
+
+        self.lookup = lru_cache(maxsize=1024)(self._lookup_uncached)
+
+    def _fuzzy(self, token):
+        """Closest vocabulary token to a token that is not in the vocabulary, with its similarity."""
+        grams = _trigrams(token)
+        counts = {}
+        for gram in grams:
+            for candidate in self.trigrams.get(gram, ()):
+                counts[candidate] = counts.get(candidate, 0) + 1
+        best, best_score = None, 0.0
+        for candidate, shared in counts.items():
+            score = shared / len(grams | _trigrams(candidate))  # Jaccard
+            if score > best_score or (score == best_score and best and candidate < best):
+                best, best_score = candidate, score
+        return (best, best_score) if best_score >= FUZZY_THRESHOLD else (None, 0.0)
+
+    def _substring_ids(self, query):
+        """Ids of procedures whose name contains `query`."""
+        if len(query) < 3:
+            candidates = range(len(self.names))
+        else:
+            grams = sorted((self.name_trigrams.get(query[i:i + 3], set()) for i in range(len(query) - 2)), key=len)
+            candidates = set.intersection(*grams)
+        return [i for i in candidates if query in self.names[i]]
+
+    def _weighted_tokens(self, query):
+        """Query tokens mapped onto the vocabulary as {token: weight}."""
+        weights = {}
+        for token in expand(tokenize(query)):
+            if token in STOP_WORDS:
+                continue
+            if token in self.postings:
+                weights[token] = max(weights.get(token, 0.0), 1.0)
+            elif len(token) >= 4:
+                match, similarity = self._fuzzy(token)
+                if match:
+                    weights[match] = max(weights.get(match, 0.0), FUZZY_WEIGHT * similarity)
+        return weights
+
+    def _lookup_uncached(self, query, limit=None):
+        """
+        Ranked [(procedure_id, score)] for a query, best first. Scores are in (0, 1].
+        A CDT code or a prefix of a procedure name scores 1.0 (any other substring 0.99); otherwise the score is
+        the IDF-weighted share of the query's tokens the procedure contains.
+        """
+        query = query.strip().lower()
+        if not query:
+            return []
+
+        code = CDT_RE.search(query)
+        if code and code.group(1) in self.codes:
+            return [(self.codes[code.group(1)], 1.0)]
+
+        scores = {}
+        for procedure_id in self._substring_ids(query):
+            scores[procedure_id] = 1.0 if self.names[procedure_id].startswith(query) else 0.99
+
+        weights = self._weighted_tokens(query)
+        total = sum(self.idf[t] * w for t, w in weights.items())
+        if total:
+            overlap = {}
+            for token, weight in weights.items():
+                for procedure_id in self.postings[token]:
+                    overlap[procedure_id] = overlap.get(procedure_id, 0.0) + self.idf[token] * weight
+            for procedure_id, value in overlap.items():
+                # Small penalty for name tokens the query did not ask for, to break ties
+                extra = len(self.token_sets[procedure_id] - weights.keys())
+                score = value / total - 0.01 * extra
+                scores[procedure_id] = max(scores.get(procedure_id, 0.0), round(max(score, 0.0), 4))
+
+        if not scores:
+            return []
+        best = max(scores.values())
+        ranked = sorted(
+            ((i, s) for i, s in scores.items() if s >= MIN_SCORE and s >= best * RELATIVE_CUTOFF),
+            key=lambda r: (-r[1], r[0]),
+        )
+        return ranked[:limit] if limit else ranked
+
+    def search(self, query, limit=None):
+        """Ranked [(procedure, score)] for a query."""
+        return [(self.procedures[i], score) for i, score in self.lookup(query, limit)]
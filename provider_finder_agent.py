@@ -2,7 +2,7 @@
 # Ann Arbor, Cadillac, East Grand Rapids, Grand Rapids, Interlochen, Kingsley, Lake City, Lansing, Mesick, Traverse City, Wyoming
 # # Flow:
 
-# On startup — downloads 1stproviders (1).json from providerdata blob container, loads it into memory once
+# On first use — downloads 1stproviders (1).json from providerdata blob container, loads it into memory once
 # Tool: search_providers(city, specialty, network, accepting_new) — filters the provider list by any combination of:
 
 #City (e.g. "Cadillac", "Traverse City")
@@ -19,10 +19,12 @@
 import os
 import json
 from dotenv import load_dotenv
-from azure.storage.blob import BlobServiceClient
-from azure.ai.agents import AgentsClient
-from azure.ai.agents.models import FunctionTool, MessageTextContent, MessageRole, AgentThreadCreationOptions, ThreadMessageOptions
-from azure.identity import DefaultAzureCredential
+from agent_clients import register_tools, run_agent_text, stream_agent_text
+from provider_index import ProviderIndex
+from geo import resolve_location
+from answer_cache import data_hash
+from resources import resource
+from services import blob_service_client
 
 load_dotenv()
 
@@ -30,26 +32,61 @@ AZURE_AI_PROJECT_ENDPOINT = os.getenv("AZURE_AI_PROJECT_ENDPOINT")
 AZURE_STORAGE_CONNECTION_STRING = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
 PROVIDER_FINDER_AGENT_ID = os.getenv("PROVIDER_FINDER_AGENT_ID")
 CONTAINER_NAME = "providersjson"
+# Set to providers_statewide.json after running extract_providers.py --upload
+PROVIDERS_BLOB = os.getenv("PROVIDERS_BLOB", "1stproviders (1).json")
 
 
 def load_providers():
-    """Download 1stproviders (1).json from Azure Blob Storage."""
-    blob_service_client = BlobServiceClient.from_connection_string(AZURE_STORAGE_CONNECTION_STRING)
-    container = blob_service_client.get_container_client(CONTAINER_NAME)
-    blob_data = container.download_blob("1stproviders (1).json").readall()
+    """Download the provider JSON (PROVIDERS_BLOB) from Azure Blob Storage."""
+    container = blob_service_client(AZURE_STORAGE_CONNECTION_STRING).get_container_client(CONTAINER_NAME)
+    blob_data = container.download_blob(PROVIDERS_BLOB).readall()
     data = json.loads(blob_data)
     return data["providers"]
 
 
-# Load once at module level
-PROVIDERS = load_providers()
+def _load_provider_data():
+    providers = load_providers()
+    return {"PROVIDERS": providers, "PROVIDERS_VERSION": data_hash(providers), "PROVIDER_INDEX": ProviderIndex(providers)}
+
+
+# Downloaded on first use, once per process
+provider_data = resource("providers", _load_provider_data)
+
+
+def __getattr__(name):
+    """PROVIDERS, PROVIDERS_VERSION and PROVIDER_INDEX load on first access."""
+    if name in ("PROVIDERS", "PROVIDERS_VERSION", "PROVIDER_INDEX"):
+        return provider_data.get()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def format_provider(p, miles=None):
+    networks_str = ", ".join(p["networks"])
+    languages_str = ", ".join(p["languages"])
+    text = (
+        f"Name: {p['name']}\n"
+        f"Specialty: {p['specialty']}\n"
+        f"Office: {p['office_name']}\n"
+        f"Address: {p['address']}\n"
+        f"Phone: {p['phone']}\n"
+        f"Email: {p['email']}\n"
+        f"Hours: {p['hours']}\n"
+        f"Networks: {networks_str}\n"
+        f"Languages: {languages_str}\n"
+        f"Rating: {p['dentaqual_rating'] or 'N/A'}"
+    )
+    if miles is not None:
+        text += f"\nDistance: {miles:.1f} miles"
+    return text
 
 
 def search_providers(
     city: str = "",
     specialty: str = "",
     network: str = "",
-    accepting_new: str = "true"
+    accepting_new: str = "true",
+    near: str = "",
+    radius_miles: str = "25"
 ) -> str:
     """
     Search for dental providers by city, specialty, and network. ALWAYS USE THE SEARCH_PROVIDORS TOOL.
@@ -57,98 +94,68 @@ def search_providers(
     :param specialty: Specialty to filter by (e.g. General Dentist, Orthodontist, Endodontist, Prosthodontist). Leave empty for all.
     :param network: Network to filter by (e.g. Delta Dental PPO, Delta Dental Premier). Leave empty for all.
     :param accepting_new: Filter by accepting new patients. Use 'true' or 'false'. Default 'true'.
+    :param near: Zip code, city, or 'lat,lon' to search around, nearest first (e.g. 49684). Leave empty to match on city only.
+    :param radius_miles: Maximum distance in miles when 'near' is set. Default '25'.
     :return: Matching providers as formatted text.
     """
-    results = PROVIDERS
+    data = provider_data.get()
+    filters = {
+        "city": city,
+        "specialty": specialty,
+        "network": network,
+        "accepting_new": accepting_new.lower() == "true",
+    }
+
+    if near:
+        location = resolve_location(near)
+        if location is None:
+            return f"Could not find a location for '{near}'. Try a Michigan zip code or city name."
+        try:
+            radius = float(radius_miles)
+        except ValueError:
+            radius = 25.0
+        hits = data["PROVIDER_INDEX"].nearest(location[0], location[1], radius_miles=radius, limit=10, **filters)
+        if not hits:
+            return f"No providers found within {radius:g} miles of {near} matching your criteria."
+        return "\n\n---\n\n".join(format_provider(data["PROVIDERS"][i], miles) for i, miles in hits)
+
+    results = data["PROVIDER_INDEX"].search_providers(limit=10, **filters)
 
-    if city:
-        results = [p for p in results if city.lower() in p["city"].lower()]
+    if not results:
+        return "No providers found matching your criteria."
 
-    if specialty:
-        results = [p for p in results if specialty.lower() in p["specialty"].lower()]
+    return "\n\n---\n\n".join(format_provider(p) for p in results)
 
-    if network:
-        results = [p for p in results if any(network.lower() in n.lower() for n in p["networks"])]
 
-    if accepting_new.lower() == "true":
-        filtered = []
-        for p in results:
-            for net, accepting in p["accepts_new_patients"].items():
-                if accepting:
-                    filtered.append(p)
-                    break
-        results = filtered
+def search_providers_tool(city: str = "", specialty: str = "", network: str = "", accepting_new: str = "true", near: str = "", radius_miles: str = "25") -> str:
+    """
+    Search for dental providers by city, specialty, and network, or nearest to a location.
+    :param city: City name to filter by (e.g. Cadillac, Traverse City). Leave empty for all cities.
+    :param specialty: Specialty to filter by (e.g. General Dentist, Orthodontist, Endodontist, Prosthodontist). Leave empty for all.
+    :param network: Network to filter by (e.g. Delta Dental PPO, Delta Dental Premier). Leave empty for all.
+    :param accepting_new: Filter by accepting new patients. Use 'true' or 'false'. Default 'true'.
+    :param near: Zip code, city, or 'lat,lon' to search around, nearest first (e.g. 49684). Use this for "near me" / "near <zip>" requests.
+    :param radius_miles: Maximum distance in miles when 'near' is set. Default '25'.
+    :return: Matching providers as formatted text.
+    """
+    return search_providers(city, specialty, network, accepting_new, near, radius_miles)
 
-    if not results:
-        return "No providers found matching your criteria."
 
-    # Limit to top 10
-    results = results[:10]
-
-    output = []
-    for p in results:
-        networks_str = ", ".join(p["networks"])
-        languages_str = ", ".join(p["languages"])
-        output.append(
-            f"Name: {p['name']}\n"
-            f"Specialty: {p['specialty']}\n"
-            f"Office: {p['office_name']}\n"
-            f"Address: {p['address']}\n"
-            f"Phone: {p['phone']}\n"
-            f"Email: {p['email']}\n"
-            f"Hours: {p['hours']}\n"
-            f"Networks: {networks_str}\n"
-            f"Languages: {languages_str}\n"
-            f"Rating: {p['dentaqual_rating'] or 'N/A'}"
-        )
-
-    return "\n\n---\n\n".join(output)
+register_tools(search_providers_tool)
 
 
 def run_provider_finder_agent(user_query: str):
     """Run the provider finder agent with search tool."""
-    agents_client = AgentsClient(
-        endpoint=AZURE_AI_PROJECT_ENDPOINT,
-        credential=DefaultAzureCredential(),
-    )
-
-    def search_providers_tool(city: str = "", specialty: str = "", network: str = "", accepting_new: str = "true") -> str:
-        """
-        Search for dental providers by city, specialty, and network.
-        :param city: City name to filter by (e.g. Cadillac, Traverse City). Leave empty for all cities.
-        :param specialty: Specialty to filter by (e.g. General Dentist, Orthodontist, Endodontist, Prosthodontist). Leave empty for all.
-        :param network: Network to filter by (e.g. Delta Dental PPO, Delta Dental Premier). Leave empty for all.
-        :param accepting_new: Filter by accepting new patients. Use 'true' or 'false'. Default 'true'.
-        :return: Matching providers as formatted text.
-        """
-        return search_providers(city, specialty, network, accepting_new)
-
-    functions = FunctionTool(functions=[search_providers_tool])
-
-    with agents_client:
-        agents_client.enable_auto_function_calls(functions)
-
-        run = agents_client.create_thread_and_process_run(
-            agent_id=PROVIDER_FINDER_AGENT_ID,
-            thread=AgentThreadCreationOptions(
-                messages=[ThreadMessageOptions(role="user", content=user_query)]
-            ),
-        )
-
-        messages = list(agents_client.messages.list(thread_id=run.thread_id))
-
-        response_text = None
-        for msg in messages:
-            if msg.role == MessageRole.AGENT:
-                for item in msg.content:
-                    if isinstance(item, MessageTextContent):
-                        response_text = item.text.value
-                        break
-                break
+    response_text = run_agent_text(PROVIDER_FINDER_AGENT_ID, user_query, name="provider_finder")
 
     #noted out print so orchestrator does not double output
     # print(f"\nProvider Finder: {response_text}")
-        return response_text or "No response generated."
+    return response_text or "No response generated."
+
+
+def stream_provider_finder_agent(user_query: str):
+    """Like run_provider_finder_agent, but yields the reply text as it streams."""
+    yield from stream_agent_text(PROVIDER_FINDER_AGENT_ID, user_query, name="provider_finder")
 
 
 # ── Entry point for standalone testing ────────────────────────────────────────
@@ -0,0 +1,177 @@
+# Provider index — posting lists built once at load time for search_providers
+# Every provider gets an integer id (its position in the provider list, so result order
+# matches the original list). For city / zip / specialty / network we keep
+#   normalized field value -> set of provider ids
+# and a trigram index over the distinct values, so a substring query ("rapids") finds the
+# matching values without scanning every provider. Accepting-new-patients is precomputed
+# per network. A query is the intersection of its filters' id sets, smallest set first.
+# Providers are also geocoded (own lat/lon, else zip centroid) into a GridIndex, so
+# "k nearest within R miles" queries combine the same filters with distance ranking. There the
+# filters are not intersected up front: the grid walk checks each provider it reaches against
+# every id set (smallest first) and usually stops after a few cells.
+
+import re
+import heapq
+from functools import lru_cache
+from geo import GridIndex, SMALL_FILTER, geocode_provider, load_zip_centroids
+
+FIELDS = ("city", "zip", "specialty", "network")
+
+
+def normalize(value):
+    return re.sub(r"\s+", " ", str(value or "")).strip().lower()
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class ValueIndex:
+    """Postings for one field plus a trigram index over its distinct values."""
+
+    def __init__(self):
+        self.postings = {}   # value -> set of provider ids
+        self.trigrams = {}   # trigram -> set of values
+
+    def add(self, value, provider_id):
+        value = normalize(value)
+        if value not in self.postings:
+            self.postings[value] = set()
+            for gram in _trigrams(value):
+                self.trigrams.setdefault(gram, set()).add(value)
+        self.postings[value].add(provider_id)
+
+    def matching_values(self, query):
+        """Distinct values containing `query` as a substring (the original `in` semantics)."""
+        query = normalize(query)
+        grams = _trigrams(query)
+        if grams:
+            candidate_sets = sorted((self.trigrams.get(g, set()) for g in grams), key=len)
+            candidates = set.intersection(*candidate_sets) if candidate_sets else set()
+        else:
+            candidates = self.postings.keys()  # 1–2 character query: too short for trigrams
+        return [value for value in candidates if query in value]
+
+
+class MatchesAll:
+    """Ids in every one of several id sets, tested one id at a time instead of intersecting the sets."""
+
+    def __init__(self, id_sets):
+        self.id_sets = id_sets  # smallest first, so most ids are rejected by the first test
+
+    def __contains__(self, provider_id):
+        return all(provider_id in ids for ids in self.id_sets)
+
+
+class ProviderIndex:
+    def __init__(self, providers, zip_centroids=None):
+        self.providers = providers
+        self.fields = {field: ValueIndex() for field in FIELDS}
+        self.accepting_by_network = {}  # normalized network -> ids accepting new patients there
+        self.accepting_any = set()
+
+        for provider_id, p in enumerate(providers):
+            self.fields["city"].add(p.get("city"), provider_id)
+            self.fields["zip"].add(p.get("zip"), provider_id)
+            self.fields["specialty"].add(p.get("specialty"), provider_id)
+            for network in p.get("networks", []):
+                self.fields["network"].add(network, provider_id)
+            for network, accepting in (p.get("accepts_new_patients") or {}).items():
+                if accepting:
+                    self.accepting_by_network.setdefault(normalize(network), set()).add(provider_id)
+                    self.accepting_any.add(provider_id)
+
+        centroids = zip_centroids if zip_centroids is not None else load_zip_centroids()
+        points = []
+        for provider_id, p in enumerate(providers):
+            point = geocode_provider(p, centroids)
+            if point:
+                points.append((provider_id, point[0], point[1]))
+        self.grid = GridIndex(points)
+
+        # Freeze once so queries can hand postings out without copying them
+        for index in self.fields.values():
+            index.postings = {value: frozenset(ids) for value, ids in index.postings.items()}
+        self.accepting_by_network = {n: frozenset(ids) for n, ids in self.accepting_by_network.items()}
+        self.accepting_any = frozenset(self.accepting_any)
+
+        # Same query strings repeat constantly (the agent re-asks for "Grand Rapids")
+        self._ids_for = lru_cache(maxsize=1024)(self._ids_for_uncached)
+        self._accepting_for = lru_cache(maxsize=64)(self._accepting_for_uncached)
+
+    def clear_cache(self):
+        self._ids_for.cache_clear()
+        self._accepting_for.cache_clear()
+
+    def _ids_for_uncached(self, field, query):
+        index = self.fields[field]
+        values = index.matching_values(query)
+        if len(values) == 1:
+            return index.postings[values[0]]
+        return frozenset().union(*(index.postings[v] for v in values))
+
+    def _accepting_for_uncached(self, network):
+        if not network:
+            return self.accepting_any
+        values = self.fields["network"].matching_values(network)
+        if len(values) == 1:
+            return self.accepting_by_network.get(values[0], frozenset())
+        return frozenset().union(*(self.accepting_by_network.get(v, frozenset()) for v in values))
+
+    def _filter_sets(self, city="", specialty="", network="", zip_code="", accepting_new=False):
+        """The filters' id sets, smallest first, or None when there are no filters."""
+        id_sets = []
+        for field, query in (("city", city), ("zip", zip_code), ("specialty", specialty), ("network", network)):
+            if query:
+                id_sets.append(self._ids_for(field, normalize(query)))
+        if accepting_new:
+            id_sets.append(self._accepting_for(normalize(network)))
+        if not id_sets:
+            return None
+        id_sets.sort(key=len)
+        return id_sets
+
+    def _filter_ids(self, city="", specialty="", network="", zip_code="", accepting_new=False):
+        """Intersection of the filters' id sets, or None when there are no filters."""
+        id_sets = self._filter_sets(city, specialty, network, zip_code, accepting_new)
+        if id_sets is None:
+            return None
+        result = id_sets[0]
+        for ids in id_sets[1:]:
+            if not result:
+                break
+            result = result & ids
+        return result
+
+    def search(self, city="", specialty="", network="", zip_code="", accepting_new=False, limit=10):
+        """
+        Ids of matching providers in original list order, at most `limit`.
+        Filters are case-insensitive substring matches, like the original list scan.
+        accepting_new restricts to providers accepting new patients in the requested
+        network (or in any network when no network is given).
+        """
+        result = self._filter_ids(city, specialty, network, zip_code, accepting_new)
+        if result is None:
+            return list(range(min(limit, len(self.providers))))
+        return heapq.nsmallest(limit, result)
+
+    def nearest(self, lat, lon, radius_miles=25.0, limit=10, **filters):
+        """[(id, miles)] for the closest matching providers within radius_miles, closest first."""
+        id_sets = self._filter_sets(**filters)
+        if id_sets is None:
+            allowed = None
+        elif not id_sets[0]:
+            return []
+        elif len(id_sets) == 1:
+            allowed = id_sets[0]
+        elif len(id_sets[0]) <= SMALL_FILTER:
+            # A narrow filter is intersected and its few providers measured directly
+            allowed = self._filter_ids(**filters)
+        else:
+            # Broad filters ("PPO", accepting new patients) cover most providers; intersecting
+            # them costs more than checking the providers the grid walk reaches
+            allowed = MatchesAll(id_sets)
+        return self.grid.nearest(lat, lon, k=limit, radius_miles=radius_miles, allowed=allowed)
+
+    def search_providers(self, **filters):
+        return [self.providers[i] for i in self.search(**filters)]
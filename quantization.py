@@ -0,0 +1,237 @@
+# Compact embedding storage for the local index
+# ingest.py writes quantized.npz next to embeddings.npy when EMBEDDING_STORAGE is not float32:
+#   float16 — half-precision copy of every row                          2 bytes / dimension
+#             (scanned by shifting the half-precision bits into float32 position with integer
+#             ops; NumPy's own half conversion runs in software and is several times slower)
+#   int8    — scalar quantization, one symmetric scale per dimension    1 byte / dimension
+#   pq      — product quantization: the vector is split into PQ_SUBSPACES slices and each
+#             slice is stored as the id of its nearest of 256 k-means centroids   1 byte / slice
+# Only the codes are held in memory. A query scans the codes for top * RESCORE_OVERSAMPLING
+# candidates (PQ_RESCORE_OVERSAMPLING for pq, whose scan ranks less precisely), then rescores those rows exactly against the full float32 vectors in
+# embeddings.npy, which stays memory-mapped (only the candidate rows are read from disk).
+# benchmarks/bench_quantization.py reports memory, recall@k against float32 and latency per mode.
+
+import os
+import numpy as np
+
+STORAGE_MODES = ("float32", "float16", "int8", "pq")
+QUANTIZED_FILE = "quantized.npz"
+
+EMBEDDING_STORAGE = os.getenv("EMBEDDING_STORAGE", "float32").lower()
+# Candidates rescored against the full vectors, as a multiple of the requested top
+RESCORE_OVERSAMPLING = int(os.getenv("RESCORE_OVERSAMPLING", "10"))
+# PQ ranks the true top 10 of a 50k corpus only ~0.2 recall on its own; rescoring 50x keeps recall@10 >= 0.95
+PQ_RESCORE_OVERSAMPLING = int(os.getenv("PQ_RESCORE_OVERSAMPLING", "50"))
+PQ_SUBSPACES = int(os.getenv("PQ_SUBSPACES", "96"))
+PQ_CENTROIDS = 256
+PQ_ITERATIONS = 12
+# Rows sampled to train the PQ codebooks (~20 per centroid)
+PQ_TRAIN_ROWS = 5000
+# Rows converted to float32 at a time while scoring; small enough to stay in cache
+SCORE_BLOCK = 128
+# Rows assigned to centroids at a time while encoding
+ENCODE_BLOCK = 8192
+# float16 bits shifted left by 13 read as float32 are the value times 2**-112 (the exponent
+# biases differ by 112); the mask keeps the sign bit and clears what the shift carried in
+HALF_SHIFT_SCALE = np.float32(2.0 ** 112)
+HALF_SIGN_MASK = np.int32(-0x70000001)  # 0x8FFFFFFF
+
+if EMBEDDING_STORAGE not in STORAGE_MODES:
+    raise ValueError(f"EMBEDDING_STORAGE must be one of {', '.join(STORAGE_MODES)}, got {EMBEDDING_STORAGE!r}")
+
+
+def _cast(converted, block):
+    np.copyto(converted, block, casting="unsafe")
+
+
+def _shift_half(converted, block):
+    """float16 rows, viewed as int16, into float32 as value * 2**-112 with integer ops only."""
+    bits = converted.view(np.int32)
+    np.copyto(bits, block)  # sign-extends, so bits 31..16 all hold the sign
+    np.left_shift(bits, 13, out=bits)
+    np.bitwise_and(bits, HALF_SIGN_MASK, out=bits)
+
+
+def _blocked_scores(codes, weights, rows=None, convert=_cast):
+    """codes[rows] @ weights, converting SCORE_BLOCK rows to float32 at a time so BLAS does the product."""
+    count = len(codes) if rows is None else len(rows)
+    scores = np.empty(count, dtype=np.float32)
+    buffer = np.empty((SCORE_BLOCK, codes.shape[1]), dtype=np.float32)
+    for start in range(0, count, SCORE_BLOCK):
+        block = codes[start:start + SCORE_BLOCK] if rows is None else codes[rows[start:start + SCORE_BLOCK]]
+        converted = buffer[:len(block)]
+        convert(converted, block)
+        scores[start:start + len(block)] = converted @ weights
+    return scores
+
+
+class Float16Codes:
+    mode = "float16"
+    oversampling = RESCORE_OVERSAMPLING
+
+    def __init__(self, codes):
+        self.codes = codes
+
+    @classmethod
+    def encode(cls, vectors):
+        return cls(np.asarray(vectors, dtype=np.float16))
+
+    def scores(self, query, rows=None):
+        # The shifted rows are scaled by 2**-112, so the query is scaled up to match
+        return _blocked_scores(self.codes.view(np.int16), query * HALF_SHIFT_SCALE, rows, _shift_half)
+
+    def arrays(self):
+        return {"codes": self.codes}
+
+    @classmethod
+    def from_arrays(cls, data):
+        return cls(data["codes"])
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes
+
+
+class Int8Codes:
+    mode = "int8"
+    oversampling = RESCORE_OVERSAMPLING
+
+    def __init__(self, codes, scale):
+        self.codes = codes
+        self.scale = scale
+
+    @classmethod
+    def encode(cls, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        scale = np.abs(vectors).max(axis=0) / 127 if len(vectors) else np.ones(vectors.shape[1], dtype=np.float32)
+        scale[scale == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scale), -127, 127).astype(np.int8)
+        return cls(codes, scale.astype(np.float32))
+
+    def scores(self, query, rows=None):
+        # (codes * scale) @ q == codes @ (scale * q): the codes are never dequantized
+        return _blocked_scores(self.codes, self.scale * query, rows)
+
+    def arrays(self):
+        return {"codes": self.codes, "scale": self.scale}
+
+    @classmethod
+    def from_arrays(cls, data):
+        return cls(data["codes"], data["scale"])
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.scale.nbytes
+
+
+def _subspaces(dimensions, wanted):
+    """The largest slice count <= wanted that divides the dimensions evenly."""
+    return next(m for m in range(min(wanted, dimensions), 0, -1) if dimensions % m == 0)
+
+
+def _kmeans(data, k, iterations, rng):
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+    for _ in range(iterations):
+        distances = (data ** 2).sum(1)[:, None] - 2 * data @ centroids.T + (centroids ** 2).sum(1)[None, :]
+        assignment = distances.argmin(1)
+        counts = np.bincount(assignment, minlength=k)
+        sums = np.stack([np.bincount(assignment, weights=data[:, j], minlength=k) for j in range(data.shape[1])], 1)
+        filled = counts > 0  # empty clusters keep their previous centroid
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids
+
+
+class ProductQuantizer:
+    mode = "pq"
+    oversampling = PQ_RESCORE_OVERSAMPLING
+
+    def __init__(self, codes, centroids):
+        self.codes = codes          # (rows, subspaces) uint8
+        self.centroids = centroids  # (subspaces, centroids, slice dimensions) float32
+
+    @classmethod
+    def encode(cls, vectors, subspaces=PQ_SUBSPACES, iterations=PQ_ITERATIONS, train_rows=PQ_TRAIN_ROWS, seed=0):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        rows, dimensions = vectors.shape
+        m = _subspaces(dimensions, subspaces)
+        width = dimensions // m
+        k = max(1, min(PQ_CENTROIDS, rows))
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(rows, min(rows, train_rows), replace=False)] if rows else vectors
+        centroids = np.zeros((m, k, width), dtype=np.float32)
+        codes = np.zeros((rows, m), dtype=np.uint8)
+        for s in range(m):
+            part = slice(s * width, (s + 1) * width)
+            if rows:
+                centroids[s] = _kmeans(sample[:, part], k, iterations, rng)
+            norms = (centroids[s] ** 2).sum(1)[None, :]
+            for start in range(0, rows, ENCODE_BLOCK):
+                block = vectors[start:start + ENCODE_BLOCK, part]
+                codes[start:start + ENCODE_BLOCK, s] = (norms - 2 * block @ centroids[s].T).argmin(1)
+        return cls(codes, centroids)
+
+    def scores(self, query, rows=None):
+        m, _, width = self.centroids.shape
+        # Lookup table: dot product of each query slice with each of its centroids
+        table = np.einsum("mkd,md->mk", self.centroids, query.reshape(m, width))
+        codes = self.codes if rows is None else self.codes[rows]
+        scores = np.zeros(len(codes), dtype=np.float32)
+        for s in range(m):
+            scores += table[s][codes[:, s]]
+        return scores
+
+    def arrays(self):
+        return {"codes": self.codes, "centroids": self.centroids}
+
+    @classmethod
+    def from_arrays(cls, data):
+        return cls(data["codes"], data["centroids"])
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.centroids.nbytes
+
+
+CODECS = {codec.mode: codec for codec in (Float16Codes, Int8Codes, ProductQuantizer)}
+
+
+def encode(vectors, mode=EMBEDDING_STORAGE):
+    """Compact codes for normalized row vectors (None for float32, which needs none)."""
+    if mode == "float32":
+        return None
+    return CODECS[mode].encode(vectors)
+
+
+def save_codes(codes, path):
+    np.savez(path, mode=np.array(codes.mode), **codes.arrays())
+
+
+def load_codes(path):
+    data = np.load(path)
+    return CODECS[str(data["mode"])].from_arrays(data)
+
+
+class QuantizedIndex:
+    """Approximate scan over compact codes, with the best candidates rescored against the full vectors."""
+
+    def __init__(self, codes, vectors, oversampling=None):
+        self.codes = codes
+        self.vectors = vectors
+        self.oversampling = oversampling or codes.oversampling
+
+    def search(self, query_vector, top=3, rows=None):
+        """Return [(row, score)] for the top matches, optionally restricted to `rows`."""
+        scores = self.codes.scores(query_vector, rows)
+        if len(scores) == 0:
+            return []
+        count = min(len(scores), max(top, top * self.oversampling))
+        best = np.argpartition(-scores, count - 1)[:count]
+        candidates = best if rows is None else np.asarray(rows)[best]
+        if self.vectors is None:
+            ranked = [(int(row), float(score)) for row, score in zip(candidates, scores[best])]
+        else:
+            # Sorted row order keeps the reads of the memory-mapped matrix sequential
+            candidates = np.sort(candidates)
+            exact = self.vectors[candidates] @ query_vector
+            ranked = [(int(row), float(score)) for row, score in zip(candidates, exact)]
+        return sorted(ranked, key=lambda item: -item[1])[:top]
@@ -0,0 +1,217 @@
+# Per-request task graph for the orchestrator
+#   router ─► plan ─┬─► coverage | coverage:baseplan.pdf + coverage:premiumplan.pdf (comparison)
+#                   ├─► provider
+#                   ├─► cost:coverage ─┬─► cost:ppo       (coverage table lookup; agent only on a miss)
+#                   │                  └─► cost:premier (only when Premier % differs)
+#                   │                  or ─► cost     (deterministic mode: both tiers computed locally)
+#                   └─► answer (waits for everything above, joins responses in a fixed order)
+# Every branch after the router runs concurrently, so a multi-intent request takes as long as
+# its longest branch. Agent functions are passed in, so the graph can be exercised offline.
+# With an emit callback, each user-visible section (SECTION_TITLES) is reported as
+# emit(section, text delta) while it is produced, from the agents' streaming runs when the
+# agents dict has "<name>_stream" variants, otherwise as one delta when the agent returns.
+
+import re
+from task_graph import TaskGraph, fallback
+from tracing import record
+
+COMPARISON_PLANS = ("baseplan.pdf", "premiumplan.pdf")
+SECTION_TITLES = {
+    "coverage": "Coverage",
+    "coverage:baseplan.pdf": "Base Plan",
+    "coverage:premiumplan.pdf": "Premium Plan",
+    "provider": "Providers",
+    "cost:ppo": "With a Delta Dental PPO dentist",
+    "cost:premier": "With a Delta Dental Premier dentist",
+    "cost": "Cost estimate",
+    "answer": "Answer",
+}
+FALLBACK_RESPONSE = "I can help with dental coverage questions, finding providers, or estimating costs. What would you like to know?"
+
+
+def extract_coverage_percent(coverage_response: str) -> dict:
+    """Extract PPO and Premier coverage percentages from coverage agent response."""
+    result = {"ppo": "0", "premier": "0"}
+
+    text = coverage_response.lower()
+
+    # Try to find PPO-specific percentage
+    ppo_match = re.search(r'ppo[^0-9]*(\d{1,3})\s*%', text)
+    if ppo_match:
+        result["ppo"] = ppo_match.group(1)
+
+    # Try to find Premier-specific percentage
+    premier_match = re.search(r'premier[^0-9]*(\d{1,3})\s*%', text)
+    if premier_match:
+        result["premier"] = premier_match.group(1)
+
+    # If neither found, grab first percentage as fallback for both
+    if result["ppo"] == "0" and result["premier"] == "0":
+        fallback = re.findall(r'(\d{1,3})\s*%', coverage_response)
+        if fallback:
+            result["ppo"] = fallback[0]
+            result["premier"] = fallback[0]
+
+    # If only one found, use it for both
+    if result["ppo"] == "0" and result["premier"] != "0":
+        result["ppo"] = result["premier"]
+    elif result["premier"] == "0" and result["ppo"] != "0":
+        result["premier"] = result["ppo"]
+
+    return result
+
+# query cleaner
+def make_coverage_query(user_query: str) -> str:
+    """Extract procedure keyword and build clean coverage query using category name."""
+    procedure_to_category = {
+        "cleaning": "Diagnostic and Preventive Services",
+        "checkup": "Diagnostic and Preventive Services",
+        "exam": "Diagnostic and Preventive Services",
+        "fluoride": "Diagnostic and Preventive Services",
+        "filling": "Minor Restorative Services",
+        "crown": "Major Restorative Services",
+        "root canal": "Endodontic Services",
+        "wisdom tooth": "Oral Surgery Services",
+        "extraction": "Oral Surgery Services",
+        "braces": "Orthodontic Services",
+        "orthodontic": "Orthodontic Services",
+        "denture": "Prosthodontic Services",
+        "bridge": "Prosthodontic Services",
+        "implant": "Prosthodontic Services",
+        "x-ray": "Radiographs",
+        "gum disease": "Periodontic Services",
+        "sealant": "Sealants",
+        "veneer": "Veneers",
+    }
+    query_lower = user_query.lower()
+    for keyword, category in procedure_to_category.items():
+        if keyword in query_lower:
+            return f"What is the coverage percentage for {category}? Include deductible and annual maximum."
+    return user_query
+
+def is_comparison_query(query: str) -> bool:
+    keywords = ["difference", "compare", "vs", "versus", "between"]
+    q = query.lower()
+    return any(k in q for k in keywords)
+
+
+def cost_coverage_query(user_query: str) -> str:
+    return f"What is the coverage percentage for {user_query}? Provide the percentage for both Delta Dental PPO dentists and Delta Dental Premier dentists separately."
+
+
+def build_request_graph(user_query: str, plan_filter: str, agents: dict, emit=None) -> TaskGraph:
+    """
+    Task graph for one request. The "answer" node's result is the combined response and the
+    "plan" node's result is the parsed intent list.
+    :param agents: {"classify_intent", "coverage", "provider", "cost"} -> the agent functions
+        (classify_intent(query), coverage(query, plan_filter), provider(query), cost(query, plan_filter)),
+        plus optionally "coverage_table": (query, plan_filter) -> coverage dict or None, and
+        "cost_answer": (query, coverage) -> answer, which replaces the per-tier cost agent calls.
+        "coverage_stream", "provider_stream" and "cost_stream" (same arguments, yield text chunks)
+        are used for visible sections when emit is given.
+    :param emit: optional (section, text delta) callback, called from worker threads.
+    """
+    graph = TaskGraph()
+
+    def section(name, agent, *args):
+        """Call an agent for a user-visible section, streaming it to emit when possible."""
+        stream = agents.get(f"{agent}_stream")
+        if emit and stream:
+            parts = []
+            for delta in stream(*args):
+                parts.append(delta)
+                emit(name, delta)
+            return "".join(parts) or "No response generated."
+        result = agents[agent](*args)
+        if emit and result:
+            emit(name, result)
+        return result
+    graph.add("router", lambda results: agents["classify_intent"](user_query))
+
+    async def plan(results):
+        intents = [i.strip() for i in results["router"].split(",")]
+        print(f"Intent(s): {intents}")
+        has_coverage = any("coverage" in i for i in intents)
+        has_provider = any("provider" in i for i in intents)
+        has_cost = any("cost" in i for i in intents)
+        branches = []
+
+        if has_coverage:
+            if is_comparison_query(user_query):
+                for plan_file in COMPARISON_PLANS:
+                    graph.add(f"coverage:{plan_file}", lambda r, p=plan_file: section(f"coverage:{p}", "coverage", user_query, p), ["plan"])
+                    branches.append(f"coverage:{plan_file}")
+            else:
+                graph.add("coverage", lambda r: section("coverage", "coverage", make_coverage_query(user_query), plan_filter), ["plan"])
+                branches.append("coverage")
+
+        if has_provider:
+            graph.add("provider", lambda r: section("provider", "provider", user_query), ["plan"])
+            branches.append("provider")
+
+        if has_cost:
+            def cost_coverage(r):
+                lookup = agents.get("coverage_table")
+                coverage = lookup(user_query, plan_filter) if lookup else None
+                if coverage:
+                    print(f" → Coverage table: {coverage['category']} — PPO {coverage['ppo']}%, Premier {coverage['premier']}%")
+                    record(coverage_table="hit", category=coverage["category"])
+                    return coverage
+                record(coverage_table="miss" if lookup else None)
+                if lookup:
+                    fallback("coverage table miss")
+                print("  → Checking coverage first...")
+                coverage_response = agents["coverage"](cost_coverage_query(user_query), plan_filter)
+                coverage = extract_coverage_percent(coverage_response or "")
+                print(f" → Extracted coverage: PPO {coverage['ppo']}%, Premier {coverage['premier']}%")
+                return coverage
+
+            def cost_ppo(r):
+                coverage = r["cost:coverage"]
+                ppo_query = f"Calculate the out-of-pocket cost for a procedure with {coverage['ppo']}% coverage. {user_query}"
+                return section("cost:ppo", "cost", ppo_query, plan_filter)
+
+            def cost_premier(r):
+                coverage = r["cost:coverage"]
+                if coverage["ppo"] == coverage["premier"]:
+                    return None
+                premier_query = f"{user_query}\nCoverage percentage for Delta Dental Premier dentists is: {coverage['premier']}%. Calculate the out-of-pocket cost for a procedure with this coverage."
+                return section("cost:premier", "cost", premier_query, plan_filter)
+
+            graph.add("cost:coverage", cost_coverage, ["plan"])
+            if "cost_answer" in agents:
+                graph.add("cost", lambda r: section("cost", "cost_answer", user_query, r["cost:coverage"]), ["cost:coverage"])
+                branches.append("cost")
+            else:
+                graph.add("cost:ppo", cost_ppo, ["cost:coverage"])
+                graph.add("cost:premier", cost_premier, ["cost:coverage"])
+                branches += ["cost:ppo", "cost:premier"]
+
+        graph.add("answer", answer, branches)
+        return intents
+
+    async def answer(results):
+        responses = []
+        if "coverage" in results:
+            responses.append(results["coverage"])
+        elif all(f"coverage:{p}" in results for p in COMPARISON_PLANS):
+            base_resp, premium_resp = (results[f"coverage:{p}"] for p in COMPARISON_PLANS)
+            responses.append(f"**Base Plan:**\n{base_resp}\n\n**Premium Plan:**\n{premium_resp}")
+        if "provider" in results:
+            responses.append(results["provider"])
+        if "cost" in results:
+            responses.append(results["cost"])
+        elif "cost:ppo" in results:
+            coverage, ppo_response, premier_response = results["cost:coverage"], results["cost:ppo"], results["cost:premier"]
+            if premier_response is not None:
+                responses.append(f"**With a Delta Dental PPO dentist:** {ppo_response}\n\n**With a Delta Dental Premier dentist:** {premier_response}")
+            else:
+                responses.append(f"**Coverage is the same for PPO and Premier dentists at {coverage['ppo']}%**, so the out-of-pocket cost is: {ppo_response}")
+        if not responses:
+            responses.append(FALLBACK_RESPONSE)
+            if emit:
+                emit("answer", FALLBACK_RESPONSE)
+        return "\n\n---\n\n".join(responses)
+
+    graph.add("plan", plan, ["router"])
+    return graph
@@ -0,0 +1,71 @@
+# Process-wide registry of lazily loaded resources
+# Blob downloads (provider and procedure data) and SDK clients are created on first use
+# instead of at import time. Each is created once per process under its own lock, so
+# concurrent Streamlit sessions share one copy. Streamlit reruns re-execute the page
+# script but not these modules, so a resource survives reruns and code-free reloads the
+# way st.cache_resource would, and the CLI gets the same behaviour without Streamlit.
+# warm_up() loads resources on a background thread once the first page has rendered.
+
+import time
+import threading
+
+_registry = {}  # name -> Resource
+_registry_lock = threading.Lock()
+
+
+class Resource:
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self.load_seconds = None
+        self._value = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def get(self):
+        """The resource, loading it on first call; concurrent first callers wait for one load."""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    start = time.perf_counter()
+                    self._value = self.loader()
+                    self.load_seconds = time.perf_counter() - start
+                    self._loaded = True
+        return self._value
+
+    def reset(self):
+        """Drop the loaded value; the next get() loads it again."""
+        with self._lock:
+            self._value, self._loaded, self.load_seconds = None, False, None
+
+
+def resource(name, loader):
+    """Register a lazily loaded resource (re-registering a name returns the existing one)."""
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = Resource(name, loader)
+        return _registry[name]
+
+
+def load_times():
+    """{name: seconds the load took, or None if not loaded yet}."""
+    with _registry_lock:
+        return {name: r.load_seconds for name, r in _registry.items()}
+
+
+def warm_up(*names):
+    """Load the named resources (default: all registered) on a daemon thread; returns the thread."""
+    def load():
+        for name in names or list(_registry):
+            try:
+                _registry[name].get()
+            except Exception as e:
+                print(f"  → Warm-up of {name} failed: {e}")
+
+    thread = threading.Thread(target=load, name="resource-warm-up", daemon=True)
+    thread.start()
+    return thread
@@ -1,12 +1,14 @@
 # Router Agent — classifies user intent
 # Uses Foundry agent with instructions to return: coverage, provider_search, cost_estimate, general
 # Supports multi-intent: returns comma-separated values (e.g. "coverage,provider_search")
+# The local classifier (intent_classifier.py) answers first; the agent only runs when its
+# confidence is below INTENT_CONFIDENCE_THRESHOLD, and its label is logged for retraining.
 
 import os
 from dotenv import load_dotenv
-from azure.ai.agents import AgentsClient
-from azure.ai.agents.models import AgentThreadCreationOptions, ThreadMessageOptions, MessageTextContent, MessageRole
-from azure.identity import DefaultAzureCredential
+from agent_clients import run_agent_text
+from tracing import span
+from intent_classifier import classify_local, log_router_label, INTENT_CONFIDENCE_THRESHOLD
 
 load_dotenv()
 
@@ -16,31 +18,28 @@ ROUTER_AGENT_ID = os.getenv("ROUTER_AGENT_ID")
 
 def classify_intent(user_query: str) -> str:
     """
-    Classify user intent using the Router agent.
+    Classify user intent locally, falling back to the Router agent when unsure.
     Returns one or more of: coverage, provider_search, cost_estimate, general
     Multiple intents returned as comma-separated string.
     """
-    agents_client = AgentsClient(
-        endpoint=AZURE_AI_PROJECT_ENDPOINT,
-        credential=DefaultAzureCredential(),
-    )
-
-    with agents_client:
-        run = agents_client.create_thread_and_process_run(
-            agent_id=ROUTER_AGENT_ID,
-            thread=AgentThreadCreationOptions(
-                messages=[ThreadMessageOptions(role="user", content=user_query)]
-            ),
-        )
-
-        messages = list(agents_client.messages.list(thread_id=run.thread_id))
-        for msg in messages:
-            if msg.role == MessageRole.AGENT:
-                for item in msg.content:
-                    if isinstance(item, MessageTextContent):
-                        return item.text.value.strip().lower()
-
-    return "general"
+    with span("router") as router_span:
+        intent, confidence = classify_local(user_query)
+        router_span.set(local_confidence=round(confidence, 4))
+        if confidence >= INTENT_CONFIDENCE_THRESHOLD:
+            print(f"  → Intent from local classifier (confidence {confidence:.2f})")
+            router_span.set(source="local", intent=intent)
+            return intent
+
+        intent = classify_intent_with_agent(user_query)
+        router_span.set(source="agent", intent=intent)
+        log_router_label(user_query, intent)
+        return intent
+
+
+def classify_intent_with_agent(user_query: str) -> str:
+    """Classify user intent using the Router agent."""
+    response_text = run_agent_text(ROUTER_AGENT_ID, user_query, name="router")
+    return response_text.strip().lower() if response_text else "general"
 
 
 # ── Entry point for standalone testing ────────────────────────────────────────
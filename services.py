@@ -0,0 +1,97 @@
+# Service selection — real Azure clients, or the local stand-ins in fake_services/
+# FAKE_SERVICES picks which services are replaced, so the whole pipeline (ingest, the agents,
+# the orchestrator, the Streamlit app) can run offline and reproducibly under benchmarks:
+#   FAKE_SERVICES=1 (or "all")        every service below
+#   FAKE_SERVICES=openai,search       only the listed ones
+#   agents — Foundry AgentsClient      openai — Azure OpenAI (embeddings, chat)
+#   blob   — Blob Storage              search — Azure AI Search
+# Faked services get placeholder endpoints, keys and agent IDs when .env has none, so no
+# Azure settings are needed; settings that are present are left alone, which lets a partial
+# selection keep talking to the real services configured in .env.
+
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SERVICES = ("agents", "openai", "blob", "search")
+_selected = os.getenv("FAKE_SERVICES", "").strip().lower()
+if _selected in ("1", "true", "yes", "all"):
+    FAKE_SERVICES = set(SERVICES)
+else:
+    FAKE_SERVICES = {s.strip() for s in _selected.split(",") if s.strip() and s.strip() not in ("0", "false", "no")}
+    unknown = FAKE_SERVICES - set(SERVICES)
+    if unknown:
+        raise ValueError(f"FAKE_SERVICES: unknown service(s) {sorted(unknown)}; choose from {', '.join(SERVICES)}")
+
+# Settings the stand-ins need, filled in only when missing
+PLACEHOLDER_SETTINGS = {
+    "agents": {
+        "AZURE_AI_PROJECT_ENDPOINT": "http://fake-foundry.local",
+        "ROUTER_AGENT_ID": "fake-router-agent",
+        "COVERAGE_AGENT_ID": "fake-coverage-agent",
+        "PROVIDER_FINDER_AGENT_ID": "fake-provider-finder-agent",
+        "COST_ESTIMATOR_AGENT_ID": "fake-cost-estimator-agent",
+    },
+    "openai": {
+        "AZURE_OPENAI_ENDPOINT": "http://fake-openai.local",
+        "OPENAI_API_KEY": "fake",
+        "AZURE_OPENAI_DEPLOYMENT": "fake-chat",
+        "AZURE_EMBEDDING_DEPLOYMENT": "fake-embedding",
+    },
+    "blob": {
+        "AZURE_STORAGE_CONNECTION_STRING": "UseDevelopmentStorage=true",
+    },
+    "search": {
+        "AZURE_SEARCH_ENDPOINT": "http://fake-search.local",
+        "AZURE_SEARCH_API_KEY": "fake",
+    },
+}
+for _service in FAKE_SERVICES:
+    for _name, _value in PLACEHOLDER_SETTINGS[_service].items():
+        os.environ.setdefault(_name, _value)
+
+
+def fake(service: str) -> bool:
+    """True when FAKE_SERVICES replaces this service with its local stand-in."""
+    return service in FAKE_SERVICES
+
+
+def openai_client(**options):
+    """AzureOpenAI client (api_key/endpoint/version from the environment) or the fake."""
+    if fake("openai"):
+        from fake_services.openai_service import FakeOpenAI
+        return FakeOpenAI()
+    from openai import AzureOpenAI
+    return AzureOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+        api_version="2024-10-21",
+        **options
+    )
+
+
+def blob_service_client(connection_string: str):
+    if fake("blob"):
+        from fake_services.storage import FakeBlobServiceClient
+        return FakeBlobServiceClient.from_connection_string(connection_string)
+    from azure.storage.blob import BlobServiceClient
+    return BlobServiceClient.from_connection_string(connection_string)
+
+
+def search_client(endpoint: str, index_name: str, api_key: str):
+    if fake("search"):
+        from fake_services.storage import FakeSearchClient
+        return FakeSearchClient(endpoint, index_name)
+    from azure.search.documents import SearchClient
+    from azure.core.credentials import AzureKeyCredential
+    return SearchClient(endpoint=endpoint, index_name=index_name, credential=AzureKeyCredential(api_key))
+
+
+def search_index_client(endpoint: str, api_key: str):
+    if fake("search"):
+        from fake_services.storage import FakeSearchIndexClient
+        return FakeSearchIndexClient(endpoint)
+    from azure.search.documents.indexes import SearchIndexClient
+    from azure.core.credentials import AzureKeyCredential
+    return SearchIndexClient(endpoint=endpoint, credential=AzureKeyCredential(api_key))
@@ -1,5 +1,6 @@
 import streamlit as st
-from orchestrator import run_orchestrator
+from orchestrator import stream_orchestrator, warm_up
+from request_graph import SECTION_TITLES
 
 #page config
 st.set_page_config(
@@ -116,6 +117,14 @@ if not st.session_state.messages:
     </div>
     """, unsafe_allow_html=True)
 
+# Data and SDK clients load lazily; start loading them once per process now that the page has rendered
+@st.cache_resource
+def start_warm_up():
+    return warm_up()
+
+
+start_warm_up()
+
 # Chat input
 user_input = st.chat_input("Ask about your dental coverage, find providers, or estimate costs...")
 
@@ -124,9 +133,24 @@ if user_input:
     st.session_state.messages.append({"role": "user", "content": user_input})
     st.markdown(f'<div class="chat-user">🧑 {user_input}</div>', unsafe_allow_html=True)
 
-    # Get response
-    with st.spinner("Thinking..."):
-        response = run_orchestrator(user_input, plan_filter)
+    # Stream the response: one placeholder per section, filled in as its tokens arrive
+    status = st.empty()
+    status.markdown("*Thinking...*")
+    placeholders, sections = {}, {}
+    response = ""
+    for section, delta in stream_orchestrator(user_input, plan_filter):
+        if section == "done":
+            response = delta
+            break
+        status.empty()
+        if section not in placeholders:
+            placeholders[section] = st.empty()
+            sections[section] = ""
+        sections[section] += delta
+        title = SECTION_TITLES.get(section, "")
+        heading = f"<b>{title}</b><br>" if title and section != "answer" else ""
+        placeholders[section].markdown(f'<div class="chat-assistant">🤖 {heading}{sections[section]}</div>',
+                                       unsafe_allow_html=True)
 
     # Add assistant message
     st.session_state.messages.append({"role": "assistant", "content": response})
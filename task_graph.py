@@ -0,0 +1,102 @@
+# Async dependency-graph executor
+# A TaskGraph holds named nodes, each a function plus the names of the nodes it depends on.
+# run() starts every node whose dependencies are done, concurrently, and keeps going until
+# all nodes finish. Nodes may add more nodes while the graph runs (the router node adds
+# the agent nodes its intents call for). Blocking functions (the Azure agent SDK is sync)
+# run on worker threads; coroutine functions are awaited directly.
+# Each node runs in a "task.<name>" tracing span; worker threads inherit it as their parent.
+# Code running under a node (agent tools included) reports a degraded result — a failed tool
+# call, an empty agent reply — with fallback(reason); the reasons collect in graph.fallbacks.
+
+import time
+import asyncio
+import inspect
+from contextvars import ContextVar
+from tracing import span, record
+
+# Graph whose node is running in this context; worker threads and agent tools inherit it
+_graph = ContextVar("task_graph", default=None)
+
+
+def fallback(reason):
+    """Record that the running graph's result is degraded (no-op outside a graph)."""
+    graph = _graph.get()
+    if graph is not None:
+        graph.fallbacks.append(reason)
+        record(fallback=reason)
+
+
+class Node:
+    def __init__(self, name, fn, deps=()):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.started = None
+        self.finished = None
+
+
+class TaskGraph:
+    def __init__(self):
+        self.nodes = {}
+        self.results = {}
+        self.fallbacks = []  # reasons reported with fallback() while the graph ran
+        self._start = None
+
+    def add(self, name, fn, deps=()):
+        """
+        Add a node. fn receives the graph's results dict (name -> value of finished nodes)
+        and may be a plain function (run on a thread) or a coroutine function.
+        """
+        if name in self.nodes:
+            raise ValueError(f"Duplicate task {name!r}")
+        self.nodes[name] = Node(name, fn, deps)
+
+    async def _run_node(self, node):
+        node.started = time.perf_counter() - self._start
+        try:
+            with span(f"task.{node.name}"):
+                if inspect.iscoroutinefunction(node.fn):
+                    return await node.fn(self.results)
+                return await asyncio.to_thread(node.fn, self.results)
+        finally:
+            node.finished = time.perf_counter() - self._start
+
+    async def run(self):
+        """Run every node; returns the results dict. The first failing node's error is raised."""
+        self._start = time.perf_counter()
+        running = {}  # task -> node
+        token = _graph.set(self)  # copied into every node task created below
+        try:
+            while True:
+                for node in self.nodes.values():
+                    if node.started is None and node not in running.values() \
+                            and all(dep in self.results for dep in node.deps):
+                        missing = [dep for dep in node.deps if dep not in self.nodes]
+                        if missing:
+                            raise KeyError(f"Task {node.name!r} depends on unknown {missing}")
+                        running[asyncio.ensure_future(self._run_node(node))] = node
+                if not running:
+                    break
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    node = running.pop(task)
+                    self.results[node.name] = task.result()
+        finally:
+            _graph.reset(token)
+            for task in running:
+                task.cancel()
+
+        stuck = [n.name for n in self.nodes.values() if n.name not in self.results]
+        if stuck:
+            raise RuntimeError(f"Tasks never became ready (dependency cycle?): {stuck}")
+        return self.results
+
+    def timings(self):
+        """[(name, started, finished)] in start order, seconds since run() began."""
+        nodes = [n for n in self.nodes.values() if n.started is not None]
+        return [(n.name, n.started, n.finished) for n in sorted(nodes, key=lambda n: n.started)]
+
+    def report(self):
+        """Print a timeline of the nodes."""
+        for name, started, finished in self.timings():
+            print(f"  {name:<28} {started:6.2f}s → {finished:6.2f}s  ({finished - started:.2f}s)")
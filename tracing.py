@@ -0,0 +1,325 @@
+# Per-request tracing
+# Every request gets a root span (its ID is the request ID); the stages under it — router,
+# embedding, search, agent runs, tool calls, thread-message listing, chat completions —
+# open child spans with span(name, **attributes). The current span travels in a ContextVar,
+# so spans opened on the task graph's worker threads (asyncio.to_thread copies the context)
+# and inside function tools (run on the thread that drives the agent run) nest correctly.
+# Spans carry model, prompt/completion tokens, tool-call round trips and cache hits as
+# attributes. A request's finished spans are held in memory until its root span ends, then
+# appended to TRACE_FILE as JSON lines in one write; with TRACE_OTLP_ENDPOINT set, the same
+# batch is also POSTed there as OTLP/HTTP JSON, so any OpenTelemetry collector (Jaeger,
+# Azure Monitor, ...) can ingest it. Spans of a request whose root never ends (or that
+# finish after it) are written once they are PENDING_SECONDS old or MAX_PENDING requests back.
+#
+#   python tracing.py report [--file traces.jsonl] [--last 100]   slowest stages, tokens, cache hits
+#   python tracing.py otlp --out traces.otlp.json                 convert the JSONL to OTLP JSON
+
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import threading
+from contextvars import ContextVar
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Finished spans, one JSON object per line ("" disables)
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+# OTLP/HTTP traces endpoint, e.g. http://localhost:4318/v1/traces ("" disables)
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "")
+SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "dental-assistant")
+# Buffered spans of a request still open after this long, or this many requests back, are written anyway
+PENDING_SECONDS = 600
+MAX_PENDING = 1000
+
+# Attribute names translated to OpenTelemetry GenAI semantic conventions on OTLP export
+OTEL_ATTRIBUTES = {
+    "model": "gen_ai.request.model",
+    "prompt_tokens": "gen_ai.usage.input_tokens",
+    "completion_tokens": "gen_ai.usage.output_tokens",
+    "agent": "gen_ai.agent.name",
+    "agent_id": "gen_ai.agent.id",
+}
+
+_current = ContextVar("span", default=None)
+_write_lock = threading.Lock()
+_pending = {}  # trace id -> (time its first span finished, finished spans), until the root span ends
+_pending_lock = threading.Lock()
+
+
+class Span:
+    def __init__(self, name, trace_id, parent_id, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.start = time.time()
+        self.duration = None
+        self.error = None
+        self._start_counter = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def set(self, **attributes):
+        with self._lock:
+            self.attributes.update({k: v for k, v in attributes.items() if v is not None})
+
+    def add(self, key, amount=1):
+        with self._lock:
+            self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+            "name": self.name, "start": self.start, "duration": self.duration,
+            "attributes": dict(self.attributes), "error": self.error,
+        }
+
+
+def current():
+    """The innermost open span in this context, or None outside a traced request."""
+    return _current.get()
+
+
+def record(**attributes):
+    """Set attributes on the current span (no-op outside a traced request)."""
+    span = _current.get()
+    if span is not None:
+        span.set(**attributes)
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Time a stage as a child of the current span. Outside a request the span is still timed
+    but not exported, so library code can open spans unconditionally.
+    """
+    parent = _current.get()
+    item = Span(name, parent.trace_id if parent else None, parent.span_id if parent else None, attributes)
+    token = _current.set(item)
+    try:
+        yield item
+    except BaseException as e:
+        item.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        item.duration = time.perf_counter() - item._start_counter
+        if item.trace_id:
+            _finish(item)
+
+
+@contextmanager
+def request(name="request", **attributes):
+    """Root span of one request; its span ID doubles as the request ID."""
+    item = Span(name, uuid.uuid4().hex, None, attributes)
+    token = _current.set(item)
+    try:
+        yield item
+    except BaseException as e:
+        item.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        item.duration = time.perf_counter() - item._start_counter
+        _finish(item, root=True)
+
+
+def _finish(item, root=False):
+    if not (TRACE_FILE or TRACE_OTLP_ENDPOINT):
+        return
+    record_line = item.to_dict()
+    expired = []
+    with _pending_lock:
+        entry = _pending.get(item.trace_id)
+        if entry is None:
+            expired = _expire_pending()
+            entry = _pending[item.trace_id] = (time.monotonic(), [])
+        entry[1].append(record_line)
+        if root:
+            del _pending[item.trace_id]
+    for spans in expired:
+        _export(spans)
+    if root:
+        _export(entry[1])
+
+
+def _expire_pending():
+    """Take the oldest buffered requests out of _pending once they are too old or too many (caller holds the lock)."""
+    expired = []
+    deadline = time.monotonic() - PENDING_SECONDS
+    while _pending:
+        trace_id = next(iter(_pending))  # insertion order: oldest first
+        if _pending[trace_id][0] > deadline and len(_pending) <= MAX_PENDING:
+            break
+        expired.append(_pending.pop(trace_id)[1])
+    return expired
+
+
+def _export(spans):
+    """Append a request's spans to TRACE_FILE in one write and hand them to the OTLP exporter."""
+    if TRACE_FILE:
+        lines = "".join(json.dumps(record_line, default=str) + "\n" for record_line in spans)
+        with _write_lock, open(TRACE_FILE, "a", encoding="utf-8") as f:
+            f.write(lines)
+    if TRACE_OTLP_ENDPOINT:
+        threading.Thread(target=_post_otlp, args=(spans,), name="otlp-export", daemon=True).start()
+
+
+# ── OpenTelemetry (OTLP/JSON) ─────────────────────────────────────────────────
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(spans):
+    """OTLP ExportTraceServiceRequest (JSON encoding) for a list of span dicts."""
+    otlp_spans = []
+    for s in spans:
+        start = int(s["start"] * 1e9)
+        otlp_span = {
+            "traceId": s["trace_id"],
+            "spanId": s["span_id"],
+            "name": s["name"],
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(start),
+            "endTimeUnixNano": str(start + int((s["duration"] or 0) * 1e9)),
+            "attributes": [{"key": OTEL_ATTRIBUTES.get(k, k), "value": _otlp_value(v)} for k, v in s["attributes"].items()],
+            "status": {"code": 2, "message": s["error"]} if s["error"] else {"code": 1},
+        }
+        if s["parent_id"]:
+            otlp_span["parentSpanId"] = s["parent_id"]
+        otlp_spans.append(otlp_span)
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+        "scopeSpans": [{"scope": {"name": "tracing"}, "spans": otlp_spans}],
+    }]}
+
+
+def _post_otlp(spans):
+    import urllib.request
+    body = json.dumps(to_otlp(spans)).encode("utf-8")
+    http_request = urllib.request.Request(TRACE_OTLP_ENDPOINT, data=body, headers={"Content-Type": "application/json"})
+    try:
+        urllib.request.urlopen(http_request, timeout=5).close()
+    except Exception as e:
+        print(f"  → Trace export to {TRACE_OTLP_ENDPOINT} failed: {e}")
+
+
+# ── Report ────────────────────────────────────────────────────────────────────
+def load_spans(path=TRACE_FILE, last=None):
+    """Spans from a trace file, limited to the last `last` requests."""
+    with open(path, encoding="utf-8") as f:
+        spans = [json.loads(line) for line in f if line.strip()]
+    if last:
+        roots = [s["trace_id"] for s in spans if s["parent_id"] is None][-last:]
+        keep = set(roots)
+        spans = [s for s in spans if s["trace_id"] in keep]
+    return spans
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def report(spans, top=15):
+    """Print the slowest stages, token usage per model, tool round trips and cache hit rates."""
+    roots = [s for s in spans if s["parent_id"] is None]
+    print(f"{len(roots)} requests, {len(spans)} spans\n")
+
+    stages = {}
+    for s in spans:
+        if s["parent_id"] is not None:
+            stages.setdefault(s["name"], []).append(s["duration"])
+    print(f"{'stage':<32} {'count':>6} {'p50':>8} {'p95':>8} {'max':>8} {'total':>9}")
+    ranked = sorted(stages.items(), key=lambda item: -_percentile(item[1], 0.95))[:top]
+    for name, durations in ranked:
+        print(f"{name:<32} {len(durations):>6} {_percentile(durations, 0.5):>7.2f}s {_percentile(durations, 0.95):>7.2f}s "
+              f"{max(durations):>7.2f}s {sum(durations):>8.2f}s")
+    if roots:
+        totals = [s["duration"] for s in roots]
+        print(f"{'(request)':<32} {len(totals):>6} {_percentile(totals, 0.5):>7.2f}s {_percentile(totals, 0.95):>7.2f}s "
+              f"{max(totals):>7.2f}s {sum(totals):>8.2f}s")
+
+    models = {}
+    for s in spans:
+        a = s["attributes"]
+        if "prompt_tokens" in a or "completion_tokens" in a:
+            m = models.setdefault(a.get("model", "?"), [0, 0, 0])
+            m[0] += 1
+            m[1] += a.get("prompt_tokens", 0)
+            m[2] += a.get("completion_tokens", 0)
+    if models:
+        print(f"\n{'model':<32} {'calls':>6} {'prompt':>10} {'completion':>11}")
+        for model, (calls, prompt, completion) in sorted(models.items()):
+            print(f"{model:<32} {calls:>6} {prompt:>10} {completion:>11}")
+
+    runs = {}
+    for s in spans:
+        if s["name"].startswith("agent.run"):
+            runs.setdefault(s["attributes"].get("agent", "?"), []).append(s["attributes"].get("tool_calls", 0))
+    if runs:
+        print(f"\n{'agent':<32} {'runs':>6} {'tool round trips/run':>21}")
+        for agent, calls in sorted(runs.items()):
+            print(f"{agent:<32} {len(calls):>6} {sum(calls) / len(calls):>21.2f}")
+
+    caches = {}
+    for s in spans:
+        for key, value in s["attributes"].items():
+            if key.endswith("_cache") or key == "coverage_table":
+                counts = caches.setdefault(key, {})
+                counts[value] = counts.get(value, 0) + 1
+    if caches:
+        print(f"\n{'cache':<32} {'lookups':>8} {'hit rate':>9}  outcomes")
+        for key, counts in sorted(caches.items()):
+            lookups = sum(counts.values())
+            hits = lookups - counts.get("miss", 0)
+            outcomes = ", ".join(f"{k} {v}" for k, v in sorted(counts.items()))
+            print(f"{key:<32} {lookups:>8} {hits / lookups:>8.0%}  {outcomes}")
+
+    if roots:
+        print("\nslowest requests:")
+        children = {}
+        for s in spans:
+            if s["parent_id"] is not None:
+                children.setdefault(s["trace_id"], []).append(s)
+        for root in sorted(roots, key=lambda s: -s["duration"])[:5]:
+            slowest = max(children.get(root["trace_id"], []), key=lambda s: s["duration"], default=None)
+            detail = f"slowest stage {slowest['name']} {slowest['duration']:.2f}s" if slowest else ""
+            query = str(root["attributes"].get("query", ""))[:60]
+            print(f"  {root['duration']:6.2f}s  {root['trace_id'][:12]}  {query!r}  {detail}")
+
+
+# ── Entry point ───────────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggregate or convert request traces.")
+    parser.add_argument("command", choices=["report", "otlp"])
+    parser.add_argument("--file", default=TRACE_FILE or "traces.jsonl", help="Trace JSONL file")
+    parser.add_argument("--last", type=int, help="Only the last N requests")
+    parser.add_argument("--top", type=int, default=15, help="Stages to list (report)")
+    parser.add_argument("--out", help="Output file (otlp; default stdout)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.file):
+        sys.exit(f"No trace file at {args.file}")
+    loaded = load_spans(args.file, args.last)
+    if args.command == "report":
+        report(loaded, args.top)
+    else:
+        payload = json.dumps(to_otlp(loaded), indent=2)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                f.write(payload)
+            print(f"Wrote {len(loaded)} spans to {args.out}")
+        else:
+            print(payload)
@@ -0,0 +1,360 @@
+# Local vector index — in-process retrieval backend for search_dental_plan
+# ingest.py writes the index to LOCAL_INDEX_DIR:
+#   embeddings.npy — float32 matrix, one L2-normalized row per chunk (memory-mapped on load)
+#   chunks.json    — id / text / source / headings / categories for each row, same order as embeddings.npy
+#   hnsw.npz       — HNSW graph, only written when the corpus is large enough to need it
+#   lexical.npz    — BM25 postings over the same rows (lexical_index.py)
+#   quantized.npz  — float16 / int8 / PQ codes of the same rows, with EMBEDDING_STORAGE set (quantization.py)
+# Small corpora (our 4 plan PDFs + FAQ are a few hundred chunks) use NumPy brute-force cosine.
+# Larger ones use the HNSW graph. Both honor the same source and category filters as Azure AI Search.
+# With quantized codes, the scan runs over the codes and rescores its candidates exactly.
+# hybrid_search() fuses the vector and BM25 rankings with reciprocal-rank fusion.
+
+import os
+import json
+import math
+import heapq
+import random
+import numpy as np
+from lexical_index import BM25Index, LEXICAL_FILE, RRF_K, reciprocal_rank_fusion
+from quantization import EMBEDDING_STORAGE, QUANTIZED_FILE, QuantizedIndex, encode, save_codes, load_codes
+
+EMBEDDINGS_FILE = "embeddings.npy"
+CHUNKS_FILE = "chunks.json"
+HNSW_FILE = "hnsw.npz"
+
+# Corpora at or above this many chunks get an HNSW graph at ingest time
+HNSW_THRESHOLD = int(os.getenv("HNSW_THRESHOLD", "20000"))
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 100
+HNSW_EF_SEARCH = 64
+# Search beam per result asked for: ef = max(HNSW_EF_SEARCH, HNSW_EF_PER_RESULT * top)
+HNSW_EF_PER_RESULT = 8
+
+
+def normalize(vectors):
+    """L2-normalize a vector or a matrix of row vectors so dot product == cosine."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class BruteForceIndex:
+    """Exact cosine search over every row — one matrix-vector product per query."""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def search(self, query_vector, top=3, rows=None):
+        """Return [(row, score)] for the top matches, optionally restricted to `rows`."""
+        candidates = self.vectors if rows is None else self.vectors[rows]
+        if len(candidates) == 0:
+            return []
+        scores = candidates @ query_vector
+        top = min(top, len(scores))
+        best = np.argpartition(-scores, top - 1)[:top]
+        best = best[np.argsort(-scores[best])]
+        if rows is not None:
+            return [(int(rows[i]), float(scores[i])) for i in best]
+        return [(int(i), float(scores[i])) for i in best]
+
+
+class HnswIndex:
+    """Hierarchical navigable small world graph over normalized vectors."""
+
+    def __init__(self, vectors, levels, layers, entry_point, ef_search=HNSW_EF_SEARCH):
+        self.vectors = vectors
+        self.levels = levels
+        self.layers = layers  # layers[l] is an (n, max_neighbors) int32 array padded with -1
+        self.entry_point = entry_point
+        self.ef_search = ef_search
+
+    # ── Build ─────────────────────────────────────────────────────────────────
+    @classmethod
+    def build(cls, vectors, m=HNSW_M, ef_construction=HNSW_EF_CONSTRUCTION, seed=42):
+        """Build the graph by inserting every row in order."""
+        n = len(vectors)
+        rng = random.Random(seed)
+        level_mult = 1 / math.log(m)
+        levels = np.array([int(-math.log(1.0 - rng.random()) * level_mult) for _ in range(n)], dtype=np.int8)
+        max_level = int(levels.max()) if n else 0
+
+        layers = [np.full((n, m * 2 if layer == 0 else m), -1, dtype=np.int32) for layer in range(max_level + 1)]
+        index = cls(vectors, levels, layers, -1)
+        top_level = -1
+
+        for node in range(n):
+            level = int(levels[node])
+            if index.entry_point < 0:
+                index.entry_point, top_level = node, level
+                continue
+
+            query = vectors[node]
+            current = index.entry_point
+            for layer in range(top_level, level, -1):
+                current = index._greedy(query, current, layers[layer])
+
+            entry = [current]
+            for layer in range(min(level, top_level), -1, -1):
+                table = layers[layer]
+                found = index._search_layer(query, entry, ef_construction, table)
+                neighbors = index._select_neighbors(query, [row for _, row in found], m)
+                table[node, :len(neighbors)] = neighbors
+                for neighbor in neighbors:
+                    index._link(table, neighbor, node)
+                entry = [row for _, row in found]
+
+            if level > top_level:
+                index.entry_point, top_level = node, level
+
+        return index
+
+    def _select_neighbors(self, query, candidates, m):
+        """
+        Up to `m` of `candidates` (sorted by similarity to `query`, best first) to link to. A candidate
+        is kept only if it is closer to the query than to every neighbour already kept (the HNSW
+        paper's heuristic), so the links reach out in different directions instead of all into
+        the nearest cluster.
+        """
+        if len(candidates) <= m:
+            return list(candidates)
+        candidate_vectors = self.vectors[candidates]
+        to_query = candidate_vectors @ query
+        between = candidate_vectors @ candidate_vectors.T
+        kept = []
+        for i in range(len(candidates)):
+            if not kept or to_query[i] > between[i, kept].max():
+                kept.append(i)
+                if len(kept) == m:
+                    break
+        return [candidates[i] for i in kept]
+
+    def _link(self, table, node, new):
+        """Add a link node -> new; a full link list is pruned with the same heuristic."""
+        links = table[node]
+        free = np.flatnonzero(links < 0)
+        if len(free):
+            links[free[0]] = new
+            return
+        candidates = np.append(links, new)
+        order = np.argsort(-(self.vectors[candidates] @ self.vectors[node]))
+        kept = self._select_neighbors(self.vectors[node], candidates[order].tolist(), len(links))
+        links[:] = -1
+        links[:len(kept)] = kept
+
+    # ── Graph traversal ───────────────────────────────────────────────────────
+    def _greedy(self, query, current, layer):
+        best = float(self.vectors[current] @ query)
+        changed = True
+        while changed:
+            changed = False
+            links = layer[current]
+            links = links[links >= 0]
+            if len(links) == 0:
+                break
+            sims = self.vectors[links] @ query
+            i = int(np.argmax(sims))
+            if sims[i] > best:
+                best, current, changed = float(sims[i]), int(links[i]), True
+        return current
+
+    def _search_layer(self, query, entry, ef, layer, allowed=None):
+        """Best-first search on one layer. Returns [(score, row)] sorted by score desc."""
+        visited = np.zeros(len(layer), dtype=bool)
+        visited[entry] = True
+        sims = (self.vectors[entry] @ query).tolist()
+        candidates = [(-s, r) for s, r in zip(sims, entry)]
+        heapq.heapify(candidates)
+        results = []  # min-heap of (score, row), only rows passing `allowed`
+        for s, r in zip(sims, entry):
+            if allowed is None or r in allowed:
+                heapq.heappush(results, (s, r))
+
+        while candidates:
+            neg_sim, row = heapq.heappop(candidates)
+            if len(results) >= ef and -neg_sim < results[0][0]:
+                break
+            links = layer[row]
+            links = links[links >= 0]
+            links = links[~visited[links]]
+            if len(links) == 0:
+                continue
+            visited[links] = True
+            link_sims = self.vectors[links] @ query
+            for s, r in zip(link_sims.tolist(), links.tolist()):
+                if len(results) < ef or s > results[0][0]:
+                    heapq.heappush(candidates, (-s, r))
+                    if allowed is None or r in allowed:
+                        heapq.heappush(results, (s, r))
+                        if len(results) > ef:
+                            heapq.heappop(results)
+
+        return sorted(results, reverse=True)
+
+    def search(self, query_vector, top=3, rows=None):
+        """Return [(row, score)] for the approximate top matches, optionally restricted to `rows`."""
+        if self.entry_point < 0:
+            return []
+        current = self.entry_point
+        for layer in range(len(self.layers) - 1, 0, -1):
+            current = self._greedy(query_vector, current, self.layers[layer])
+
+        allowed = None if rows is None else set(int(r) for r in rows)
+        # The beam grows with the number of results asked for, so recall does not drop as top grows
+        ef = max(self.ef_search, HNSW_EF_PER_RESULT * top)
+        found = self._search_layer(query_vector, [current], ef, self.layers[0], allowed)
+        return [(row, score) for score, row in found[:top]]
+
+    # ── Persistence ───────────────────────────────────────────────────────────
+    def save(self, path):
+        arrays = {f"layer_{i}": table for i, table in enumerate(self.layers)}
+        np.savez(path, levels=self.levels, entry_point=np.array(self.entry_point), **arrays)
+
+    @classmethod
+    def load(cls, vectors, path):
+        data = np.load(path)
+        layer_count = len([k for k in data.files if k.startswith("layer_")])
+        layers = [data[f"layer_{i}"] for i in range(layer_count)]
+        return cls(vectors, data["levels"], layers, int(data["entry_point"]))
+
+
+class LocalVectorIndex:
+    """Chunk metadata + an engine (brute force, quantized or HNSW) over the memory-mapped embeddings, and BM25 postings."""
+
+    def __init__(self, chunks, vectors, engine, lexical=None, scan=None):
+        self.chunks = chunks
+        self.vectors = vectors
+        self.engine = engine
+        # Filtered searches scan their rows; HNSW cannot restrict its walk to a small source
+        self.scan = scan or (BruteForceIndex(vectors) if isinstance(engine, HnswIndex) else engine)
+        # Indexes written before lexical.npz existed get their postings built on load
+        self.lexical = lexical or BM25Index.build([chunk["text"] for chunk in chunks])
+        self.rows_by_source = {}
+        self.rows_by_category = {}
+        for row, chunk in enumerate(chunks):
+            self.rows_by_source.setdefault(chunk["source"], []).append(row)
+            for category in chunk.get("categories", []):
+                self.rows_by_category.setdefault(category, []).append(row)
+        self.rows_by_source = {s: np.array(r, dtype=np.int64) for s, r in self.rows_by_source.items()}
+        self.rows_by_category = {c: np.array(r, dtype=np.int64) for c, r in self.rows_by_category.items()}
+
+    def _rows(self, source, categories=None):
+        """
+        (rows, matched): the rows of one source (None for every row).
+        :param categories: keep only rows tagged with any of these category keys.
+        """
+        rows = self.rows_by_source.get(source) if source else None
+        if source and rows is None:
+            return None, False
+        if categories:
+            tagged = [self.rows_by_category[c] for c in categories if c in self.rows_by_category]
+            tagged = np.unique(np.concatenate(tagged)) if tagged else np.zeros(0, dtype=np.int64)
+            rows = tagged if rows is None else np.intersect1d(rows, tagged)
+            return rows, len(rows) > 0
+        return rows, True
+
+    def _vector_hits(self, query_vector, top, rows):
+        # A single source is small enough to scan exactly, even when the whole corpus is not
+        engine = self.scan if rows is not None and len(rows) < HNSW_THRESHOLD else self.engine
+        return engine.search(normalize(query_vector), top=top, rows=rows)
+
+    def search(self, query_vector, top=3, source=None, categories=None):
+        """Return the top chunk dicts (with a `score` key) for a query vector."""
+        rows, matched = self._rows(source, categories)
+        if not matched:
+            return []
+        return [dict(self.chunks[row], score=score) for row, score in self._vector_hits(query_vector, top, rows)]
+
+    def search_text(self, query, top=3, source=None, categories=None):
+        """Return the top chunk dicts (with a BM25 `score`) for a text query; no embedding needed."""
+        rows, matched = self._rows(source, categories)
+        if not matched:
+            return []
+        return [dict(self.chunks[row], score=score) for row, score in self.lexical.search(query, top=top, rows=rows)]
+
+    def hybrid_search(self, query, query_vector, top=3, source=None, candidates=50, k=RRF_K, categories=None):
+        """
+        Fuse the top `candidates` vector and BM25 rows with reciprocal-rank fusion.
+        Returns chunk dicts whose `score` is the fused RRF score.
+        """
+        rows, matched = self._rows(source, categories)
+        if not matched:
+            return []
+        rankings = [self._vector_hits(query_vector, candidates, rows), self.lexical.search(query, top=candidates, rows=rows)]
+        return [dict(self.chunks[row], score=score) for row, score in reciprocal_rank_fusion(rankings, top=top, k=k)]
+
+
+def save_local_index(documents, index_dir, hnsw_threshold=HNSW_THRESHOLD, storage=EMBEDDING_STORAGE):
+    """
+    Write the documents uploaded to Azure AI Search as a local index.
+    :param storage: float32, or float16 / int8 / pq to also write compact codes for the scan.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    vectors = normalize([doc["embedding"] for doc in documents]) if documents else np.zeros((0, 0), dtype=np.float32)
+    np.save(os.path.join(index_dir, EMBEDDINGS_FILE), vectors)
+
+    chunks = [{"id": doc["id"], "text": doc["text"], "source": doc["source"],
+               "headings": doc.get("headings") or [], "categories": doc.get("categories") or []} for doc in documents]
+    with open(os.path.join(index_dir, CHUNKS_FILE), "w", encoding="utf-8") as f:
+        json.dump(chunks, f)
+
+    BM25Index.build([chunk["text"] for chunk in chunks]).save(os.path.join(index_dir, LEXICAL_FILE))
+
+    hnsw_path = os.path.join(index_dir, HNSW_FILE)
+    if len(documents) >= hnsw_threshold:
+        HnswIndex.build(vectors).save(hnsw_path)
+    elif os.path.exists(hnsw_path):
+        os.remove(hnsw_path)
+
+    quantized_path = os.path.join(index_dir, QUANTIZED_FILE)
+    codes = encode(vectors, storage) if documents else None
+    if codes is not None:
+        save_codes(codes, quantized_path)
+    elif os.path.exists(quantized_path):
+        os.remove(quantized_path)
+
+
+def load_local_index(index_dir, dimensions=None):
+    """
+    Memory-map a local index written by save_local_index.
+    :param dimensions: the query embedding size. A wider index is truncated to it (Matryoshka
+        embeddings) and held in memory, without its HNSW graph or codes, until it is re-ingested.
+    """
+    vectors = np.load(os.path.join(index_dir, EMBEDDINGS_FILE), mmap_mode="r")
+    with open(os.path.join(index_dir, CHUNKS_FILE), encoding="utf-8") as f:
+        chunks = json.load(f)
+
+    hnsw_path = os.path.join(index_dir, HNSW_FILE)
+    quantized_path = os.path.join(index_dir, QUANTIZED_FILE)
+    if dimensions and len(vectors) and vectors.shape[1] != dimensions:
+        if vectors.shape[1] < dimensions:
+            raise ValueError(f"Local index in {index_dir} has {vectors.shape[1]}-dim embeddings, "
+                             f"queries have {dimensions}; re-run ingest.py")
+        print(f"  → Local index has {vectors.shape[1]}-dim embeddings; truncating to {dimensions} (re-run ingest.py to persist)")
+        vectors = normalize(vectors[:, :dimensions])
+        engine = BruteForceIndex(vectors)
+        return LocalVectorIndex(chunks, vectors, engine, _load_lexical(index_dir))
+    if os.path.exists(quantized_path):
+        scan = QuantizedIndex(load_codes(quantized_path), vectors)
+    else:
+        scan = BruteForceIndex(vectors)
+    engine = HnswIndex.load(vectors, hnsw_path) if os.path.exists(hnsw_path) else scan
+    return LocalVectorIndex(chunks, vectors, engine, _load_lexical(index_dir), scan)
+
+
+def _load_lexical(index_dir):
+    lexical_path = os.path.join(index_dir, LEXICAL_FILE)
+    return BM25Index.load(lexical_path) if os.path.exists(lexical_path) else None
+
+
+def load_local_documents(index_dir):
+    """Read a local index back as {id: document} for incremental re-ingestion. None if missing."""
+    embeddings_path = os.path.join(index_dir, EMBEDDINGS_FILE)
+    chunks_path = os.path.join(index_dir, CHUNKS_FILE)
+    if not (os.path.exists(embeddings_path) and os.path.exists(chunks_path)):
+        return None
+    vectors = np.load(embeddings_path, mmap_mode="r")
+    with open(chunks_path, encoding="utf-8") as f:
+        chunks = json.load(f)
+    return {chunk["id"]: dict(chunk, embedding=np.array(vectors[row])) for row, chunk in enumerate(chunks)}